@@ -0,0 +1,826 @@
+/*
+    _rbtnative: a left leaning red-black tree for int or float keys, written in C.
+
+    Nodes are not Python objects. Every field lives in its own typed array and a
+    node is an index into them, so a node costs 29 bytes plus its value, and key
+    comparisons are plain machine comparisons. Freed slots are chained into a
+    free list through their left link and handed out again by later puts.
+
+    The insert and delete follow the recursive left leaning algorithms of
+    Sedgewick and Wayne, Algorithms (4th Edition), the same rules redblacktree.py
+    keeps. numerictree.py wraps this type in the RedBlackTree interface, and falls
+    back to a pure Python tree when the extension is not built.
+
+    build: python setup.py build_ext --inplace
+*/
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <math.h>
+#include <stdint.h>
+#include <string.h>
+
+#define NIL (-1)
+
+/* the most nodes one tree can hold, so sizes and links fit in 32 bits */
+#define MAX_NODES INT32_MAX
+
+typedef union {
+    int64_t i;
+    double f;
+} Key;
+
+typedef struct {
+    PyObject_HEAD
+    int is_float;        /* keys are doubles, otherwise 64 bit ints */
+    int32_t root;
+    int32_t free_list;   /* freed slots, chained through left */
+    Py_ssize_t count;    /* live nodes */
+    Py_ssize_t used;     /* slots ever handed out, live or freed */
+    Py_ssize_t capacity; /* slots the arrays have room for */
+    Key *keys;
+    PyObject **values;   /* owned references, NULL in freed slots */
+    int32_t *left;
+    int32_t *right;
+    int32_t *size;
+    uint8_t *red;
+} Tree;
+
+/* ---------------------------------------------------------------- helpers */
+
+/* turns a Python number into a key, raising for anything the tree can't order */
+static int
+to_key(Tree *t, PyObject *obj, Key *key)
+{
+    if (t->is_float) {
+        if (!PyFloat_Check(obj) && !PyLong_Check(obj)) {
+            PyErr_Format(PyExc_TypeError, "keys must be int or float, not %.100s", Py_TYPE(obj)->tp_name);
+            return -1;
+        }
+        key->f = PyFloat_AsDouble(obj);
+        if (key->f == -1.0 && PyErr_Occurred())
+            return -1;
+        if (isnan(key->f)) {
+            PyErr_SetString(PyExc_ValueError, "nan can't be used as a key");
+            return -1;
+        }
+        return 0;
+    }
+    if (!PyLong_Check(obj)) {
+        PyErr_Format(PyExc_TypeError, "keys must be int, not %.100s", Py_TYPE(obj)->tp_name);
+        return -1;
+    }
+    key->i = PyLong_AsLongLong(obj);
+    if (key->i == -1 && PyErr_Occurred())
+        return -1;
+    return 0;
+}
+
+static PyObject *
+from_key(Tree *t, int32_t h)
+{
+    if (t->is_float)
+        return PyFloat_FromDouble(t->keys[h].f);
+    return PyLong_FromLongLong(t->keys[h].i);
+}
+
+/* compares key with the key of node h: negative if below, 0 if equal, positive if above */
+static inline int
+compare(const Tree *t, Key key, int32_t h)
+{
+    if (t->is_float) {
+        double other = t->keys[h].f;
+        return (key.f > other) - (key.f < other);
+    }
+    int64_t other = t->keys[h].i;
+    return (key.i > other) - (key.i < other);
+}
+
+static inline int
+is_red(const Tree *t, int32_t h)
+{
+    return h != NIL && t->red[h];
+}
+
+static inline int32_t
+size_of(const Tree *t, int32_t h)
+{
+    return h == NIL ? 0 : t->size[h];
+}
+
+static inline void
+fix_size(Tree *t, int32_t h)
+{
+    t->size[h] = 1 + size_of(t, t->left[h]) + size_of(t, t->right[h]);
+}
+
+/* grows every array so at least one more node fits */
+static int
+reserve_one(Tree *t)
+{
+    if (t->free_list != NIL || t->used < t->capacity)
+        return 0;
+    if (t->capacity >= MAX_NODES) {
+        PyErr_SetString(PyExc_OverflowError, "tree is full");
+        return -1;
+    }
+    Py_ssize_t capacity = t->capacity ? t->capacity * 2 : 64;
+    if (capacity > MAX_NODES)
+        capacity = MAX_NODES;
+
+    Key *keys = PyMem_Realloc(t->keys, capacity * sizeof(Key));
+    if (keys) t->keys = keys;
+    PyObject **values = PyMem_Realloc(t->values, capacity * sizeof(PyObject *));
+    if (values) t->values = values;
+    int32_t *left = PyMem_Realloc(t->left, capacity * sizeof(int32_t));
+    if (left) t->left = left;
+    int32_t *right = PyMem_Realloc(t->right, capacity * sizeof(int32_t));
+    if (right) t->right = right;
+    int32_t *size = PyMem_Realloc(t->size, capacity * sizeof(int32_t));
+    if (size) t->size = size;
+    uint8_t *red = PyMem_Realloc(t->red, capacity * sizeof(uint8_t));
+    if (red) t->red = red;
+    if (!keys || !values || !left || !right || !size || !red) {
+        PyErr_NoMemory(); /* arrays that did grow are kept, the capacity stays put */
+        return -1;
+    }
+    t->capacity = capacity;
+    return 0;
+}
+
+/* hands out a slot for a new red node. reserve_one must have been called */
+static int32_t
+new_node(Tree *t, Key key, PyObject *value)
+{
+    int32_t h;
+    if (t->free_list != NIL) {
+        h = t->free_list;
+        t->free_list = t->left[h];
+    }
+    else {
+        h = (int32_t)t->used++;
+    }
+    t->keys[h] = key;
+    Py_INCREF(value);
+    t->values[h] = value;
+    t->left[h] = NIL;
+    t->right[h] = NIL;
+    t->size[h] = 1;
+    t->red[h] = 1;
+    t->count++;
+    return h;
+}
+
+/* puts a slot back on the free list. its value must already be taken out */
+static void
+free_node(Tree *t, int32_t h)
+{
+    t->values[h] = NULL;
+    t->left[h] = t->free_list;
+    t->free_list = h;
+    t->count--;
+}
+
+/* returns the node holding key, or NIL */
+static int32_t
+find(const Tree *t, Key key)
+{
+    int32_t h = t->root;
+    while (h != NIL) {
+        int c = compare(t, key, h);
+        if (c == 0)
+            return h;
+        h = c < 0 ? t->left[h] : t->right[h];
+    }
+    return NIL;
+}
+
+/* ------------------------------------------------------------ rebalancing */
+
+static void
+color_flip(Tree *t, int32_t h)
+{
+    t->red[h] = !t->red[h];
+    t->red[t->left[h]] = !t->red[t->left[h]];
+    t->red[t->right[h]] = !t->red[t->right[h]];
+}
+
+static int32_t
+rotate_left(Tree *t, int32_t h)
+{
+    int32_t x = t->right[h];
+    t->right[h] = t->left[x];
+    t->left[x] = h;
+    t->red[x] = t->red[h];
+    t->red[h] = 1;
+    t->size[x] = t->size[h];
+    fix_size(t, h);
+    return x;
+}
+
+static int32_t
+rotate_right(Tree *t, int32_t h)
+{
+    int32_t x = t->left[h];
+    t->left[h] = t->right[x];
+    t->right[x] = h;
+    t->red[x] = t->red[h];
+    t->red[h] = 1;
+    t->size[x] = t->size[h];
+    fix_size(t, h);
+    return x;
+}
+
+/* restores the left leaning rules at h on the way back up */
+static int32_t
+balance(Tree *t, int32_t h)
+{
+    if (is_red(t, t->right[h]) && !is_red(t, t->left[h]))
+        h = rotate_left(t, h);
+    if (is_red(t, t->left[h]) && is_red(t, t->left[t->left[h]]))
+        h = rotate_right(t, h);
+    if (is_red(t, t->left[h]) && is_red(t, t->right[h]))
+        color_flip(t, h);
+    fix_size(t, h);
+    return h;
+}
+
+static int32_t
+move_red_left(Tree *t, int32_t h)
+{
+    color_flip(t, h);
+    if (is_red(t, t->left[t->right[h]])) {
+        t->right[h] = rotate_right(t, t->right[h]);
+        h = rotate_left(t, h);
+        color_flip(t, h);
+    }
+    return h;
+}
+
+static int32_t
+move_red_right(Tree *t, int32_t h)
+{
+    color_flip(t, h);
+    if (is_red(t, t->left[t->left[h]])) {
+        h = rotate_right(t, h);
+        color_flip(t, h);
+    }
+    return h;
+}
+
+/* -------------------------------------------------------- insert / delete */
+
+/* inserts below h, returns the new subtree top. a replaced value is left in *old */
+static int32_t
+insert(Tree *t, int32_t h, Key key, PyObject *value, PyObject **old)
+{
+    if (h == NIL)
+        return new_node(t, key, value);
+    int c = compare(t, key, h);
+    if (c < 0) {
+        t->left[h] = insert(t, t->left[h], key, value, old);
+    }
+    else if (c > 0) {
+        t->right[h] = insert(t, t->right[h], key, value, old);
+    }
+    else {
+        Py_INCREF(value);
+        *old = t->values[h];
+        t->values[h] = value;
+        return h;
+    }
+    return balance(t, h);
+}
+
+/* removes the smallest node below h, and hands back its slot in *removed */
+static int32_t
+delete_min(Tree *t, int32_t h, int32_t *removed)
+{
+    if (t->left[h] == NIL) {
+        *removed = h;
+        return NIL;
+    }
+    if (!is_red(t, t->left[h]) && !is_red(t, t->left[t->left[h]]))
+        h = move_red_left(t, h);
+    t->left[h] = delete_min(t, t->left[h], removed);
+    return balance(t, h);
+}
+
+/* removes key, which must exist below h, and leaves its value in *old */
+static int32_t
+delete(Tree *t, int32_t h, Key key, PyObject **old)
+{
+    if (compare(t, key, h) < 0) {
+        if (!is_red(t, t->left[h]) && !is_red(t, t->left[t->left[h]]))
+            h = move_red_left(t, h);
+        t->left[h] = delete(t, t->left[h], key, old);
+    }
+    else {
+        if (is_red(t, t->left[h]))
+            h = rotate_right(t, h);
+        if (compare(t, key, h) == 0 && t->right[h] == NIL) {
+            *old = t->values[h];
+            free_node(t, h);
+            return NIL;
+        }
+        if (!is_red(t, t->right[h]) && !is_red(t, t->left[t->right[h]]))
+            h = move_red_right(t, h);
+        if (compare(t, key, h) == 0) { /* take over the successor's pair, then free its slot */
+            int32_t successor;
+            *old = t->values[h];
+            t->right[h] = delete_min(t, t->right[h], &successor);
+            t->keys[h] = t->keys[successor];
+            t->values[h] = t->values[successor];
+            free_node(t, successor);
+        }
+        else {
+            t->right[h] = delete(t, t->right[h], key, old);
+        }
+    }
+    return balance(t, h);
+}
+
+/* --------------------------------------------------------------- queries */
+
+/* returns num of keys below key, counting key itself if inclusive */
+static Py_ssize_t
+count_below(const Tree *t, Key key, int inclusive)
+{
+    Py_ssize_t count = 0;
+    int32_t h = t->root;
+    while (h != NIL) {
+        int c = compare(t, key, h);
+        if (c > 0 || (c == 0 && inclusive)) {
+            count += size_of(t, t->left[h]) + 1;
+            h = t->right[h];
+        }
+        else {
+            h = t->left[h];
+        }
+    }
+    return count;
+}
+
+/* returns the node of a 0 indexed rank, which must be valid */
+static int32_t
+select_node(const Tree *t, Py_ssize_t rank)
+{
+    int32_t h = t->root;
+    for (;;) {
+        Py_ssize_t left_size = size_of(t, t->left[h]);
+        if (rank < left_size) {
+            h = t->left[h];
+        }
+        else if (rank == left_size) {
+            return h;
+        }
+        else {
+            rank -= left_size + 1;
+            h = t->right[h];
+        }
+    }
+}
+
+/* the node with the largest key below key, or the smallest above it if below is 0,
+   counting key itself if inclusive. NIL if there is none */
+static int32_t
+bound(const Tree *t, Key key, int below, int inclusive)
+{
+    int32_t h = t->root, best = NIL;
+    while (h != NIL) {
+        int c = compare(t, key, h);
+        if (c < 0) {
+            if (!below)
+                best = h;
+            h = t->left[h];
+        }
+        else if (c > 0) {
+            if (below)
+                best = h;
+            h = t->right[h];
+        }
+        else if (inclusive) {
+            return h;
+        }
+        else {
+            h = below ? t->left[h] : t->right[h];
+        }
+    }
+    return best;
+}
+
+static int
+height(const Tree *t, int32_t h)
+{
+    if (h == NIL)
+        return 0;
+    int left = height(t, t->left[h]);
+    int right = height(t, t->right[h]);
+    return 1 + (left > right ? left : right);
+}
+
+/* returns the black height below h, or -1 if any rule is broken. keys must lie
+   strictly between lo and hi where those are not NIL */
+static int
+check(const Tree *t, int32_t h, int32_t lo, int32_t hi)
+{
+    if (h == NIL)
+        return 0;
+    if ((lo != NIL && compare(t, t->keys[lo], h) >= 0) || (hi != NIL && compare(t, t->keys[hi], h) <= 0))
+        return -1;
+    if (is_red(t, t->right[h]) || (t->red[h] && is_red(t, t->left[h])))
+        return -1;
+    if (t->size[h] != 1 + size_of(t, t->left[h]) + size_of(t, t->right[h]))
+        return -1;
+    int left = check(t, t->left[h], lo, h);
+    int right = check(t, t->right[h], h, hi);
+    if (left < 0 || left != right)
+        return -1;
+    return left + !t->red[h];
+}
+
+/* ---------------------------------------------------------- Python methods */
+
+static PyObject *
+Tree_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"is_float", NULL};
+    int is_float = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|p", kwlist, &is_float))
+        return NULL;
+    Tree *t = (Tree *)type->tp_alloc(type, 0);
+    if (t == NULL)
+        return NULL;
+    t->is_float = is_float;
+    t->root = NIL;
+    t->free_list = NIL;
+    return (PyObject *)t;
+}
+
+/* drops every value. the node slots are kept for reuse */
+static int
+Tree_clear(Tree *t)
+{
+    Py_ssize_t used = t->used;
+    PyObject **values = t->values;
+    t->root = NIL;
+    t->free_list = NIL;
+    t->count = 0;
+    t->used = 0;
+    for (Py_ssize_t i = 0; i < used; i++) { /* the tree is already empty if a value's __del__ looks */
+        PyObject *value = values[i];
+        values[i] = NULL;
+        Py_XDECREF(value);
+    }
+    return 0;
+}
+
+static int
+Tree_traverse(Tree *t, visitproc visit, void *arg)
+{
+    for (Py_ssize_t i = 0; i < t->used; i++)
+        Py_VISIT(t->values[i]);
+    return 0;
+}
+
+static void
+Tree_dealloc(Tree *t)
+{
+    PyObject_GC_UnTrack(t);
+    Tree_clear(t);
+    PyMem_Free(t->keys);
+    PyMem_Free(t->values);
+    PyMem_Free(t->left);
+    PyMem_Free(t->right);
+    PyMem_Free(t->size);
+    PyMem_Free(t->red);
+    Py_TYPE(t)->tp_free((PyObject *)t);
+}
+
+static Py_ssize_t
+Tree_len(Tree *t)
+{
+    return t->count;
+}
+
+static PyObject *
+Tree_put(Tree *t, PyObject *const *args, Py_ssize_t nargs)
+{
+    Key key;
+    PyObject *old = NULL;
+    if (nargs != 2) {
+        PyErr_SetString(PyExc_TypeError, "put takes a key and a value");
+        return NULL;
+    }
+    if (to_key(t, args[0], &key) < 0 || reserve_one(t) < 0)
+        return NULL;
+    t->root = insert(t, t->root, key, args[1], &old);
+    t->red[t->root] = 0;
+    Py_XDECREF(old); /* only once the tree is whole again, in case it runs any code */
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+Tree_get(Tree *t, PyObject *arg)
+{
+    Key key;
+    if (to_key(t, arg, &key) < 0)
+        return NULL;
+    int32_t h = find(t, key);
+    if (h == NIL)
+        Py_RETURN_NONE;
+    Py_INCREF(t->values[h]);
+    return t->values[h];
+}
+
+static PyObject *
+Tree_contains(Tree *t, PyObject *arg)
+{
+    Key key;
+    if (to_key(t, arg, &key) < 0)
+        return NULL;
+    return PyBool_FromLong(find(t, key) != NIL);
+}
+
+static PyObject *
+Tree_delete(Tree *t, PyObject *arg)
+{
+    Key key;
+    PyObject *old = NULL;
+    if (to_key(t, arg, &key) < 0)
+        return NULL;
+    if (find(t, key) == NIL)
+        Py_RETURN_NONE;
+    if (!is_red(t, t->left[t->root]) && !is_red(t, t->right[t->root]))
+        t->red[t->root] = 1; /* make root red so there is a red link to push down */
+    t->root = delete(t, t->root, key, &old);
+    if (t->root != NIL)
+        t->red[t->root] = 0;
+    return old; /* the reference the tree held becomes the caller's */
+}
+
+static PyObject *
+Tree_select(Tree *t, PyObject *arg)
+{
+    Py_ssize_t rank = PyNumber_AsSsize_t(arg, PyExc_OverflowError);
+    if (rank == -1 && PyErr_Occurred())
+        return NULL;
+    if (rank < 0 || rank >= t->count)
+        Py_RETURN_NONE;
+    return from_key(t, select_node(t, rank));
+}
+
+static PyObject *
+Tree_rank(Tree *t, PyObject *arg)
+{
+    Key key;
+    if (to_key(t, arg, &key) < 0)
+        return NULL;
+    Py_ssize_t rank = 0;
+    int32_t h = t->root;
+    while (h != NIL) {
+        int c = compare(t, key, h);
+        if (c < 0) {
+            h = t->left[h];
+        }
+        else if (c == 0) {
+            return PyLong_FromSsize_t(rank + size_of(t, t->left[h]));
+        }
+        else {
+            rank += size_of(t, t->left[h]) + 1;
+            h = t->right[h];
+        }
+    }
+    return PyLong_FromLong(-1);
+}
+
+static PyObject *
+Tree_count_below(Tree *t, PyObject *const *args, Py_ssize_t nargs)
+{
+    Key key;
+    if (nargs != 2) {
+        PyErr_SetString(PyExc_TypeError, "count_below takes a key and inclusive");
+        return NULL;
+    }
+    int inclusive = PyObject_IsTrue(args[1]);
+    if (inclusive < 0 || to_key(t, args[0], &key) < 0)
+        return NULL;
+    return PyLong_FromSsize_t(count_below(t, key, inclusive));
+}
+
+static PyObject *
+Tree_bound(Tree *t, PyObject *const *args, Py_ssize_t nargs)
+{
+    Key key;
+    if (nargs != 3) {
+        PyErr_SetString(PyExc_TypeError, "bound takes a key, below and inclusive");
+        return NULL;
+    }
+    int below = PyObject_IsTrue(args[1]);
+    int inclusive = PyObject_IsTrue(args[2]);
+    if (below < 0 || inclusive < 0 || to_key(t, args[0], &key) < 0)
+        return NULL;
+    int32_t h = bound(t, key, below, inclusive);
+    if (h == NIL)
+        Py_RETURN_NONE;
+    return from_key(t, h);
+}
+
+/* the key next to an existing key, below it or above it, in one descent */
+static PyObject *
+Tree_neighbour(Tree *t, PyObject *const *args, Py_ssize_t nargs)
+{
+    Key key;
+    if (nargs != 2) {
+        PyErr_SetString(PyExc_TypeError, "neighbour takes a key and below");
+        return NULL;
+    }
+    int below = PyObject_IsTrue(args[1]);
+    if (below < 0 || to_key(t, args[0], &key) < 0)
+        return NULL;
+    int32_t h = t->root, best = NIL;
+    int found = 0;
+    while (h != NIL) {
+        int c = compare(t, key, h);
+        if (c == 0) {
+            found = 1;
+            h = below ? t->left[h] : t->right[h];
+        }
+        else if (c < 0) {
+            if (!below)
+                best = h;
+            h = t->left[h];
+        }
+        else {
+            if (below)
+                best = h;
+            h = t->right[h];
+        }
+    }
+    if (!found || best == NIL)
+        Py_RETURN_NONE;
+    return from_key(t, best);
+}
+
+/* returns the keys, values or (key, value) pairs of the ranks start to stop, in order */
+static PyObject *
+Tree_slice(Tree *t, PyObject *const *args, Py_ssize_t nargs)
+{
+    if (nargs != 3) {
+        PyErr_SetString(PyExc_TypeError, "slice takes start, stop and what (0 pairs, 1 keys, 2 values)");
+        return NULL;
+    }
+    Py_ssize_t start = PyNumber_AsSsize_t(args[0], PyExc_OverflowError);
+    Py_ssize_t stop = PyNumber_AsSsize_t(args[1], PyExc_OverflowError);
+    long what = PyLong_AsLong(args[2]);
+    if (PyErr_Occurred())
+        return NULL;
+    if (start < 0)
+        start = 0;
+    if (stop > t->count)
+        stop = t->count;
+    if (stop < start)
+        stop = start;
+
+    PyObject *result = PyList_New(stop - start);
+    if (result == NULL || stop == start)
+        return result;
+
+    /* the path to the first rank, keeping the nodes still to come on a stack */
+    int32_t stack[2 * 32 + 2];
+    int depth = 0;
+    int32_t h = t->root;
+    Py_ssize_t rank = start;
+    while (h != NIL) {
+        Py_ssize_t left_size = size_of(t, t->left[h]);
+        if (rank < left_size) {
+            stack[depth++] = h;
+            h = t->left[h];
+        }
+        else if (rank == left_size) {
+            stack[depth++] = h;
+            break;
+        }
+        else {
+            rank -= left_size + 1;
+            h = t->right[h];
+        }
+    }
+
+    for (Py_ssize_t i = 0; i < stop - start; i++) {
+        h = stack[--depth];
+        PyObject *item;
+        if (what == 2) {
+            item = t->values[h];
+            Py_INCREF(item);
+        }
+        else if (what == 1) {
+            item = from_key(t, h);
+        }
+        else {
+            PyObject *key = from_key(t, h);
+            item = key ? PyTuple_Pack(2, key, t->values[h]) : NULL;
+            Py_XDECREF(key);
+        }
+        if (item == NULL) {
+            Py_DECREF(result);
+            return NULL;
+        }
+        PyList_SET_ITEM(result, i, item);
+        for (int32_t next = t->right[h]; next != NIL; next = t->left[next])
+            stack[depth++] = next;
+    }
+    return result;
+}
+
+static PyObject *
+Tree_height(Tree *t, PyObject *Py_UNUSED(ignored))
+{
+    return PyLong_FromLong(height(t, t->root));
+}
+
+static PyObject *
+Tree_is_valid(Tree *t, PyObject *Py_UNUSED(ignored))
+{
+    if (t->root == NIL)
+        return PyBool_FromLong(t->count == 0);
+    return PyBool_FromLong(!t->red[t->root] && t->size[t->root] == t->count && check(t, t->root, NIL, NIL) >= 0);
+}
+
+static PyObject *
+Tree_clear_method(Tree *t, PyObject *Py_UNUSED(ignored))
+{
+    Tree_clear(t);
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+Tree_nbytes(Tree *t, PyObject *Py_UNUSED(ignored))
+{
+    size_t node = sizeof(Key) + sizeof(PyObject *) + 3 * sizeof(int32_t) + sizeof(uint8_t);
+    return PyLong_FromSize_t(sizeof(Tree) + (size_t)t->capacity * node);
+}
+
+static PyMethodDef Tree_methods[] = {
+    {"put", (PyCFunction)(void (*)(void))Tree_put, METH_FASTCALL, "put(key, value): inserts or replaces a pair"},
+    {"get", (PyCFunction)Tree_get, METH_O, "get(key): the value of key, or None"},
+    {"contains", (PyCFunction)Tree_contains, METH_O, "contains(key): whether key is present"},
+    {"delete", (PyCFunction)Tree_delete, METH_O, "delete(key): removes key, returns its value or None"},
+    {"select", (PyCFunction)Tree_select, METH_O, "select(rank): the key of a 0 indexed rank, or None"},
+    {"rank", (PyCFunction)Tree_rank, METH_O, "rank(key): the 0 indexed rank of key, or -1"},
+    {"count_below", (PyCFunction)(void (*)(void))Tree_count_below, METH_FASTCALL,
+     "count_below(key, inclusive): num of keys below key"},
+    {"bound", (PyCFunction)(void (*)(void))Tree_bound, METH_FASTCALL,
+     "bound(key, below, inclusive): the floor, ceiling, lower or higher key, or None"},
+    {"neighbour", (PyCFunction)(void (*)(void))Tree_neighbour, METH_FASTCALL,
+     "neighbour(key, below): the predecessor or successor of an existing key, or None"},
+    {"slice", (PyCFunction)(void (*)(void))Tree_slice, METH_FASTCALL,
+     "slice(start, stop, what): pairs (0), keys (1) or values (2) of ranks start to stop"},
+    {"height", (PyCFunction)Tree_height, METH_NOARGS, "height(): the height, 0 when empty"},
+    {"is_valid", (PyCFunction)Tree_is_valid, METH_NOARGS, "is_valid(): whether every tree rule holds"},
+    {"clear", (PyCFunction)Tree_clear_method, METH_NOARGS, "clear(): removes every pair"},
+    {"nbytes", (PyCFunction)Tree_nbytes, METH_NOARGS, "nbytes(): bytes held by the tree, values not counted"},
+    {NULL}
+};
+
+static PySequenceMethods Tree_as_sequence = {
+    .sq_length = (lenfunc)Tree_len,
+};
+
+static PyTypeObject TreeType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "_rbtnative.Tree",
+    .tp_doc = PyDoc_STR("Tree(is_float=False): a red-black tree of int (or float) keys"),
+    .tp_basicsize = sizeof(Tree),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_new = Tree_new,
+    .tp_dealloc = (destructor)Tree_dealloc,
+    .tp_traverse = (traverseproc)Tree_traverse,
+    .tp_clear = (inquiry)Tree_clear,
+    .tp_methods = Tree_methods,
+    .tp_as_sequence = &Tree_as_sequence,
+};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT,
+    .m_name = "_rbtnative",
+    .m_doc = "A red-black tree of numeric keys, used by numerictree.py when it is built.",
+    .m_size = -1,
+};
+
+PyMODINIT_FUNC
+PyInit__rbtnative(void)
+{
+    if (PyType_Ready(&TreeType) < 0)
+        return NULL;
+    PyObject *m = PyModule_Create(&module);
+    if (m == NULL)
+        return NULL;
+    Py_INCREF(&TreeType);
+    if (PyModule_AddObject(m, "Tree", (PyObject *)&TreeType) < 0) {
+        Py_DECREF(&TreeType);
+        Py_DECREF(m);
+        return NULL;
+    }
+    return m;
+}
@@ -0,0 +1,164 @@
+"""
+    Measures keeping a running sum inside the tree against keeping it beside it.
+
+    The tree with aggregate=Aggregate.sum() updates the sums of the nodes each
+    put and delete passes. The old way is a plain RedBlackTree plus a Fenwick
+    tree over the key space, with every write done to both. Both are timed on
+    the same mix of puts and deletes of integer keys below --universe, then on
+    prefix sums and range sums, next to summing a range scan of a plain tree.
+    Every answer is checked against the others.
+
+    usage: python benchmarks/bench_aggregate.py [--size N] [--ops K] [--queries Q]
+"""
+
+import argparse
+import random
+import time
+
+import common  # noqa: F401, puts the project on sys.path
+from redblacktree import Aggregate, RedBlackTree
+
+
+class Fenwick:
+
+    # prefix sums over the positions 0 .. size - 1
+    def __init__(self, size):
+        self.sums = [0] * (size + 1)
+
+    def add(self, position, amount):
+        position += 1
+        while position < len(self.sums):
+            self.sums[position] += amount
+            position += position & -position
+
+    # sum of the positions 0 .. position
+    def prefix(self, position):
+        position += 1
+        total = 0
+        while position > 0:
+            total += self.sums[position]
+            position -= position & -position
+        return total
+
+
+# the old way: the tree and a Fenwick tree kept in step on every write
+class TreeWithFenwick:
+
+    def __init__(self, universe):
+        self.tree = RedBlackTree()
+        self.sums = Fenwick(universe)
+
+    def put(self, key, value):
+        old = self.tree.get(key)
+        self.tree.put(key, value)
+        self.sums.add(key, value - (old or 0))
+
+    def delete(self, key):
+        old = self.tree.delete(key)
+        if old is not None:
+            self.sums.add(key, -old)
+        return old
+
+
+def best_of(repeats, run):
+    return min(run() for _ in range(repeats))
+
+
+def timed(action, items):
+    start = time.perf_counter()
+    for item in items:
+        action(*item)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000, help="keys loaded before timing")
+    parser.add_argument("--universe", type=int, default=1_000_000, help="keys are drawn below this")
+    parser.add_argument("--ops", type=int, default=100_000, help="puts and deletes timed")
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    initial = [(key, rng.randrange(1000)) for key in rng.sample(range(args.universe), args.size)]
+    ops = [(rng.randrange(args.universe), rng.randrange(1000) if rng.random() < 0.6 else None)
+           for _ in range(args.ops)]
+    bounds = [sorted((rng.randrange(args.universe), rng.randrange(args.universe))) for _ in range(args.queries)]
+
+    def apply(tree):
+        for key, value in ops:
+            if value is None:
+                tree.delete(key)
+            else:
+                tree.put(key, value)
+
+    def fresh_aggregate():
+        tree = RedBlackTree(aggregate=Aggregate.sum())
+        for key, value in initial:
+            tree.put(key, value)
+        return tree
+
+    def fresh_fenwick():
+        tree = TreeWithFenwick(args.universe)
+        for key, value in initial:
+            tree.put(key, value)
+        return tree
+
+    def fresh_plain():
+        tree = RedBlackTree()
+        for key, value in initial:
+            tree.put(key, value)
+        return tree
+
+    def time_writes(fresh):
+        tree = fresh()
+        start = time.perf_counter()
+        apply(tree)
+        return time.perf_counter() - start
+
+    plain_writes = best_of(3, lambda: time_writes(fresh_plain))
+    aggregate_writes = best_of(3, lambda: time_writes(fresh_aggregate))
+    fenwick_writes = best_of(3, lambda: time_writes(fresh_fenwick))
+
+    augmented = fresh_aggregate()
+    apply(augmented)
+    beside = fresh_fenwick()
+    apply(beside)
+    plain = beside.tree
+    assert augmented.is_valid()
+
+    prefixes = [(hi,) for _, hi in bounds]
+    ranges = [tuple(pair) for pair in bounds]
+    scans = ranges[:max(1, args.queries // 100)] # a scan is slow, so only a sample is timed
+    aggregate_prefix = best_of(3, lambda: timed(augmented.prefix_aggregate, prefixes))
+    fenwick_prefix = best_of(3, lambda: timed(beside.sums.prefix, prefixes))
+    aggregate_range = best_of(3, lambda: timed(augmented.range_aggregate, ranges))
+    fenwick_range = best_of(3, lambda: timed(lambda lo, hi: beside.sums.prefix(hi) - beside.sums.prefix(lo - 1), ranges))
+    scan_range = best_of(3, lambda: timed(lambda lo, hi: sum(v for _, v in plain.range(lo, hi)), scans))
+
+    for lo, hi in ranges[:1000]:
+        expected = beside.sums.prefix(hi) - beside.sums.prefix(lo - 1)
+        assert augmented.range_aggregate(lo, hi) == expected
+        assert augmented.prefix_aggregate(hi) == beside.sums.prefix(hi)
+    for lo, hi in scans:
+        assert sum(v for _, v in plain.range(lo, hi)) == augmented.range_aggregate(lo, hi)
+
+    print(f"keys: {len(augmented):,}, writes: {args.ops:,}, queries: {args.queries:,}")
+    print(f"{'':<30}{'per op':>12}{'ops / s':>14}")
+    rows = [
+        ("writes, plain tree", plain_writes, args.ops),
+        ("writes, aggregate tree", aggregate_writes, args.ops),
+        ("writes, tree + Fenwick", fenwick_writes, args.ops),
+        ("prefix sum, aggregate tree", aggregate_prefix, len(prefixes)),
+        ("prefix sum, Fenwick", fenwick_prefix, len(prefixes)),
+        ("range sum, aggregate tree", aggregate_range, len(ranges)),
+        ("range sum, Fenwick", fenwick_range, len(ranges)),
+        ("range sum, scan", scan_range, len(scans)),
+    ]
+    for name, seconds, count in rows:
+        print(f"{name:<30}{seconds / count * 1e6:>10.2f}us{count / seconds:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
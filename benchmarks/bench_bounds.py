@@ -0,0 +1,84 @@
+"""
+    Times nearest key queries for keys that are mostly not in the tree.
+
+    The tree holds N timestamps with gaps between them, and every query is a
+    random time. floor and ceiling each take one walk down the tree. Before
+    them the same answer took a count_range for the number of keys at or
+    below the time, then a select for the key at that rank, two walks in all.
+    The batched floor_many is timed on the same queries, both as given and
+    sorted, next to calling floor in a loop. find_predecessor and
+    find_successor, now a single walk each, are timed on keys that exist.
+
+    usage: python benchmarks/bench_bounds.py [--size N] [--queries Q]
+"""
+
+import argparse
+import random
+import time
+
+import common  # noqa: F401, puts the project on sys.path
+from redblacktree import RedBlackTree
+
+
+# the floor through ranks, the way it had to be done before floor existed
+def floor_by_rank(tree, key):
+    count = tree.count_range(None, key)
+    return tree.select(count - 1) if count else None
+
+
+# the ceiling through ranks, the way it had to be done before ceiling existed
+def ceiling_by_rank(tree, key):
+    count = tree.count_range(None, key, (True, False))
+    return tree.select(count) if count < len(tree) else None
+
+
+def best_of(repeats, run):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    stamps = sorted(rng.sample(range(args.size * 20), args.size))
+    tree = RedBlackTree.from_sorted((stamp, stamp) for stamp in stamps)
+    queries = [rng.randrange(args.size * 20) for _ in range(args.queries)]
+    ordered = sorted(queries)
+    present = [rng.choice(stamps) for _ in range(args.queries)]
+
+    floors = [tree.floor(q) for q in queries]
+    assert floors == [floor_by_rank(tree, q) for q in queries]
+    assert [tree.ceiling(q) for q in queries] == [ceiling_by_rank(tree, q) for q in queries]
+    assert tree.floor_many(queries) == floors
+
+    rows = [
+        ("floor", lambda: [tree.floor(q) for q in queries]),
+        ("floor by rank", lambda: [floor_by_rank(tree, q) for q in queries]),
+        ("ceiling", lambda: [tree.ceiling(q) for q in queries]),
+        ("ceiling by rank", lambda: [ceiling_by_rank(tree, q) for q in queries]),
+        ("nearest", lambda: [tree.nearest(q) for q in queries]),
+        ("floor_many, unsorted", lambda: tree.floor_many(queries)),
+        ("floor_many, sorted", lambda: tree.floor_many(ordered)),
+        ("floor loop, sorted", lambda: [tree.floor(q) for q in ordered]),
+        ("find_predecessor", lambda: [tree.find_predecessor(k) for k in present]),
+        ("find_successor", lambda: [tree.find_successor(k) for k in present]),
+    ]
+    print(f"keys: {args.size:,}, queries: {args.queries:,}")
+    print(f"{'':<24}{'per query':>12}{'queries / s':>14}")
+    for name, run in rows:
+        seconds = best_of(args.repeat, run)
+        print(f"{name:<24}{seconds / args.queries * 1e6:>10.2f}us{args.queries / seconds:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+    Compares BPlusTree with RedBlackTree, head to head at several sizes.
+
+    At every size N, both trees get the same N random int keys through put,
+    then get, find_rank, select, find_successor and delete (of half the keys)
+    are timed on each, N operations apiece (N / 2 for delete), and the answers
+    are checked to match. --fanout sets the block size of the BPlusTree, and
+    --strings uses str keys, which cost more to compare.
+
+    usage: python benchmarks/bench_bplustree.py [--sizes 10000,100000,1000000] [--fanout F] [--strings]
+"""
+
+import argparse
+import random
+import time
+
+import common  # noqa: F401, puts the project on sys.path
+from bplustree import BPlusTree
+from redblacktree import RedBlackTree
+
+OPERATIONS = ("put", "get", "find_rank", "select", "find_successor", "delete")
+
+
+def timed(action, inputs):
+    start = time.perf_counter()
+    answers = [action(item) for item in inputs]
+    return time.perf_counter() - start, answers
+
+
+# runs every operation on a tree, returning the seconds and the answers of each
+def run(tree, keys, lookups, ranks):
+    seconds = {}
+    answers = {}
+    seconds["put"], _ = timed(lambda k: tree.put(k, k), keys)
+    for name, inputs in (("get", lookups), ("find_rank", lookups), ("select", ranks), ("find_successor", lookups)):
+        seconds[name], answers[name] = timed(getattr(tree, name), inputs)
+    seconds["delete"], answers["delete"] = timed(tree.delete, keys[::2])
+    return seconds, answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma separated tree sizes")
+    parser.add_argument("--fanout", type=int, default=BPlusTree.FANOUT)
+    parser.add_argument("--strings", action="store_true", help="use str keys instead of ints")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"microseconds per operation, BPlusTree fanout {args.fanout}")
+    print(f"{'size':>10}  {'operation':<16}{'RedBlackTree':>14}{'BPlusTree':>12}{'speedup':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        rng = random.Random(args.seed)
+        keys = rng.sample(range(size * 10), size)
+        if args.strings:
+            keys = [f"key-{k:012d}" for k in keys]
+        lookups = [rng.choice(keys) for _ in range(size)]
+        ranks = [rng.randrange(size) for _ in range(size)]
+
+        plain, plain_answers = run(RedBlackTree(), keys, lookups, ranks)
+        wide, wide_answers = run(BPlusTree(args.fanout), keys, lookups, ranks)
+        if plain_answers != wide_answers:
+            raise SystemExit(f"the trees gave different answers at size {size:,}")
+        for op in OPERATIONS:
+            count = size // 2 if op == "delete" else size
+            a = plain[op] / count * 1e6
+            b = wide[op] / count * 1e6
+            print(f"{size:>10,}  {op:<16}{a:>14.2f}{b:>12.2f}{a / b:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
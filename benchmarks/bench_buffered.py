@@ -0,0 +1,116 @@
+"""
+    Compares BufferedRedBlackTree with calling put / delete on RedBlackTree.
+
+    Ingest: a tree is preloaded with P keys, then a burst of W writes (four
+    puts to every delete, on keys drawn with a hot set so some repeat) goes
+    in, directly or through the buffer at several buffer sizes. The time
+    includes the final flush, and is printed as writes per second.
+
+    Read after write: a put is followed straight away by a get of the same
+    key, and separately by a get of a key that was not just written (which
+    the buffer sends to the tree). Each pair is timed as one operation. Last,
+    the time of the first ordered query after a burst, which has to flush the
+    buffer first, is printed.
+
+    usage: python benchmarks/bench_buffered.py [--preload P] [--writes W] [--buffers 1024,16384,65536]
+"""
+
+import argparse
+import random
+import time
+
+import common  # noqa: F401, puts the project on sys.path
+from bufferedtree import BufferedRedBlackTree
+from redblacktree import RedBlackTree
+
+
+# makes the write burst: (key, value) puts and (key,) deletes, a tenth of the keys
+# drawn from a small hot set
+def writes(count, key_space, rng):
+    hot = [rng.randrange(key_space) for _ in range(max(key_space // 1000, 1))]
+    ops = []
+    for i in range(count):
+        key = rng.choice(hot) if rng.random() < 0.1 else rng.randrange(key_space)
+        ops.append((key,) if i % 5 == 4 else (key, i))
+    return ops
+
+
+def ingest(tree, ops):
+    put = tree.put
+    delete = tree.delete
+    start = time.perf_counter()
+    for op in ops:
+        if len(op) == 2:
+            put(op[0], op[1])
+        else:
+            delete(op[0])
+    if isinstance(tree, BufferedRedBlackTree):
+        tree.flush()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preload", type=int, default=200_000)
+    parser.add_argument("--writes", type=int, default=500_000)
+    parser.add_argument("--buffers", default="1024,16384,65536", help="comma separated buffer sizes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    key_space = max(args.preload, args.writes) * 4
+    preload = [(key, key) for key in sorted(rng.sample(range(key_space), args.preload))]
+    ops = writes(args.writes, key_space, rng)
+    sizes = [int(size) for size in args.buffers.split(",")]
+
+    def fresh(buffer_size = None):
+        tree = RedBlackTree.from_sorted(preload)
+        return tree if buffer_size is None else BufferedRedBlackTree(tree, buffer_size)
+
+    print(f"ingest: {args.writes:,} writes into {args.preload:,} keys")
+    reference = fresh()
+    seconds = ingest(reference, ops)
+    print(f"  {'direct put / delete':<28}{args.writes / seconds:>12,.0f} writes / s")
+    expected = list(reference.items())
+    for size in sizes:
+        buffered = fresh(size)
+        seconds = ingest(buffered, ops)
+        if list(buffered.items()) != expected:
+            raise SystemExit(f"buffer size {size:,} ended with different pairs")
+        print(f"  {f'buffered, {size:,} keys':<28}{args.writes / seconds:>12,.0f} writes / s")
+
+    count = min(args.writes, 100_000)
+    written = [rng.randrange(key_space) for _ in range(count)]
+    other = [key for key, _ in rng.sample(preload, min(count, len(preload)))]
+    print(f"\nread after write, microseconds per put + get ({count:,} pairs)")
+    print(f"  {'':<28}{'same key':>10}{'other key':>11}")
+    for name, make in [("direct", fresh)] + [(f"buffered, {size:,} keys", lambda s=size: fresh(s)) for size in sizes]:
+        row = []
+        for reads in (written, other):
+            tree = make()
+            put = tree.put
+            get = tree.get
+            start = time.perf_counter()
+            for key, read in zip(written, reads):
+                put(key, key)
+                get(read)
+            row.append((time.perf_counter() - start) / len(reads) * 1e6)
+        print(f"  {name:<28}{row[0]:>10.2f}{row[1]:>11.2f}")
+
+    print("\nfirst ordered query (floor) after the burst, flush included")
+    for size in sizes:
+        tree = fresh(max(size, args.writes + 1)) # big enough that nothing flushes early
+        ingest_ops = ops[:size]
+        for op in ingest_ops:
+            if len(op) == 2:
+                tree.put(op[0], op[1])
+            else:
+                tree.delete(op[0])
+        pending = tree.pending()
+        start = time.perf_counter()
+        tree.floor(key_space // 2)
+        print(f"  {f'{pending:,} buffered keys':<28}"
+              f"{(time.perf_counter() - start) * 1e3:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
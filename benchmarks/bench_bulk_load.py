@@ -0,0 +1,65 @@
+"""
+    Compares the ways of filling a RedBlackTree: one put per key, the linear
+    from_sorted / from_items builders, and put_many into a tree that already
+    holds half of the keys.
+
+    usage: python benchmarks/bench_bulk_load.py [--sizes N [N ...]] [--seed S]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from redblacktree import RedBlackTree
+
+
+def timed(action):
+    start = time.perf_counter()
+    action()
+    return time.perf_counter() - start
+
+
+def repeated_put(items):
+    tree = RedBlackTree()
+    for key, value in items:
+        tree.put(key, value)
+
+
+def half_then_put_many(first, second):
+    tree = RedBlackTree.from_items(first)
+    return lambda: tree.put_many(second)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"{'size':>10} {'workload':<26} {'seconds':>9} {'speedup':>8}")
+    for size in args.sizes:
+        ordered = [(key, key) for key in range(size)]
+        shuffled = ordered[:]
+        rng.shuffle(shuffled)
+        odd_half = shuffled[: size // 2]
+        even_half = shuffled[size // 2 :]
+
+        baseline = timed(lambda: repeated_put(ordered))
+        results = [
+            ("put x n (sorted)", baseline),
+            ("put x n (shuffled)", timed(lambda: repeated_put(shuffled))),
+            ("from_sorted", timed(lambda: RedBlackTree.from_sorted(ordered))),
+            ("from_items (shuffled)", timed(lambda: RedBlackTree.from_items(shuffled))),
+            ("put_many (half into half)", timed(half_then_put_many(odd_half, even_half))),
+        ]
+        for name, seconds in results:
+            print(f"{size:>10} {name:<26} {seconds:>9.3f} {baseline / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
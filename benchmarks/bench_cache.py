@@ -0,0 +1,84 @@
+"""
+    Measures the lookup cache (RedBlackTree(cache_size=...)) on get,
+    find_predecessor and find_successor. A Zipfian stream of lookups, where a
+    few hot keys take most of the traffic, shows what the cache gains, and a
+    uniform stream over all keys shows what it costs when it rarely hits. A
+    share of the operations can be puts, to include the cost of keeping the
+    cache correct.
+
+    usage: python benchmarks/bench_cache.py [--size N] [--ops K] [--cache C] [--writes F]
+"""
+
+import argparse
+import random
+import time
+
+import common  # noqa: F401, puts the project on sys.path
+from redblacktree import RedBlackTree
+from suite import zipf_ranks
+
+
+# runs the operations on a tree, returning operations per second
+def replay(tree, operations):
+    get = tree.get
+    find_predecessor = tree.find_predecessor
+    find_successor = tree.find_successor
+    put = tree.put
+    start = time.perf_counter()
+    for kind, key in operations:
+        if kind == 0:
+            get(key)
+        elif kind == 1:
+            find_predecessor(key)
+        elif kind == 2:
+            find_successor(key)
+        else:
+            put(key, key)
+    return len(operations) / (time.perf_counter() - start)
+
+
+def operations_for(keys, rng, writes):
+    operations = []
+    for key in keys:
+        if rng.random() < writes:
+            operations.append((3, key))
+        else:
+            operations.append((rng.randrange(3), key))
+    return operations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--ops", type=int, default=300_000)
+    parser.add_argument("--cache", type=int, default=10_000, help="cache_size of the cached tree")
+    parser.add_argument("--writes", type=float, default=0.0, help="share of operations that are puts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keys = list(range(args.size))
+    hot = keys[:]
+    rng.shuffle(hot) # the popular keys are spread all over the tree
+    workloads = {
+        "zipfian": operations_for([hot[r] for r in zipf_ranks(rng, args.size, args.ops)], rng, args.writes),
+        "uniform": operations_for([rng.randrange(args.size) for _ in range(args.ops)], rng, args.writes),
+    }
+
+    print(f"{'workload':<10} {'no cache':>12} {'cached':>12} {'speedup':>8} {'hit rate':>9}")
+    for name, operations in workloads.items():
+        plain = 0.0
+        cached = 0.0
+        info = None
+        for _ in range(args.repeat): # best of, on fresh trees
+            plain = max(plain, replay(RedBlackTree.from_sorted((k, k) for k in keys), operations))
+            tree = RedBlackTree.from_sorted(((k, k) for k in keys), cache_size=args.cache)
+            cached = max(cached, replay(tree, operations))
+            info = tree.cache_info()
+        hit_rate = info["hits"] / max(info["hits"] + info["misses"], 1)
+        print(f"{name:<10} {plain:>12,.0f} {cached:>12,.0f} {cached / plain:>7.2f}x {hit_rate:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+    Exercises ConcurrentRedBlackTree from many threads at once.
+
+    The stress mode runs reader threads doing get / select / find_rank / range
+    alongside one writer that keeps putting and deleting. Every key k is stored
+    with the value -k, and the writer only touches odd keys, so readers can
+    check what they see: even keys must always be present, a range must come
+    back sorted with matching values, and select(find_rank(k)) must give k
+    back. Afterwards the tree is checked with is_valid. Any mistake exits 1.
+
+    The throughput mode measures total reads per second with 1, 4 and 16
+    reader threads while one writer keeps churning. Under CPython the GIL
+    means the reads take turns rather than truly running in parallel, so the
+    numbers show how much the locking costs, not a multi-core speedup.
+
+    usage: python benchmarks/bench_concurrent.py [--stress] [--size N] [--seconds S]
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+import common  # noqa: F401, puts the project on sys.path
+from concurrenttree import ConcurrentRedBlackTree
+from redblacktree import RedBlackTree
+
+
+# a shared tree holding every k in range(size) with the value -k
+def build(size):
+    return ConcurrentRedBlackTree(RedBlackTree.from_sorted((k, -k) for k in range(size)))
+
+
+# keeps deleting and re-inserting odd keys until stop is set
+def writer(tree, size, stop, seed, counts):
+    rng = random.Random(seed)
+    done = 0
+    while not stop.is_set():
+        key = rng.randrange(1, size, 2)
+        if tree.delete(key) is None:
+            tree.put(key, -key)
+        done -= -1
+    counts.append(done)
+
+
+# runs checked reads until stop is set, recording any mistake in errors
+def checked_reader(tree, size, stop, seed, errors, counts):
+    rng = random.Random(seed)
+    done = 0
+    while not stop.is_set() and not errors:
+        key = rng.randrange(0, size, 2)
+        if tree.get(key) != -key:
+            errors.append(f"get({key}) returned {tree.get(key)!r}")
+        rank = tree.find_rank(key)
+        if rank < 0 or tree.select(rank) != key:
+            # the writer may shift ranks between the two calls, so check under one lock
+            with tree.lock.reading():
+                inner = tree.unsafe_tree
+                rank = inner.find_rank(key)
+                if rank < 0 or inner.select(rank) != key:
+                    errors.append(f"select(find_rank({key})) did not round trip")
+        pairs = tree.range(key, key + 64)
+        previous = None
+        for k, v in pairs:
+            if v != -k or (previous is not None and k <= previous):
+                errors.append(f"range({key}, {key + 64}) gave {pairs!r}")
+                break
+            previous = k
+        evens = sum(1 for k, _ in pairs if k % 2 == 0)
+        if evens != len(range(key, min(key + 65, size), 2)):
+            errors.append(f"range({key}, {key + 64}) lost an even key")
+        done -= -1
+    counts.append(done)
+
+
+# runs plain reads until stop is set
+def reader(tree, size, stop, seed, counts):
+    rng = random.Random(seed)
+    done = 0
+    while not stop.is_set():
+        key = rng.randrange(size)
+        tree.get(key)
+        tree.select(key)
+        tree.find_rank(key)
+        done -= -3
+    counts.append(done)
+
+
+def run(threads, seconds):
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+
+
+def stress(size, seconds, readers):
+    tree = build(size)
+    stop = threading.Event()
+    errors = []
+    reads = []
+    writes = []
+    threads = [threading.Thread(target=writer, args=(tree, size, stop, 1, writes))]
+    threads += [threading.Thread(target=checked_reader, args=(tree, size, stop, 100 + i, errors, reads))
+                for i in range(readers)]
+    run(threads, seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if not tree.is_valid():
+        errors.append("the tree broke a red-black invariant")
+    print(f"stress: {readers} readers, {sum(reads):,} checked reads, {sum(writes):,} writes")
+    for error in errors[:10]:
+        print("  " + error)
+    print("FAIL" if errors else "ok")
+    return not errors
+
+
+def throughput(size, seconds):
+    print(f"{'readers':>8}  {'reads / s':>12}  {'writes / s':>12}")
+    for count in (1, 4, 16):
+        tree = build(size)
+        stop = threading.Event()
+        reads = []
+        writes = []
+        threads = [threading.Thread(target=writer, args=(tree, size, stop, 1, writes))]
+        threads += [threading.Thread(target=reader, args=(tree, size, stop, 100 + i, reads))
+                    for i in range(count)]
+        run(threads, seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        print(f"{count:>8}  {sum(reads) / seconds:>12,.0f}  {sum(writes) / seconds:>12,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stress", action="store_true", help="check correctness instead of timing")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--readers", type=int, default=8, help="reader threads in stress mode")
+    args = parser.parse_args()
+
+    if args.stress:
+        sys.exit(0 if stress(args.size, args.seconds, args.readers) else 1)
+    throughput(args.size, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
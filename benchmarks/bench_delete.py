@@ -0,0 +1,56 @@
+"""
+    Measures delete throughput on a churn workload: a tree of N keys where
+    every step deletes a random present key and inserts a fresh one, so the
+    size stays constant. Pass --baseline with the path to another copy of
+    redblacktree.py (for example one exported with git show) to compare.
+
+    usage: python benchmarks/bench_delete.py [--size N] [--ops K] [--baseline FILE]
+"""
+
+import argparse
+import random
+import time
+
+from common import current_module, load_module
+
+
+def churn(module, size, ops, seed):
+    rng = random.Random(seed)
+    tree = module.RedBlackTree()
+    keys = list(range(size))
+    rng.shuffle(keys)
+    for key in keys:
+        tree.put(key, key)
+
+    next_key = size
+    spent = 0.0
+    for _ in range(ops):
+        slot = rng.randrange(size)
+        victim = keys[slot]
+        start = time.perf_counter()
+        tree.delete(victim)
+        spent += time.perf_counter() - start
+        tree.put(next_key, next_key)
+        keys[slot] = next_key
+        next_key += 1
+    return ops / spent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--ops", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="path to another redblacktree.py to compare against")
+    args = parser.parse_args()
+
+    rate = churn(current_module(), args.size, args.ops, args.seed)
+    print(f"current:  {rate:>12,.0f} deletes / s")
+    if args.baseline:
+        old_rate = churn(load_module(args.baseline, "baseline_tree"), args.size, args.ops, args.seed)
+        print(f"baseline: {old_rate:>12,.0f} deletes / s")
+        print(f"speedup:  {rate / old_rate:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
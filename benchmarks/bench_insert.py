@@ -0,0 +1,48 @@
+"""
+    Measures put throughput for random and sequential keys at several tree
+    sizes. Pass --baseline with the path to another copy of redblacktree.py
+    (for example one exported with git show) to compare against it.
+
+    usage: python benchmarks/bench_insert.py [--sizes N [N ...]] [--baseline FILE]
+"""
+
+import argparse
+import random
+
+from common import current_module, load_module, timed
+
+
+def fill(module, keys):
+    tree = module.RedBlackTree()
+    put = tree.put
+    for key in keys:
+        put(key, key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="path to another redblacktree.py to compare against")
+    args = parser.parse_args()
+
+    modules = [("current", current_module())]
+    if args.baseline:
+        modules.append(("baseline", load_module(args.baseline, "baseline_tree")))
+
+    print(f"{'size':>10} {'keys':<11} {'module':<9} {'puts / s':>12}")
+    for size in args.sizes:
+        sequential = list(range(size))
+        shuffled = sequential[:]
+        random.Random(args.seed).shuffle(shuffled)
+        for order, keys in (("sequential", sequential), ("random", shuffled)):
+            rates = {}
+            for name, module in modules:
+                rates[name] = size / timed(lambda: fill(module, keys))
+                print(f"{size:>10} {order:<11} {name:<9} {rates[name]:>12,.0f}")
+            if "baseline" in rates:
+                print(f"{'':>10} {'':<11} {'speedup':<9} {rates['current'] / rates['baseline']:>11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+    Times JournaledRedBlackTree writes under each sync policy, and recovery.
+
+    Writes: W random puts and deletes go through the journal with sync set to
+    always, group and none, and the writes per second are printed next to a
+    plain RedBlackTree doing the same. The fsync cost depends entirely on the
+    disk under --dir.
+
+    Recovery: a journal of R records (puts and deletes over K distinct keys)
+    is written with sync=none and no compaction, then the directory is opened
+    again and the recovery is timed. Recovery keeps the last record of every
+    key, sorts them and builds the tree in one pass. With --replay, the same
+    records are also applied one put / delete at a time, for comparison.
+
+    usage: python benchmarks/bench_journal.py [--writes W] [--records R] [--keys K] [--replay] [--dir D]
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+import common  # noqa: F401, puts the project on sys.path
+from journaledtree import JournaledRedBlackTree
+from redblacktree import RedBlackTree
+
+
+# makes count random operations over the keys: (key, value) puts, one in five a (key,) delete
+def operations(count, keys, rng):
+    for i in range(count):
+        key = rng.randrange(keys)
+        yield (key,) if i % 5 == 4 else (key, i)
+
+
+def apply(tree, ops):
+    start = time.perf_counter()
+    for op in ops:
+        if len(op) == 2:
+            tree.put(op[0], op[1])
+        else:
+            tree.delete(op[0])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=100_000, help="writes timed under each sync policy")
+    parser.add_argument("--always", type=int, default=2_000, help="writes timed with sync=always, one fsync each")
+    parser.add_argument("--records", type=int, default=10_000_000, help="journal records replayed on recovery")
+    parser.add_argument("--keys", type=int, default=1_000_000, help="distinct keys the records fall on")
+    parser.add_argument("--replay", action="store_true", help="also time applying the records one by one")
+    parser.add_argument("--dir", default=None, help="where the journals go (default: a temporary directory)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(dir=args.dir)
+    try:
+        ops = list(operations(args.writes, args.keys, random.Random(args.seed)))
+        print(f"{'writes':<24}{'writes / s':>14}{'us / write':>12}")
+        count = len(ops)
+        seconds = apply(RedBlackTree(), ops)
+        print(f"{'RedBlackTree, no journal':<24}{count / seconds:>14,.0f}{seconds / count * 1e6:>12.2f}")
+        for policy in ("always", "group", "none"):
+            timed = ops[:args.always] if policy == "always" else ops
+            directory = tempfile.mkdtemp(dir=root)
+            journal = JournaledRedBlackTree(directory, sync=policy)
+            seconds = apply(journal, timed)
+            journal.close() # waits for compactions, so they count too
+            print(f"{'sync=' + policy:<24}{len(timed) / seconds:>14,.0f}{seconds / len(timed) * 1e6:>12.2f}")
+
+        directory = tempfile.mkdtemp(dir=root)
+        ops = operations(args.records, args.keys, random.Random(args.seed))
+        start = time.perf_counter()
+        with JournaledRedBlackTree(directory, sync="none", group_size=4096, compact_bytes=float("inf")) as journal:
+            apply(journal, ops)
+            pairs = len(journal)
+        print(f"\nwrote {args.records:,} records over {args.keys:,} keys in {time.perf_counter() - start:.1f}s")
+
+        journal = JournaledRedBlackTree(directory)
+        print(f"recovery: {journal.recovery['seconds']:.2f}s, {journal.recovery['records']:,} records, "
+              f"{journal.recovery['pairs']:,} pairs")
+        assert journal.recovery["pairs"] == pairs
+        journal.close()
+        if args.replay:
+            start = time.perf_counter()
+            for _ in operations(args.records, args.keys, random.Random(args.seed)):
+                pass
+            making = time.perf_counter() - start # taken off, the records are made on the fly
+            seconds = apply(RedBlackTree(), operations(args.records, args.keys, random.Random(args.seed)))
+            print(f"one put / delete per record: {seconds - making:.2f}s")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+    Times RedBlackTree(key=...) against keys that compare themselves.
+
+    Tuple keys: market ticks ordered by (symbol, timestamp, sequence), as
+      - Tick objects whose __lt__ / __eq__ compare those tuples in Python,
+      - the same objects with key=attrgetter("symbol", "timestamp", "sequence"),
+        so the tree compares plain tuples,
+      - the same objects with a key that packs them into one int, with the
+        symbols interned to small numbers in sorted order,
+      - and plain tuples with no key function, for reference.
+    String keys: names ordered without regard to case, as a str subclass that
+    casefolds in __lt__ / __eq__, against plain str keys with key=str.casefold.
+
+    Every variant gets the same N keys through put, then get, find_rank and
+    delete (of half the keys) are timed, and the orders are checked to match.
+
+    usage: python benchmarks/bench_key.py [--size N]
+"""
+
+import argparse
+import random
+import time
+from operator import attrgetter
+
+import common  # noqa: F401, puts the project on sys.path
+from redblacktree import RedBlackTree
+
+
+class Tick:
+    __slots__ = ("symbol", "timestamp", "sequence")
+
+    def __init__(self, symbol, timestamp, sequence):
+        self.symbol = symbol
+        self.timestamp = timestamp
+        self.sequence = sequence
+
+    def __lt__(self, other):
+        return (self.symbol, self.timestamp, self.sequence) < (other.symbol, other.timestamp, other.sequence)
+
+    def __gt__(self, other):
+        return other < self
+
+    def __eq__(self, other):
+        return (self.symbol, self.timestamp, self.sequence) == (other.symbol, other.timestamp, other.sequence)
+
+    def __hash__(self):
+        return hash((self.symbol, self.timestamp, self.sequence))
+
+
+class CaselessStr(str):
+    __slots__ = ()
+
+    def __lt__(self, other):
+        return self.casefold() < other.casefold()
+
+    def __gt__(self, other):
+        return other.casefold() < self.casefold()
+
+    def __eq__(self, other):
+        return self.casefold() == other.casefold()
+
+    __hash__ = str.__hash__
+
+
+# returns a key function packing a tick into one int: symbol number, then 40 bits
+# of timestamp, then 24 of sequence
+def packed(symbols):
+    number = {symbol: i for i, symbol in enumerate(sorted(symbols))}
+
+    def key(tick):
+        return (number[tick.symbol] << 64) | (tick.timestamp << 24) | tick.sequence
+    return key
+
+
+def timed(action, inputs):
+    start = time.perf_counter()
+    for item in inputs:
+        action(item)
+    return time.perf_counter() - start
+
+
+# times put, get, find_rank and delete, returning microseconds per operation
+def run(make, keys, lookups):
+    tree = make()
+    results = {"put": timed(lambda k: tree.put(k, None), keys) / len(keys)}
+    results["get"] = timed(tree.get, lookups) / len(lookups)
+    results["find_rank"] = timed(tree.find_rank, lookups) / len(lookups)
+    order = list(tree)
+    results["delete"] = timed(tree.delete, keys[::2]) / len(keys[::2])
+    return {op: seconds * 1e6 for op, seconds in results.items()}, order
+
+
+def report(title, variants, keys_of, lookups_of):
+    print(title)
+    print(f"  {'':<34}{'put':>8}{'get':>8}{'rank':>8}{'delete':>8}  (us)")
+    orders = []
+    for name, make, which in variants:
+        times, order = run(make, keys_of[which], lookups_of[which])
+        orders.append([str(k) if isinstance(k, str) else k for k in order])
+        print(f"  {name:<34}" + "".join(f"{times[op]:>8.2f}" for op in ("put", "get", "find_rank", "delete")))
+    return orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    symbols = [f"SYM{i:03d}" for i in range(200)]
+    raw = list({(rng.choice(symbols), rng.randrange(2 ** 40), rng.randrange(2 ** 24)) for _ in range(args.size)})
+    ticks = [Tick(*t) for t in raw]
+    picks = [rng.randrange(len(raw)) for _ in range(len(raw))]
+    keys_of = {"ticks": ticks, "tuples": raw}
+    lookups_of = {"ticks": [ticks[i] for i in picks], "tuples": [raw[i] for i in picks]}
+    fields = attrgetter("symbol", "timestamp", "sequence")
+    orders = report(f"{len(raw):,} tuple keys", [
+        ("Tick, compares itself", RedBlackTree, "ticks"),
+        ("Tick, key=attrgetter(...)", lambda: RedBlackTree(key=fields), "ticks"),
+        ("Tick, key=packed int", lambda: RedBlackTree(key=packed(symbols)), "ticks"),
+        ("plain tuple, no key", RedBlackTree, "tuples"),
+    ], keys_of, lookups_of)
+    if any([fields(t) for t in order] != orders[-1] for order in orders[:-1]):
+        raise SystemExit("the tuple key orders differ")
+
+    words = list({"".join(rng.choice("abcdefghij") for _ in range(12)) for _ in range(args.size)})
+    words = [w.upper() if i % 3 == 0 else w for i, w in enumerate(words)]
+    words = list({w.casefold(): w for w in words}.values())
+    picks = [rng.randrange(len(words)) for _ in range(len(words))]
+    caseless = [CaselessStr(w) for w in words]
+    keys_of = {"caseless": caseless, "plain": words}
+    lookups_of = {"caseless": [caseless[i] for i in picks], "plain": [words[i] for i in picks]}
+    orders = report(f"\n{len(words):,} string keys, ignoring case", [
+        ("str subclass, casefolds itself", RedBlackTree, "caseless"),
+        ("str, key=str.casefold", lambda: RedBlackTree(key=str.casefold), "plain"),
+    ], keys_of, lookups_of)
+    if orders[0] != orders[1]:
+        raise SystemExit("the string key orders differ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+    Measures the memory cost of RedBlackTree nodes, reported as bytes per
+    entry. The current slotted Node is compared against the original layout,
+    where every node carried class-level defaults and a per-instance __dict__.
+
+    usage: python benchmarks/bench_memory.py [--size N] [--seed S]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from redblacktree import RedBlackTree
+
+
+# copy of the original node layout, kept here only for comparison
+class LegacyNode:
+    is_black = False
+    key = None
+    value = None
+    size = 0
+
+    left_child = None
+    right_child = None
+
+    def __init__(self, k, v, s = 0,  is_bl = False):
+        self.is_black = is_bl
+        self.key = k
+        self.value = v
+        self.size = s
+
+
+# rebuilds the shape of a tree out of legacy nodes, without recursion
+def copy_to_legacy(root):
+    if root is None:
+        return None
+    new_root = LegacyNode(root.key, root.value, root.size, root.is_black)
+    stack = [(root, new_root)]
+    while stack:
+        old, new = stack.pop()
+        if old.left_child:
+            child = old.left_child
+            new.left_child = LegacyNode(child.key, child.value, child.size, child.is_black)
+            stack.append((child, new.left_child))
+        if old.right_child:
+            child = old.right_child
+            new.right_child = LegacyNode(child.key, child.value, child.size, child.is_black)
+            stack.append((child, new.right_child))
+    return new_root
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # keys double as values, and are created up front so only nodes are counted
+    keys = list(range(args.size))
+    random.Random(args.seed).shuffle(keys)
+
+    def build_tree():
+        tree = RedBlackTree()
+        for key in keys:
+            tree.put(key, key)
+        return tree
+
+    tree, slotted = measure(build_tree)
+    legacy_root, legacy = measure(lambda: copy_to_legacy(tree.root))
+
+    print(f"entries:               {args.size}")
+    print(f"legacy bytes / entry:  {legacy / args.size:.1f}")
+    print(f"slotted bytes / entry: {slotted / args.size:.1f}")
+    print(f"saved:                 {1 - slotted / legacy:.1%}")
+
+
+if __name__ == "__main__":
+    main()
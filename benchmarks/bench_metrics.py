@@ -0,0 +1,74 @@
+"""
+    Measures what instrumentation costs. The same puts, gets and deletes run
+    on a plain RedBlackTree and on one built with metrics=TreeMetrics(). Pass
+    --baseline with another copy of redblacktree.py (for example one exported
+    with git show from before the hooks existed) to check that a plain tree is
+    no slower than before. --prometheus prints the collected metrics.
+
+    usage: python benchmarks/bench_metrics.py [--size N] [--baseline FILE] [--prometheus]
+"""
+
+import argparse
+import random
+import time
+
+from common import current_module, load_module
+from treemetrics import TreeMetrics
+
+
+# runs the workload, returning operations per second for put, get and delete
+def workload(make_tree, keys, lookups, repeat):
+    best = {"put": 0.0, "get": 0.0, "delete": 0.0}
+    tree = None
+    for _ in range(repeat):
+        tree = make_tree()
+        put = tree.put
+        get = tree.get
+        delete = tree.delete
+        start = time.perf_counter()
+        for key in keys:
+            put(key, key)
+        best["put"] = max(best["put"], len(keys) / (time.perf_counter() - start))
+        start = time.perf_counter()
+        for key in lookups:
+            get(key)
+        best["get"] = max(best["get"], len(lookups) / (time.perf_counter() - start))
+        start = time.perf_counter()
+        for key in keys:
+            delete(key)
+        best["delete"] = max(best["delete"], len(keys) / (time.perf_counter() - start))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="path to another redblacktree.py to compare against")
+    parser.add_argument("--prometheus", action="store_true", help="print the metrics collected")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keys = list(range(args.size))
+    rng.shuffle(keys)
+    lookups = [rng.randrange(args.size) for _ in range(args.size)]
+
+    module = current_module()
+    metrics = TreeMetrics()
+    runs = {"plain": workload(module.RedBlackTree, keys, lookups, args.repeat)}
+    runs["instrumented"] = workload(lambda: module.RedBlackTree(metrics=metrics), keys, lookups, args.repeat)
+    if args.baseline:
+        old = load_module(args.baseline, "baseline_tree")
+        runs["baseline"] = workload(old.RedBlackTree, keys, lookups, args.repeat)
+
+    print(f"{'tree':<14} {'put / s':>12} {'get / s':>12} {'delete / s':>12}")
+    for name, rates in runs.items():
+        print(f"{name:<14} {rates['put']:>12,.0f} {rates['get']:>12,.0f} {rates['delete']:>12,.0f}")
+    if args.prometheus:
+        print()
+        print(metrics.to_prometheus(), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+    Compares NumericRedBlackTree on its compiled backend with RedBlackTree.
+
+    Both trees get the same N random int (or float) keys, then get, put,
+    delete and select are timed on each. Before timing, a random mix of every
+    operation is run on both trees and on the pure Python fallback of
+    NumericRedBlackTree, and every answer is checked against RedBlackTree.
+    Any difference exits 1. Build the backend first with:
+
+        python setup.py build_ext --inplace
+
+    usage: python benchmarks/bench_native.py [--size N] [--float]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import common  # noqa: F401, puts the project on sys.path
+from numerictree import NATIVE, NumericRedBlackTree
+from redblacktree import RedBlackTree
+
+
+# runs the same random operations on every tree, returning the first difference found
+def cross_check(trees, keys, rng, steps):
+    reference = trees[0]
+    for step in range(steps):
+        key = rng.choice(keys)
+        if rng.random() < 0.5:
+            for tree in trees:
+                tree.put(key, step)
+        else:
+            answers = [tree.delete(key) for tree in trees]
+            if any(answer != answers[0] for answer in answers):
+                return f"delete({key!r}) gave {answers}"
+        if step % 1000 == 0:
+            for name, args in (("get", (key,)), ("find_rank", (key,)), ("select", (step % 97,)),
+                               ("floor", (key,)), ("find_successor", (key,)), ("count_range", (key, None))):
+                answers = [getattr(tree, name)(*args) for tree in trees]
+                if any(answer != answers[0] for answer in answers):
+                    return f"{name}{args} gave {answers}"
+    for tree in trees[1:]:
+        if list(tree.items()) != list(reference.items()) or not tree.is_valid():
+            return "the trees ended up holding different pairs"
+    return None
+
+
+def timed(action, inputs):
+    start = time.perf_counter()
+    for item in inputs:
+        action(item)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--float", action="store_true", help="use float keys instead of ints")
+    parser.add_argument("--check", type=int, default=20_000, help="random operations cross-checked first")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if not NATIVE:
+        sys.exit("the _rbtnative extension is not built, run: python setup.py build_ext --inplace")
+
+    key_type = float if args.float else int
+    rng = random.Random(args.seed)
+    keys = [key_type(k) for k in rng.sample(range(args.size * 10), args.size)]
+
+    error = cross_check([RedBlackTree(), NumericRedBlackTree(key_type), NumericRedBlackTree(key_type, native=False)],
+                        keys[:5000], random.Random(args.seed), args.check)
+    if error:
+        print("FAIL: " + error)
+        sys.exit(1)
+    print(f"cross-check of {args.check:,} operations: ok")
+
+    lookups = [rng.choice(keys) for _ in range(args.size)]
+    ranks = [rng.randrange(args.size) for _ in range(args.size)]
+    results = {}
+    for name, make in (("RedBlackTree", RedBlackTree), ("native", lambda: NumericRedBlackTree(key_type))):
+        tree = make()
+        seconds = {"put": timed(lambda k: tree.put(k, k), keys)}
+        seconds["get"] = timed(tree.get, lookups)
+        seconds["select"] = timed(tree.select, ranks)
+        seconds["delete"] = timed(tree.delete, keys[::2])
+        results[name] = seconds
+
+    print(f"{args.size:,} {key_type.__name__} keys, microseconds per operation")
+    print(f"{'':<8}{'RedBlackTree':>14}{'native':>10}{'speedup':>10}")
+    for op in ("put", "get", "select", "delete"):
+        count = args.size // 2 if op == "delete" else args.size
+        plain = results["RedBlackTree"][op] / count * 1e6
+        native = results["native"][op] / count * 1e6
+        print(f"{op:<8}{plain:>14.2f}{native:>10.2f}{plain / native:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
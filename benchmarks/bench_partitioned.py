@@ -0,0 +1,69 @@
+"""
+    Measures how bulk work on a PartitionedRedBlackTree scales with the number
+    of partitions, each of which has a worker process of its own. For 1, 2, 4
+    and 8 workers it times a bulk build from unsorted pairs, a put_many of
+    more pairs, a rank_many over random keys and a scan of a tenth of the key
+    range, next to a single RedBlackTree doing the same in this process. The
+    speedup can't go past the number of cores, which is printed first. The
+    main process still routes every key and unpickles every answer, and that
+    part does not shrink with more workers.
+
+    usage: python benchmarks/bench_partitioned.py [--size N] [--workers W [W ...]]
+"""
+
+import argparse
+import os
+import random
+import time
+
+import common  # noqa: F401, puts the project on sys.path
+from partitionedtree import PartitionedRedBlackTree
+from redblacktree import RedBlackTree
+
+
+def timed(action):
+    start = time.perf_counter()
+    result = action()
+    return result, time.perf_counter() - start
+
+
+# runs every bulk step against a tree made by build, returning seconds per step
+def run(build, pairs, extra, queries, lo, hi):
+    tree, build_time = timed(lambda: build(pairs))
+    _, put_time = timed(lambda: tree.put_many(extra))
+    _, rank_time = timed(lambda: tree.rank_many(queries))
+    _, scan_time = timed(lambda: sum(1 for _ in tree.range(lo, hi)))
+    if isinstance(tree, PartitionedRedBlackTree):
+        tree.close()
+    return (build_time, put_time, rank_time, scan_time)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    space = 4 * args.size
+    pairs = [(rng.randrange(space), i) for i in range(args.size)]
+    extra = [(rng.randrange(space), -i) for i in range(args.size // 10)]
+    queries = [rng.randrange(space) for _ in range(args.size // 5)]
+    lo = space // 2
+    hi = lo + space // 10
+
+    print(f"cores: {os.cpu_count()}, pairs: {args.size:,}")
+    print(f"{'tree':<16} {'build':>8} {'put_many':>9} {'rank_many':>10} {'range':>8} {'total':>8} {'speedup':>8}")
+    results = [("single tree", run(RedBlackTree.from_items, pairs, extra, queries, lo, hi))]
+    for workers in args.workers:
+        build = lambda items, workers=workers: PartitionedRedBlackTree.from_items(items, partitions=workers)
+        results.append((f"{workers} workers", run(build, pairs, extra, queries, lo, hi)))
+    base = sum(results[0][1])
+    for name, times in results:
+        cells = " ".join(f"{t:>{w}.2f}s" for t, w in zip(times, (7, 8, 9, 7)))
+        print(f"{name:<16} {cells} {sum(times):>7.2f}s {base / sum(times):>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+    Measures what it costs to keep old versions of a tree around. Starting from
+    a tree of N keys, it makes K versions in a row, each one a single put or
+    delete on the last, and keeps every one of them alive. Growth is reported
+    as bytes per retained version, for PersistentRedBlackTree (path copying)
+    and for a RedBlackTree copied in full before every change, which is what
+    a point in time snapshot cost before. The full copies are only made for
+    the first few versions and scaled up, since doing all K would need K trees
+    in memory. It also times the persistent put and delete against the ones
+    that change a RedBlackTree in place, and checks that the oldest versions
+    still answer queries from before the changes.
+
+    usage: python benchmarks/bench_persistent.py [--size N] [--versions K]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+import common  # noqa: F401, puts the project on sys.path
+from persistenttree import PersistentRedBlackTree
+from redblacktree import RedBlackTree
+
+
+# applies one change per version, returning every version that was made
+def make_versions(base, changes):
+    versions = [base]
+    for key, value in changes:
+        if value is None:
+            versions.append(versions[-1].delete(key))
+        else:
+            versions.append(versions[-1].put(key, value))
+    return versions
+
+
+# copies the tree in full before every change, returning every copy
+def make_copies(base, changes):
+    copies = [base]
+    for key, value in changes:
+        tree = RedBlackTree.from_sorted(copies[-1].items())
+        if value is None:
+            tree.delete(key)
+        else:
+            tree.put(key, value)
+        copies.append(tree)
+    return copies
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--versions", type=int, default=1000)
+    parser.add_argument("--copies", type=int, default=10, help="full copies to measure before scaling up")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pairs = [(k, k) for k in range(0, 2 * args.size, 2)] # even keys, so odd ones can be added
+    changes = []
+    for _ in range(args.versions):
+        if rng.random() < 0.5:
+            changes.append((rng.randrange(2 * args.size), None))
+        else:
+            key = rng.randrange(2 * args.size)
+            changes.append((key, -key))
+
+    base = PersistentRedBlackTree(pairs)
+    # time the changes first, before the measured versions fill up the heap
+    persistent_rate = 0.0
+    in_place_rate = 0.0
+    for _ in range(3): # best of three
+        start = time.perf_counter()
+        make_versions(base, changes)
+        persistent_rate = max(persistent_rate, len(changes) / (time.perf_counter() - start))
+        tree = RedBlackTree.from_sorted(pairs)
+        start = time.perf_counter()
+        for key, value in changes:
+            if value is None:
+                tree.delete(key)
+            else:
+                tree.put(key, value)
+        in_place_rate = max(in_place_rate, len(changes) / (time.perf_counter() - start))
+
+    versions, persistent = measure(lambda: make_versions(base, changes))
+    oldest = versions[0]
+    assert len(oldest) == args.size and all(oldest.select(i) == 2 * i for i in range(0, args.size, 997))
+    assert versions[-1].is_valid()
+
+    plain = RedBlackTree.from_sorted(pairs)
+    copies, copied = measure(lambda: make_copies(plain, changes[:args.copies]))
+    del copies
+
+    print(f"entries:                    {args.size:,}")
+    print(f"versions kept:              {args.versions:,}")
+    print(f"path copying, total:        {persistent / 2**20:>10.1f} MiB")
+    print(f"path copying / version:     {persistent / args.versions:>10,.0f} bytes")
+    print(f"full copy / version:        {copied / args.copies:>10,.0f} bytes")
+    print(f"full copies, scaled total:  {copied / args.copies * args.versions / 2**20:>10.1f} MiB")
+    print(f"persistent updates / s:     {persistent_rate:>10,.0f}")
+    print(f"in place updates / s:       {in_place_rate:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
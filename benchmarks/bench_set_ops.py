@@ -0,0 +1,93 @@
+"""
+    Compares the set operations (union, intersection, difference) with doing
+    the same thing one key at a time: a put per key of the other tree, a
+    delete per key, or a get per key into a new tree. Pairs of trees of
+    different sizes are tried both ways round, and half of the smaller
+    tree's keys are also in the larger one. Each timing includes freeing the
+    tree that was changed, since dropping nodes is part of the cost. It also
+    times split and join against inserting and deleting one key.
+
+    usage: python benchmarks/bench_set_ops.py [--size N]
+"""
+
+import argparse
+import random
+import time
+
+import common  # noqa: F401, puts the project on sys.path
+from redblacktree import RedBlackTree
+
+
+# times action on a fresh copy of the pairs, freeing the tree inside the timing
+def timed(action, pairs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        trees = [RedBlackTree.from_sorted(pairs)]
+        start = time.perf_counter()
+        action(trees.pop(), OTHER[0])
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+OTHER = [None]
+
+
+def by_put(tree, other):
+    for key, value in other.items():
+        tree.put(key, value)
+
+
+def by_delete(tree, other):
+    for key in other.keys():
+        tree.delete(key)
+
+
+def by_get(tree, other):
+    found = RedBlackTree()
+    for key in other.keys():
+        value = tree.get(key)
+        if value is not None:
+            found.put(key, value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    n = args.size
+    print(f"{'this':>8} {'other':>8} {'operation':<13} {'one by one':>11} {'set op':>10} {'speedup':>8}")
+    for this, that in ((n, n // 200), (n, n // 10), (n, n // 2), (n // 10, n), (n // 200, n)):
+        keys = rng.sample(range(0, 4 * n, 2), this)
+        shared = rng.sample(keys, min(this, that) // 2)
+        fresh = rng.sample(range(1, 4 * n, 2), that - len(shared))
+        pairs = sorted((k, k) for k in keys)
+        OTHER[0] = RedBlackTree.from_items((k, -k) for k in shared + fresh)
+
+        for name, slow, fast in (("union", by_put, RedBlackTree.union),
+                                 ("intersection", by_get, RedBlackTree.intersection),
+                                 ("difference", by_delete, RedBlackTree.difference)):
+            one_by_one = timed(slow, pairs, args.repeat)
+            set_op = timed(fast, pairs, args.repeat)
+            print(f"{this:>8,} {that:>8,} {name:<13} {one_by_one * 1e3:>9.1f}ms {set_op * 1e3:>8.1f}ms {one_by_one / set_op:>7.2f}x")
+
+    tree = RedBlackTree.from_sorted((k, k) for k in range(0, 2 * n, 2))
+    cuts = rng.sample(range(1, 2 * n, 2), 2_000) # keys that are not in the tree
+    start = time.perf_counter()
+    for key in cuts:
+        upper = tree.split(key)
+        tree = RedBlackTree.join(tree, key, None, upper)
+    split_join = (time.perf_counter() - start) / len(cuts)
+    start = time.perf_counter()
+    for key in cuts:
+        tree.delete(key)
+        tree.put(key, None)
+    put_delete = (time.perf_counter() - start) / len(cuts)
+    print(f"\nsplit + join on {n:,} keys: {split_join * 1e6:.1f}us, delete + put: {put_delete * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+    Measures startup time from a binary snapshot: writing it with dump,
+    reading it back with load, and opening it as a MappedRedBlackTree, next
+    to rebuilding the tree from scratch out of the source rows.
+
+    usage: python benchmarks/bench_snapshot.py [--size N] [--queries K] [--with-put]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from common import timed
+from mappedtree import MappedRedBlackTree
+from redblacktree import RedBlackTree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5_000_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--with-put", action="store_true", help="also time a rebuild with one put per row (slow)")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    rows = [(key, f"value-{key}") for key in range(args.size)]
+    rng.shuffle(rows)
+    queries = [rng.randrange(args.size) for _ in range(args.queries)]
+
+    results = []
+    if args.with_put:
+        def rebuild():
+            tree = RedBlackTree()
+            for key, value in rows:
+                tree.put(key, value)
+        results.append(("rebuild with put", timed(rebuild)))
+    start = time.perf_counter()
+    tree = RedBlackTree.from_items(rows)
+    results.append(("rebuild with from_items", time.perf_counter() - start))
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "tree.snapshot")
+        results.append(("dump", timed(lambda: tree.dump(path))))
+        megabytes = os.path.getsize(path) / 2 ** 20
+        del tree
+
+        results.append(("load", timed(lambda: RedBlackTree.load(path))))
+
+        start = time.perf_counter()
+        mapped = MappedRedBlackTree(path)
+        mapped.get(queries[0])
+        results.append(("mapped open + first get", time.perf_counter() - start))
+        results.append((f"mapped get x {args.queries}", timed(lambda: [mapped.get(key) for key in queries])))
+        results.append((f"mapped select x {args.queries}", timed(lambda: [mapped.select(rank) for rank in queries])))
+        mapped.close()
+
+    print(f"entries: {args.size:,}   snapshot: {megabytes:,.1f} MiB")
+    for name, seconds in results:
+        print(f"  {name:<26} {seconds:>10.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+    Small helpers shared by the benchmark scripts.
+"""
+
+import importlib.util
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROJECT = os.path.join(HERE, "..")
+sys.path.insert(0, PROJECT)
+
+
+# imports a copy of redblacktree.py (or any module) from a file path
+def load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# the module in this checkout, loaded under its own name
+def current_module():
+    return load_module(os.path.join(PROJECT, "redblacktree.py"), "current_tree")
+
+
+# returns seconds spent running action once
+def timed(action):
+    start = time.perf_counter()
+    action()
+    return time.perf_counter() - start
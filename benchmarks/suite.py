@@ -0,0 +1,434 @@
+"""
+    Reproducible benchmark suite for RedBlackTree. Every operation is timed
+    under several workloads and sizes, next to two baselines: a dict paired
+    with a bisect-maintained sorted key list, and a plain sorted list of pairs.
+    Everything runs offline from a fixed seed.
+
+    Results are printed and can be saved as JSON with --output. Passing an
+    earlier results file with --compare turns the run into a regression gate:
+    any RedBlackTree operation that got slower than --threshold (10% by
+    default) is flagged and the script exits with status 1. Where both runs
+    include the dict+bisect baseline, speeds are compared relative to it, so
+    a busier or faster machine does not show up as a regression.
+
+    usage:
+        python benchmarks/suite.py --output results.json
+        python benchmarks/suite.py --compare results.json --threshold 0.15
+        python benchmarks/suite.py --quick --impls redblacktree
+        python benchmarks/suite.py --module /tmp/old/redblacktree.py --output old.json
+"""
+
+import argparse
+import bisect
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+from common import current_module, load_module
+
+WORKLOADS = ("random", "sequential", "zipfian", "mixed")
+OPERATIONS = (
+    "put", "get", "delete", "find_predecessor", "find_successor",
+    "find_rank", "select", "reverse_lookup",
+    "count_red_nodes", "calc_height", "calc_average_depth",
+)
+
+# operations that may scan the whole structure get far fewer queries per pass
+SCAN_QUERIES = 50
+STAT_QUERIES = 5
+
+# read only operations keep repeating their queries for at least this long
+MIN_SECONDS = 0.2
+
+
+class TreeAdapter:
+    """
+        Runs the suite against RedBlackTree, from this checkout or from any
+        other copy of the module.
+    """
+
+    name = "redblacktree"
+
+    def __init__(self, module):
+        self.module = module
+
+    def build(self, items):
+        tree_class = self.module.RedBlackTree
+        if hasattr(tree_class, "from_items"):
+            return tree_class.from_items(items)
+        tree = tree_class() # older copies of the module can only put
+        for key, value in items:
+            tree.put(key, value)
+        return tree
+
+    def empty(self):
+        return self.module.RedBlackTree()
+
+    def put(self, tree, key, value):
+        tree.put(key, value)
+
+    def get(self, tree, key):
+        return tree.get(key)
+
+    def delete(self, tree, key):
+        return tree.delete(key)
+
+    def find_predecessor(self, tree, key):
+        return tree.find_predecessor(key)
+
+    def find_successor(self, tree, key):
+        return tree.find_successor(key)
+
+    def find_rank(self, tree, key):
+        return tree.find_rank(key)
+
+    def select(self, tree, rank):
+        return tree.select(rank)
+
+    def reverse_lookup(self, tree, value):
+        return tree.reverse_lookup(value)
+
+    def count_red_nodes(self, tree, _):
+        return tree.count_red_nodes()
+
+    def calc_height(self, tree, _):
+        return tree.calc_height()
+
+    def calc_average_depth(self, tree, _):
+        return tree.calc_average_depth()
+
+
+class DictBisectAdapter:
+    """
+        Baseline: a dict for values plus a sorted list of keys kept with bisect.
+    """
+
+    name = "dict+bisect"
+
+    def build(self, items):
+        values = dict(items)
+        return (values, sorted(values))
+
+    def empty(self):
+        return ({}, [])
+
+    def put(self, tree, key, value):
+        values, keys = tree
+        if key not in values:
+            bisect.insort(keys, key)
+        values[key] = value
+
+    def get(self, tree, key):
+        return tree[0].get(key)
+
+    def delete(self, tree, key):
+        values, keys = tree
+        if key in values:
+            del keys[bisect.bisect_left(keys, key)]
+            return values.pop(key)
+        return None
+
+    def find_predecessor(self, tree, key):
+        values, keys = tree
+        if key not in values:
+            return None
+        i = bisect.bisect_left(keys, key)
+        return keys[i - 1] if i else None
+
+    def find_successor(self, tree, key):
+        values, keys = tree
+        if key not in values:
+            return None
+        i = bisect.bisect_right(keys, key)
+        return keys[i] if i < len(keys) else None
+
+    def find_rank(self, tree, key):
+        values, keys = tree
+        return bisect.bisect_left(keys, key) if key in values else -1
+
+    def select(self, tree, rank):
+        keys = tree[1]
+        return keys[rank] if 0 <= rank < len(keys) else None
+
+    def reverse_lookup(self, tree, value):
+        for key, held in tree[0].items():
+            if held == value:
+                return key
+        return None
+
+
+class SortedListAdapter:
+    """
+        Baseline: one plain list of (key, value) pairs kept sorted with bisect.
+    """
+
+    name = "sorted-list"
+
+    def build(self, items):
+        return sorted(dict(items).items())
+
+    def empty(self):
+        return []
+
+    def __find(self, pairs, key):
+        i = bisect.bisect_left(pairs, (key,))
+        if i < len(pairs) and pairs[i][0] == key:
+            return i
+        return -1
+
+    def put(self, pairs, key, value):
+        i = bisect.bisect_left(pairs, (key,))
+        if i < len(pairs) and pairs[i][0] == key:
+            pairs[i] = (key, value)
+        else:
+            pairs.insert(i, (key, value))
+
+    def get(self, pairs, key):
+        i = self.__find(pairs, key)
+        return pairs[i][1] if i >= 0 else None
+
+    def delete(self, pairs, key):
+        i = self.__find(pairs, key)
+        return pairs.pop(i)[1] if i >= 0 else None
+
+    def find_predecessor(self, pairs, key):
+        i = self.__find(pairs, key)
+        return pairs[i - 1][0] if i > 0 else None
+
+    def find_successor(self, pairs, key):
+        i = self.__find(pairs, key)
+        return pairs[i + 1][0] if 0 <= i < len(pairs) - 1 else None
+
+    def find_rank(self, pairs, key):
+        return self.__find(pairs, key)
+
+    def select(self, pairs, rank):
+        return pairs[rank][0] if 0 <= rank < len(pairs) else None
+
+    def reverse_lookup(self, pairs, value):
+        for key, held in pairs:
+            if held == value:
+                return key
+        return None
+
+
+# draws count ranks out of range(size), where rank r is picked with weight 1 / (r + 1) ^ skew
+def zipf_ranks(rng, size, count, skew = 1.1):
+    weights = [1.0 / (rank + 1) ** skew for rank in range(size)]
+    return rng.choices(range(size), weights=weights, k=count)
+
+
+class Workload:
+    """
+        The keys for one workload and size: the order they are inserted in,
+        and the keys, ranks and values that queries ask for.
+    """
+
+    def __init__(self, kind, size, seed, queries):
+        rng = random.Random(f"{kind}-{size}-{seed}")
+        self.kind = kind
+        self.size = size
+
+        # even keys are present, so odd keys can be used for inserts that miss
+        self.keys = [2 * i for i in range(size)]
+        self.insert_order = self.keys[:]
+        if kind == "sequential":
+            picks = [i % size for i in range(queries)]
+        else:
+            rng.shuffle(self.insert_order)
+            if kind == "zipfian":
+                # hot keys are scattered through the key space, not bunched at one end
+                hot = list(range(size))
+                rng.shuffle(hot)
+                picks = [hot[r] for r in zipf_ranks(rng, size, queries)]
+            else:
+                picks = [rng.randrange(size) for _ in range(queries)]
+
+        self.items = [(key, key) for key in self.insert_order]
+        self.query_keys = [self.keys[i] for i in picks]
+        self.query_ranks = picks
+        self.delete_keys = list(dict.fromkeys(self.query_keys)) # deleting twice would just miss
+
+        # mixed: 80% get, 10% put of a new key, 10% delete
+        self.mixed = []
+        for i in range(queries):
+            roll = rng.random()
+            if roll < 0.8:
+                self.mixed.append(("get", self.query_keys[i]))
+            elif roll < 0.9:
+                self.mixed.append(("put", 2 * rng.randrange(size) + 1))
+            else:
+                self.mixed.append(("delete", self.query_keys[i]))
+
+
+# returns the per-call arguments and the tree to run one operation on
+def operation_inputs(adapter, workload, operation):
+    if operation == "put":
+        return adapter.empty(), workload.insert_order
+    tree = adapter.build(workload.items)
+    if operation == "delete":
+        return tree, workload.delete_keys
+    if operation == "select":
+        return tree, workload.query_ranks
+    if operation == "reverse_lookup":
+        return tree, workload.query_keys[:SCAN_QUERIES]
+    if operation in ("count_red_nodes", "calc_height", "calc_average_depth"):
+        return tree, [None] * STAT_QUERIES
+    return tree, workload.query_keys
+
+
+# times one operation over its inputs, returns ops per second
+def run_operation(adapter, workload, operation):
+    if workload.kind == "mixed":
+        tree = adapter.build(workload.items)
+        actions = {"get": adapter.get, "put": lambda t, k: adapter.put(t, k, k), "delete": adapter.delete}
+        calls = [(actions[name], key) for name, key in workload.mixed]
+        start = time.perf_counter()
+        for action, key in calls:
+            action(tree, key)
+        return len(calls) / (time.perf_counter() - start)
+
+    tree, inputs = operation_inputs(adapter, workload, operation)
+    action = getattr(adapter, operation)
+    if operation in ("put", "delete"): # these change the tree, so one pass only
+        start = time.perf_counter()
+        if operation == "put":
+            for key in inputs:
+                action(tree, key, key)
+        else:
+            for key in inputs:
+                action(tree, key)
+        return len(inputs) / (time.perf_counter() - start)
+
+    # read only operations repeat their inputs until the timing is long enough to trust
+    calls = 0
+    spent = 0.0
+    while spent < MIN_SECONDS:
+        start = time.perf_counter()
+        for argument in inputs:
+            action(tree, argument)
+        spent += time.perf_counter() - start
+        calls += len(inputs)
+    return calls / spent
+
+
+def run_suite(adapters, sizes, workloads, operations, repeat, seed, queries):
+    results = []
+    for size in sizes:
+        for kind in workloads:
+            workload = Workload(kind, size, seed, min(queries, size))
+            names = ("mixed",) if kind == "mixed" else operations
+            for operation in names:
+                for adapter in adapters:
+                    if operation != "mixed" and not hasattr(adapter, operation):
+                        continue
+                    samples = []
+                    for _ in range(repeat):
+                        gc.collect()
+                        samples.append(run_operation(adapter, workload, operation))
+                    result = {
+                        "impl": adapter.name,
+                        "workload": kind,
+                        "size": size,
+                        "op": operation,
+                        "ops_per_sec": max(samples), # best run, the least disturbed by noise
+                        "samples": samples,
+                    }
+                    results.append(result)
+                    print(f"{size:>8} {kind:<11} {operation:<19} {adapter.name:<13} {result['ops_per_sec']:>14,.0f} ops/s", flush=True)
+    return results
+
+
+# returns (result, old result, change) for every result slower than the threshold allows.
+# when both runs timed the dict+bisect baseline on the same case, the change is measured
+# relative to it, which cancels out a machine that is simply faster or slower than before
+def find_regressions(results, baseline, threshold, impls, normalize = True):
+    def index(entries):
+        return {(r["impl"], r["workload"], r["size"], r["op"]): r for r in entries}
+
+    old = index(baseline["results"])
+    new = index(results)
+    slower = []
+    for result in results:
+        if result["impl"] not in impls:
+            continue
+        case = (result["workload"], result["size"], result["op"])
+        before = old.get((result["impl"],) + case)
+        if before is None:
+            continue
+        change = result["ops_per_sec"] / before["ops_per_sec"]
+        reference_now = new.get(("dict+bisect",) + case)
+        reference_then = old.get(("dict+bisect",) + case)
+        if normalize and reference_now and reference_then:
+            change /= reference_now["ops_per_sec"] / reference_then["ops_per_sec"]
+        if change - 1 < -threshold:
+            slower.append((result, before, change - 1))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--ops", nargs="+", choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument("--impls", nargs="+", choices=("redblacktree", "dict+bisect", "sorted-list"),
+                        default=["redblacktree", "dict+bisect", "sorted-list"])
+    parser.add_argument("--queries", type=int, default=10_000, help="queries per timed operation (capped at the size)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the best one is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="small sizes and one run each, for a fast check")
+    parser.add_argument("--module", help="benchmark another copy of redblacktree.py instead of this checkout")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="earlier JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before a regression is flagged")
+    parser.add_argument("--raw", action="store_true", help="compare raw ops/s, without scaling by the dict+bisect baseline")
+    args = parser.parse_args()
+    if args.quick:
+        args.sizes = [1_000, 10_000]
+        args.repeat = 1
+
+    module = load_module(args.module, "benchmarked_tree") if args.module else current_module()
+    adapters = {"redblacktree": TreeAdapter(module), "dict+bisect": DictBisectAdapter(), "sorted-list": SortedListAdapter()}
+    chosen = [adapters[name] for name in args.impls]
+
+    results = run_suite(chosen, args.sizes, args.workloads, args.ops, args.repeat, args.seed, args.queries)
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "module": os.path.abspath(args.module) if args.module else "redblacktree.py",
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "queries": args.queries,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(report, out, indent=2)
+        print(f"wrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as old:
+            baseline = json.load(old)
+        slower = find_regressions(results, baseline, args.threshold, {"redblacktree"}, not args.raw)
+        if not slower:
+            print(f"no regressions beyond {args.threshold:.0%}")
+            return 0
+        print(f"{len(slower)} regressions beyond {args.threshold:.0%}:")
+        for result, before, change in slower:
+            print(f"  {result['size']:>8} {result['workload']:<11} {result['op']:<19} "
+                  f"{before['ops_per_sec']:>12,.0f} -> {result['ops_per_sec']:>12,.0f} ops/s ({change:+.1%})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
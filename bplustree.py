@@ -0,0 +1,754 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from operator import itemgetter
+
+
+class _Block:
+    """
+        One node of a BPlusTree. A leaf holds up to fanout sorted keys and their
+        values, and a link to the next leaf. A branch holds up to fanout children,
+        the smallest key of every child but the first, how many pairs each child
+        holds, and the running totals of those counts, worked out when a rank
+        needs them and dropped whenever a count changes.
+    """
+    __slots__ = ("keys", "values", "children", "counts", "totals", "next")
+
+    def __init__(self, keys, values = None, children = None, counts = None):
+        self.keys = keys
+        self.values = values
+        self.children = children # none in a leaf
+        self.counts = counts
+        self.totals = None
+        self.next = None
+
+
+# returns num of k / v pairs under a block
+def _size(block) -> int:
+    return len(block.keys) if block.children is None else sum(block.counts)
+
+
+# returns num of entries in a block, keys in a leaf, children in a branch
+def _occupancy(block) -> int:
+    return len(block.keys) if block.children is None else len(block.children)
+
+
+# cuts n items into as few runs of at most fanout as possible, as even as possible,
+# and returns where each run starts and ends
+def _runs(n, fanout) -> list:
+    count = -(-n // fanout)
+    return [(i * n // count, (i + 1) * n // count) for i in range(count)]
+
+
+class BPlusTree:
+
+    """
+        This class is an ordered map with the ordered map methods of RedBlackTree
+        (put, get, delete and their _many forms, lookups by key and by rank, range
+        and count_range, iteration, calc_height and is_valid), kept in wide blocks
+        instead of one Node per key. Each leaf holds a sorted run of up to fanout
+        keys, searched with bisect, and each branch keeps the pair count of every
+        child for ranks. With the default fanout of 128, a million
+        keys sit three or four blocks deep, so a lookup is a few bisects in C rather
+        than around forty Python comparisons down a chain of nodes, and the keys it
+        reads sit side by side in a list. Leaves are linked, so iteration and range
+        scans walk them in order.
+
+        Like RedBlackTree, keys only need to support < and ==, and the tree is not
+        safe for threads on its own. The value index, caches, metrics, aggregates,
+        key functions, node statistics, set operations and snapshots of
+        RedBlackTree are not offered.
+    """
+
+    __author__ = "Silver Lippert"
+    __version__ = "23.11.5"
+
+    # the most keys in a leaf, and the most children of a branch
+    FANOUT = 128 # past this, gets barely speed up while puts shift more keys
+
+    def __init__(self, fanout = FANOUT):
+        """
+            Creates an empty tree whose blocks hold up to fanout entries. Larger
+            blocks make the tree shallower, but cost more to split and to insert
+            into, since a put shifts the keys after it along its leaf.
+        """
+        if fanout < 4:
+            raise ValueError("fanout must be at least 4")
+        self.fanout = fanout
+        self.__minimum = fanout // 2 # blocks other than the root never hold fewer
+        self.__root = _Block([], [])
+        self.__size = 0
+
+    # builds a new tree from k / v pairs that are already in ascending key order
+    @classmethod
+    def from_sorted(cls, items, **options):
+        """
+            This method takes an iterable of key / value pairs in ascending key order,
+            and builds a tree out of them in linear time, with every block as full as
+            the fanout allows. If a key repeats, the last pair wins. Raises ValueError
+            if the keys are out of order. Any keyword options are passed on to the
+            constructor.
+        """
+        keys = []
+        values = []
+        for key, value in items:
+            if keys and not keys[-1] < key:
+                if keys[-1] == key: # repeated key, keep the later value
+                    values[-1] = value
+                    continue
+                raise ValueError(f"keys are not in ascending order at {key!r}")
+            keys.append(key)
+            values.append(value)
+        tree = cls(**options)
+        tree.__build(keys, values)
+        return tree
+
+    # builds a new tree from k / v pairs in any order
+    @classmethod
+    def from_items(cls, items, **options):
+        """
+            This method takes a mapping or an iterable of key / value pairs in any
+            order, and builds a tree out of them. If a key repeats, the last pair wins.
+            Any keyword options are passed on to the constructor.
+        """
+        if hasattr(items, "items"):
+            items = items.items()
+        return cls.from_sorted(sorted(items, key=itemgetter(0)), **options) # stable, so later pairs stay later
+
+    # inserts a new k / v pair
+    def put(self, key, value):
+        """
+            This method inserts a key / value pair, or replaces the value if the key
+            already exists. Takes O(log n) bisects, plus shifting the keys after it
+            along its leaf.
+        """
+        node = self.__root
+        path = []
+        while node.children is not None:
+            i = bisect_right(node.keys, key)
+            path.append((node, i))
+            node = node.children[i]
+        keys = node.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            node.values[i] = value
+            return
+        keys.insert(i, key)
+        node.values.insert(i, value)
+        self.__size -= -1
+        for parent, j in path:
+            parent.counts[j] -= -1
+            parent.totals = None
+        if len(keys) > self.fanout:
+            self.__split(node, path)
+
+    # inserts many k / v pairs, later pairs win on repeated keys
+    def put_many(self, items, deletes = ()):
+        """
+            This method takes an iterable of key / value pairs (or a mapping) and
+            inserts all of them. Into an empty tree, they are built in bulk. The
+            keys in deletes, if any, are removed first, as in RedBlackTree.put_many.
+        """
+        if hasattr(items, "items"):
+            items = items.items()
+        delete = self.delete
+        for key in deletes:
+            delete(key)
+        if not self.__size:
+            items = sorted(items, key=itemgetter(0))
+            built = type(self).from_sorted(items, fanout=self.fanout)
+            self.__root, self.__size = built.__root, built.__size
+            return
+        put = self.put
+        for key, value in items:
+            put(key, value)
+
+    # removes every key in keys that is in the tree, returns how many went
+    def delete_many(self, keys) -> int:
+        """
+            This method removes every key of an iterable that is in the tree, one
+            delete per key, and returns how many it removed.
+        """
+        before = self.__size
+        delete = self.delete
+        for key in keys:
+            delete(key)
+        return before - self.__size
+
+    # get returns value of given key, or none if key does not exist
+    def get(self, key):
+        """
+            This method returns the value of a key, or None if the key DNE.
+        """
+        node = self.__root
+        while node.children is not None:
+            node = node.children[bisect_right(node.keys, key)]
+        keys = node.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return node.values[i]
+        return None
+
+    # removes a k / v pair, returns deleted val, or none if key DNE
+    def delete(self, key):
+        """
+            This method removes a key and returns its value, or None if the key DNE.
+            A block left less than half full borrows from or merges with a sibling.
+        """
+        node = self.__root
+        path = []
+        while node.children is not None:
+            i = bisect_right(node.keys, key)
+            path.append((node, i))
+            node = node.children[i]
+        keys = node.keys
+        i = bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            return None
+        del keys[i]
+        value = node.values.pop(i)
+        self.__size -= 1
+        for parent, j in path:
+            parent.counts[j] -= 1
+            parent.totals = None
+        if len(keys) < self.__minimum and path:
+            self.__refill(node, path)
+        return value
+
+    # returns true if key is present
+    def contains_key(self, key) -> bool:
+        """
+            This method returns whether the key is in the tree.
+        """
+        node = self.__leaf(key)
+        i = bisect_left(node.keys, key)
+        return i < len(node.keys) and node.keys[i] == key
+
+    # returns num of k / v pairs
+    def __len__(self) -> int:
+        """
+        returns number of key / value pairs
+        """
+        return self.__size
+
+    # returns true if tree is empty
+    def is_empty(self) -> bool:
+        """
+            This method returns whether the tree has any pairs in it.
+        """
+        return self.__size == 0
+
+    # iterates over keys in order
+    def __iter__(self):
+        """
+            This method returns an iterator over the keys, in ascending order.
+        """
+        return self.keys()
+
+    # iterates over keys in reverse order
+    def __reversed__(self):
+        """
+            This method returns an iterator over the keys, in descending order.
+        """
+        return self.__backwards(self.__root)
+
+    # yields every key in order
+    def keys(self):
+        """
+            This method lazily yields every key in ascending order.
+        """
+        for node in self.__leaves():
+            yield from node.keys
+
+    # yields every value in key order
+    def values(self):
+        """
+            This method lazily yields every value, ordered by their keys.
+        """
+        for node in self.__leaves():
+            yield from node.values
+
+    # yields every k / v pair in key order
+    def items(self):
+        """
+            This method lazily yields every key / value pair in ascending key order.
+        """
+        for node in self.__leaves():
+            yield from zip(node.keys, node.values)
+
+    # yields k / v pairs with lo <= key <= hi in order, none means unbounded
+    def range(self, lo = None, hi = None, inclusive = (True, True)):
+        """
+            This method lazily yields the key / value pairs between lo and hi, the
+            same way RedBlackTree.range does, a leaf at a time.
+        """
+        lo_inclusive, hi_inclusive = inclusive
+        if lo is None:
+            node = self.__leaf()
+            start = 0
+        else:
+            node = self.__leaf(lo)
+            start = (bisect_left if lo_inclusive else bisect_right)(node.keys, lo)
+        while node is not None:
+            keys = node.keys
+            stop = len(keys)
+            if hi is not None:
+                stop = (bisect_right if hi_inclusive else bisect_left)(keys, hi)
+            yield from zip(keys[start:stop], node.values[start:stop])
+            if stop < len(keys):
+                return
+            node = node.next
+            start = 0
+
+    # returns num of keys with lo <= key <= hi, none means unbounded
+    def count_range(self, lo = None, hi = None, inclusive = (True, True)) -> int:
+        """
+            This method counts the keys between lo and hi in O(log n), using the
+            child counts of the branches.
+        """
+        lo_inclusive, hi_inclusive = inclusive
+        count = self.__size if hi is None else self.__count_below(hi, hi_inclusive)
+        if lo is not None:
+            count -= self.__count_below(lo, not lo_inclusive)
+        return max(count, 0)
+
+    # returns smallest key, or none if there is none
+    def find_first_key(self):
+        """
+            This method finds and returns the smallest key in order.
+        """
+        node = self.__leaf()
+        return node.keys[0] if node.keys else None
+
+    # returns largest key or none if there is none
+    def find_last_key(self):
+        """
+            This method finds and returns the largest key in order.
+        """
+        node = self.__root
+        while node.children is not None:
+            node = node.children[-1]
+        return node.keys[-1] if node.keys else None
+
+    # returns predecessor of given key or none if key DNE or has no pred.
+    def find_predecessor(self, key):
+        """
+            This method returns the key just before the given one, or None if the
+            key DNE or has no predecessor.
+        """
+        if not self.contains_key(key):
+            return None
+        return self.lower(key)
+
+    # returns successor of key, or none if key DNE or has no succ.
+    def find_successor(self, key):
+        """
+            This method returns the key just after the given one, or None if the
+            key DNE or has no successor.
+        """
+        node = self.__leaf(key)
+        keys = node.keys
+        i = bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            return None
+        if i + 1 < len(keys):
+            return keys[i + 1]
+        return node.next.keys[0] if node.next is not None else None
+
+    # returns largest key <= key, or none if there is none
+    def floor(self, key):
+        """
+            This method returns the largest key at or below the given one, see
+            RedBlackTree.floor.
+        """
+        return self.__below(key, bisect_right)
+
+    # returns smallest key >= key, or none if there is none
+    def ceiling(self, key):
+        """
+            This method returns the smallest key at or above the given one, see
+            RedBlackTree.ceiling.
+        """
+        return self.__above(key, bisect_left)
+
+    # returns largest key < key, or none if there is none
+    def lower(self, key):
+        """
+            This method returns the largest key strictly below the given one, see
+            RedBlackTree.lower.
+        """
+        return self.__below(key, bisect_left)
+
+    # returns smallest key > key, or none if there is none
+    def higher(self, key):
+        """
+            This method returns the smallest key strictly above the given one, see
+            RedBlackTree.higher.
+        """
+        return self.__above(key, bisect_right)
+
+    # returns the key closest to key, or none if tree is empty
+    def nearest(self, key):
+        """
+            This method returns the key closest to the given one, the lower one on
+            a tie, see RedBlackTree.nearest.
+        """
+        below = self.floor(key)
+        if below is not None and below == key:
+            return below
+        above = self.ceiling(key)
+        if below is None:
+            return above
+        if above is None or key - below <= above - key:
+            return below
+        return above
+
+    # returns rank of key, or -1 if key DNE
+    def find_rank(self, key) -> int:
+        """
+            This method returns the 0 indexed rank of a key, or -1 if it DNE.
+        """
+        node = self.__root
+        rank = 0
+        while node.children is not None:
+            i = bisect_right(node.keys, key)
+            if i:
+                rank -= -self.__totals(node)[i - 1]
+            node = node.children[i]
+        keys = node.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return rank + i
+        return -1
+
+    # returns key of the given rank, or none if rank is invalid, 0 index
+    def select(self, rank: int):
+        """
+            This method returns the key at a 0 indexed rank, or None if the
+            rank is invalid.
+        """
+        if not 0 <= rank < self.__size:
+            return None
+        node = self.__root
+        while node.children is not None:
+            totals = self.__totals(node)
+            i = bisect_right(totals, rank)
+            if i:
+                rank -= totals[i - 1]
+            node = node.children[i]
+        return node.keys[rank]
+
+    # returns the floor of every key in keys, or none where there is none
+    def floor_many(self, keys) -> list:
+        """
+            This method returns the floor of many keys, in the same order, with None
+            where every key of the tree is above.
+        """
+        floor = self.floor
+        return [floor(key) for key in keys]
+
+    # returns the ceiling of every key in keys, or none where there is none
+    def ceiling_many(self, keys) -> list:
+        """
+            This method returns the ceiling of many keys, in the same order.
+        """
+        ceiling = self.ceiling
+        return [ceiling(key) for key in keys]
+
+    # returns the lower of every key in keys, or none where there is none
+    def lower_many(self, keys) -> list:
+        """
+            This method returns the lower key of many keys, in the same order.
+        """
+        lower = self.lower
+        return [lower(key) for key in keys]
+
+    # returns the higher of every key in keys, or none where there is none
+    def higher_many(self, keys) -> list:
+        """
+            This method returns the higher key of many keys, in the same order.
+        """
+        higher = self.higher
+        return [higher(key) for key in keys]
+
+    # returns the nearest key to every key in keys, or none if tree is empty
+    def nearest_many(self, keys) -> list:
+        """
+            This method returns the nearest key to many keys, in the same order.
+        """
+        nearest = self.nearest
+        return [nearest(key) for key in keys]
+
+    # returns the rank of every key in keys, or -1 for keys that DNE
+    def rank_many(self, keys) -> list:
+        """
+            This method returns the ranks of many keys, in the same order, with -1
+            for keys that DNE.
+        """
+        find_rank = self.find_rank
+        return [find_rank(key) for key in keys]
+
+    # returns the key at every rank in ranks, or none for invalid ranks
+    def select_many(self, ranks) -> list:
+        """
+            This method returns the keys at many 0 indexed ranks, in the same order,
+            with None for invalid ranks.
+        """
+        select = self.select
+        return [select(rank) for rank in ranks]
+
+    # returns height of tree in blocks, where an empty tree has height of 0
+    def calc_height(self) -> int:
+        """
+            This method returns the number of blocks on every path from the root
+            to a leaf, 0 when the tree is empty.
+        """
+        if not self.__size:
+            return 0
+        height = 1
+        node = self.__root
+        while node.children is not None:
+            node = node.children[0]
+            height -= -1
+        return height
+
+    # returns true if the tree follows every b+ tree rule
+    def is_valid(self) -> bool:
+        """
+            This method checks the whole tree and returns whether the keys are in
+            order, every child count and separator is right, no block is over full
+            or (but for the root) under half full, every leaf is at the same depth,
+            and the leaf links visit every leaf in order. Meant for testing, it
+            takes O(n).
+        """
+        root = self.__root
+        if root.children is not None and len(root.children) < 2:
+            return False
+        leaves = []
+        if self.__check(root, None, None, True, leaves) != self.__size:
+            return False
+        if leaves and leaves[-1].next is not None:
+            return False
+        return all(a.next is b for a, b in zip(leaves, leaves[1:]))
+
+    # checks a block and everything under it, returning its pair count, or -1 if a
+    # rule is broken. keys must be at least lo and below hi, none means unbounded
+    def __check(self, node, lo, hi, is_root, leaves) -> int:
+        keys = node.keys
+        if any(not a < b for a, b in zip(keys, keys[1:])):
+            return -1
+        if keys and ((lo is not None and keys[0] < lo) or (hi is not None and not keys[-1] < hi)):
+            return -1
+        if _occupancy(node) > self.fanout or (not is_root and _occupancy(node) < self.__minimum):
+            return -1
+        if node.children is None:
+            if len(node.values) != len(keys):
+                return -1
+            leaves.append(node)
+            return len(keys)
+
+        children = node.children
+        if len(keys) != len(children) - 1 or len(node.counts) != len(children):
+            return -1
+        if node.totals is not None and node.totals != list(accumulate(node.counts)):
+            return -1
+        bounds = [lo] + keys + [hi]
+        total = 0
+        for i, child in enumerate(children):
+            count = self.__check(child, bounds[i], bounds[i + 1], False, leaves)
+            if count < 0 or count != node.counts[i]:
+                return -1
+            total += count
+        if len({self.__depth(child) for child in children}) != 1: # every leaf equally deep
+            return -1
+        return total
+
+    # returns the number of blocks from a block down to its leaves
+    def __depth(self, node) -> int:
+        depth = 1
+        while node.children is not None:
+            node = node.children[0]
+            depth -= -1
+        return depth
+
+    # returns the running totals of a branch's child counts
+    def __totals(self, node) -> list:
+        if node.totals is None:
+            node.totals = list(accumulate(node.counts))
+        return node.totals
+
+    # returns the leaf a key belongs in, or the first leaf with no key
+    def __leaf(self, key = None) -> _Block:
+        node = self.__root
+        if key is None:
+            while node.children is not None:
+                node = node.children[0]
+            return node
+        while node.children is not None:
+            node = node.children[bisect_right(node.keys, key)]
+        return node
+
+    # yields every leaf in order
+    def __leaves(self):
+        node = self.__leaf()
+        while node is not None:
+            yield node
+            node = node.next
+
+    # yields the keys under a block in descending order
+    def __backwards(self, node):
+        if node.children is None:
+            yield from reversed(node.keys)
+            return
+        for child in reversed(node.children):
+            yield from self.__backwards(child)
+
+    # returns the last key that find puts before key, where find is bisect_right for
+    # the floor and bisect_left for lower. the nearest subtree to the left on the way
+    # down holds the answer when the leaf does not
+    def __below(self, key, find):
+        node = self.__root
+        left = None
+        while node.children is not None:
+            i = bisect_right(node.keys, key)
+            if i:
+                left = node.children[i - 1]
+            node = node.children[i]
+        i = find(node.keys, key)
+        if i:
+            return node.keys[i - 1]
+        if left is None:
+            return None
+        while left.children is not None:
+            left = left.children[-1]
+        return left.keys[-1]
+
+    # returns the first key that find puts at or after key, where find is bisect_left
+    # for the ceiling and bisect_right for higher. the next leaf holds the answer when
+    # the leaf does not
+    def __above(self, key, find):
+        node = self.__leaf(key)
+        i = find(node.keys, key)
+        if i < len(node.keys):
+            return node.keys[i]
+        return node.next.keys[0] if node.next is not None else None
+
+    # returns num of keys below key, or at or below it when inclusive
+    def __count_below(self, key, inclusive = False) -> int:
+        node = self.__root
+        count = 0
+        while node.children is not None:
+            i = bisect_right(node.keys, key)
+            if i:
+                count -= -self.__totals(node)[i - 1]
+            node = node.children[i]
+        return count + (bisect_right if inclusive else bisect_left)(node.keys, key)
+
+    # splits an over full block in two, and its parent in turn if that overflows.
+    # path holds every branch above the block, with the child index taken there
+    def __split(self, node, path):
+        while _occupancy(node) > self.fanout:
+            if node.children is None:
+                mid = len(node.keys) // 2
+                sibling = _Block(node.keys[mid:], node.values[mid:])
+                separator = sibling.keys[0]
+                del node.keys[mid:]
+                del node.values[mid:]
+                sibling.next = node.next
+                node.next = sibling
+            else:
+                mid = len(node.children) // 2
+                separator = node.keys[mid - 1]
+                sibling = _Block(node.keys[mid:], children=node.children[mid:], counts=node.counts[mid:])
+                del node.keys[mid - 1:]
+                del node.children[mid:]
+                del node.counts[mid:]
+                node.totals = None
+
+            if not path: # the root split, so the tree grows a level
+                self.__root = _Block([separator], children=[node, sibling], counts=[_size(node), _size(sibling)])
+                return
+            parent, i = path.pop()
+            parent.keys.insert(i, separator)
+            parent.children.insert(i + 1, sibling)
+            parent.counts[i] = _size(node)
+            parent.counts.insert(i + 1, _size(sibling))
+            parent.totals = None
+            node = parent
+
+    # refills an under full block from a sibling, merging the two when they fit in
+    # one block, which can leave the parent under full in turn
+    def __refill(self, node, path):
+        while path and _occupancy(node) < self.__minimum:
+            parent, i = path.pop()
+            s = i - 1 if i else i # the separator between left and right
+            left = parent.children[s]
+            right = parent.children[s + 1]
+
+            if node.children is None:
+                keys = left.keys + right.keys
+                values = left.values + right.values
+                merge = len(keys) <= self.fanout
+                if merge:
+                    left.keys, left.values = keys, values
+                    left.next = right.next
+                else:
+                    mid = len(keys) // 2
+                    left.keys, left.values = keys[:mid], values[:mid]
+                    right.keys, right.values = keys[mid:], values[mid:]
+                    parent.keys[s] = right.keys[0]
+            else:
+                keys = left.keys + [parent.keys[s]] + right.keys
+                children = left.children + right.children
+                counts = left.counts + right.counts
+                merge = len(children) <= self.fanout
+                if merge:
+                    left.keys, left.children, left.counts = keys, children, counts
+                else:
+                    mid = len(children) // 2
+                    left.keys, left.children, left.counts = keys[:mid - 1], children[:mid], counts[:mid]
+                    right.keys, right.children, right.counts = keys[mid:], children[mid:], counts[mid:]
+                    parent.keys[s] = keys[mid - 1]
+
+            left.totals = right.totals = parent.totals = None
+            if merge: # right is gone, left holds both
+                del parent.keys[s]
+                del parent.children[s + 1]
+                del parent.counts[s + 1]
+                parent.counts[s] = _size(left)
+            else:
+                parent.counts[s] = _size(left)
+                parent.counts[s + 1] = _size(right)
+            node = parent
+
+        root = self.__root
+        while root.children is not None and len(root.children) == 1: # the root lost its last sibling
+            root = root.children[0]
+        self.__root = root
+
+    # fills the tree with sorted keys and values, every block as full as it may be
+    def __build(self, keys, values):
+        self.__size = len(keys)
+        if not keys:
+            self.__root = _Block([], [])
+            return
+        level = []
+        firsts = []
+        for start, stop in _runs(len(keys), self.fanout):
+            leaf = _Block(keys[start:stop], values[start:stop])
+            if level:
+                level[-1].next = leaf
+            level.append(leaf)
+            firsts.append(keys[start])
+        counts = [len(leaf.keys) for leaf in level]
+
+        while len(level) > 1:
+            branches = []
+            branch_firsts = []
+            branch_counts = []
+            for start, stop in _runs(len(level), self.fanout):
+                branch = _Block(firsts[start + 1:stop], children=level[start:stop], counts=counts[start:stop])
+                branches.append(branch)
+                branch_firsts.append(firsts[start])
+                branch_counts.append(sum(branch.counts))
+            level, firsts, counts = branches, branch_firsts, branch_counts
+        self.__root = level[0]
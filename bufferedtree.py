@@ -0,0 +1,363 @@
+from redblacktree import RedBlackTree
+
+# marks a key deleted in the write buffer
+_TOMBSTONE = object()
+
+# marks a key the write buffer knows nothing about
+_MISSING = object()
+
+
+class BufferedRedBlackTree:
+
+    """
+        This class puts a write buffer in front of a RedBlackTree. put and delete
+        only record the write in a dict, where a later write to a key replaces the
+        earlier one and a delete leaves a tombstone, so a burst of writes costs a
+        hash update each instead of a walk and rebalance. The buffer is applied to
+        the tree in one sorted batch, through put_many, once it holds buffer_size
+        keys, and before any query that needs the keys in order.
+        get and contains_key answer from the buffer first and never flush it.
+
+        Keys must be hashable, or with a key function, what it returns for them.
+        The buffer then holds each write under that result, so keys the function
+        finds equal share one buffered write, the last one winning. Like
+        RedBlackTree, it is not safe for threads on its own.
+    """
+
+    __author__ = "Silver Lippert"
+    __version__ = "23.11.5"
+
+    def __init__(self, tree = None, buffer_size = 16384, **options):
+        """
+            Wraps tree, or a new RedBlackTree built with the keyword options. The
+            wrapped tree must not be used directly, other than through the tree
+            attribute, which flushes first.
+        """
+        self.__tree = tree if tree is not None else RedBlackTree(**options)
+        self.__order = self.__tree.get_key_function()
+        self.buffer_size = buffer_size
+        self.__buffer = {} # key -> value, or with a key function, its result -> (key, value)
+
+    # the wrapped tree, with every buffered write applied
+    @property
+    def tree(self) -> RedBlackTree:
+        """
+            The wrapped tree, after flushing the buffer into it.
+        """
+        self.flush()
+        return self.__tree
+
+    # returns num of writes waiting in the buffer
+    def pending(self) -> int:
+        """
+            This method returns how many keys have a write waiting in the buffer.
+        """
+        return len(self.__buffer)
+
+    # applies every buffered write to the tree as one sorted batch
+    def flush(self):
+        """
+            This method applies the buffered puts and deletes with one put_many,
+            then empties the buffer. A buffer large next to the tree becomes a
+            single linear merge and rebuild, a small one sorted puts and deletes.
+        """
+        if not self.__buffer:
+            return
+        puts = []
+        deletes = []
+        writes = self.__buffer.items() if self.__order is None else self.__buffer.values()
+        for key, value in writes:
+            if value is _TOMBSTONE:
+                deletes.append(key)
+            else:
+                puts.append((key, value))
+        self.__buffer = {}
+        self.__tree.put_many(puts, deletes)
+
+    # inserts a new k / v pair
+    def put(self, key, value):
+        """
+            This method records a key / value pair in the buffer, replacing any
+            earlier write to the key, and flushes once the buffer is full.
+        """
+        buffer = self.__buffer
+        if self.__order is None:
+            buffer[key] = value
+        else:
+            buffer[self.__order(key)] = (key, value)
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+
+    # inserts many k / v pairs, later pairs win on repeated keys
+    def put_many(self, items):
+        """
+            This method records many key / value pairs (or a mapping) in the buffer,
+            flushing once it is full.
+        """
+        if self.__order is None:
+            self.__buffer.update(items)
+        else:
+            if hasattr(items, "items"):
+                items = items.items()
+            order = self.__order
+            self.__buffer.update((order(key), (key, value)) for key, value in items)
+        if len(self.__buffer) >= self.buffer_size:
+            self.flush()
+
+    # removes a k / v pair, returns deleted val, or none if key DNE
+    def delete(self, key):
+        """
+            This method records a delete in the buffer and returns the value the key
+            had, or None if the key DNE. Finding that value can take a lookup in
+            the tree.
+        """
+        value = self.get(key)
+        if self.__order is None:
+            self.__buffer[key] = _TOMBSTONE
+        else:
+            self.__buffer[self.__order(key)] = (key, _TOMBSTONE)
+        if len(self.__buffer) >= self.buffer_size:
+            self.flush()
+        return value
+
+    # get returns value of given key, or none if key does not exist
+    def get(self, key):
+        """
+            This method returns the value of a key, or None if the key DNE. A key
+            with a buffered write is answered from the buffer, anything else from
+            the tree.
+        """
+        value = self.__buffered(key)
+        if value is _MISSING:
+            return self.__tree.get(key)
+        if value is _TOMBSTONE:
+            return None
+        return value
+
+    # returns true if key is present
+    def contains_key(self, key) -> bool:
+        """
+            This method returns whether the key is in the tree, with its buffered
+            write counted.
+        """
+        value = self.__buffered(key)
+        if value is _MISSING:
+            return self.__tree.contains_key(key)
+        return value is not _TOMBSTONE
+
+    # returns the buffered value of key, _TOMBSTONE, or _MISSING if it has no write waiting
+    def __buffered(self, key):
+        if self.__order is None:
+            return self.__buffer.get(key, _MISSING)
+        write = self.__buffer.get(self.__order(key))
+        return _MISSING if write is None else write[1]
+
+    # returns num of k / v pairs
+    def __len__(self) -> int:
+        """
+        returns number of key / value pairs, after a flush
+        """
+        self.flush()
+        return len(self.__tree)
+
+    # returns true if tree is empty
+    def is_empty(self) -> bool:
+        """
+            This method returns whether the tree has any pairs in it, after a flush.
+        """
+        self.flush()
+        return self.__tree.is_empty()
+
+    # iterates over keys in order
+    def __iter__(self):
+        """
+            This method flushes, then returns an iterator over the keys in ascending
+            order.
+        """
+        self.flush()
+        return iter(self.__tree)
+
+    # iterates over keys in reverse order
+    def __reversed__(self):
+        """
+            This method flushes, then returns an iterator over the keys in descending
+            order.
+        """
+        self.flush()
+        return reversed(self.__tree)
+
+    # yields every key in order
+    def keys(self):
+        """
+            This method flushes, then lazily yields every key in ascending order.
+        """
+        self.flush()
+        return self.__tree.keys()
+
+    # yields every value in key order
+    def values(self):
+        """
+            This method flushes, then lazily yields every value, ordered by their keys.
+        """
+        self.flush()
+        return self.__tree.values()
+
+    # yields every k / v pair in key order
+    def items(self):
+        """
+            This method flushes, then lazily yields every key / value pair in
+            ascending key order.
+        """
+        self.flush()
+        return self.__tree.items()
+
+    # yields k / v pairs with lo <= key <= hi in order, none means unbounded
+    def range(self, lo = None, hi = None, inclusive = (True, True)):
+        """
+            This method flushes, then lazily yields the key / value pairs between lo
+            and hi, the same way RedBlackTree.range does.
+        """
+        self.flush()
+        return self.__tree.range(lo, hi, inclusive)
+
+    # returns num of keys with lo <= key <= hi, none means unbounded
+    def count_range(self, lo = None, hi = None, inclusive = (True, True)) -> int:
+        """
+            This method flushes, then counts the keys between lo and hi.
+        """
+        self.flush()
+        return self.__tree.count_range(lo, hi, inclusive)
+
+    # returns smallest key, or none if there is none
+    def find_first_key(self):
+        """
+            This method flushes, then returns the smallest key.
+        """
+        self.flush()
+        return self.__tree.find_first_key()
+
+    # returns largest key or none if there is none
+    def find_last_key(self):
+        """
+            This method flushes, then returns the largest key.
+        """
+        self.flush()
+        return self.__tree.find_last_key()
+
+    # returns predecessor of given key or none if key DNE or has no pred.
+    def find_predecessor(self, key):
+        """
+            This method flushes, then returns the key just before the given one, or
+            None if the key DNE or has no predecessor.
+        """
+        self.flush()
+        return self.__tree.find_predecessor(key)
+
+    # returns successor of key, or none if key DNE or has no succ.
+    def find_successor(self, key):
+        """
+            This method flushes, then returns the key just after the given one, or
+            None if the key DNE or has no successor.
+        """
+        self.flush()
+        return self.__tree.find_successor(key)
+
+    # returns largest key <= key, or none if there is none
+    def floor(self, key):
+        """
+            This method flushes, then returns the largest key at or below the given one.
+        """
+        self.flush()
+        return self.__tree.floor(key)
+
+    # returns smallest key >= key, or none if there is none
+    def ceiling(self, key):
+        """
+            This method flushes, then returns the smallest key at or above the given one.
+        """
+        self.flush()
+        return self.__tree.ceiling(key)
+
+    # returns largest key < key, or none if there is none
+    def lower(self, key):
+        """
+            This method flushes, then returns the largest key strictly below the given one.
+        """
+        self.flush()
+        return self.__tree.lower(key)
+
+    # returns smallest key > key, or none if there is none
+    def higher(self, key):
+        """
+            This method flushes, then returns the smallest key strictly above the given one.
+        """
+        self.flush()
+        return self.__tree.higher(key)
+
+    # returns the key closest to key, or none if tree is empty
+    def nearest(self, key):
+        """
+            This method flushes, then returns the key closest to the given one.
+        """
+        self.flush()
+        return self.__tree.nearest(key)
+
+    # returns rank of key, or -1 if key DNE
+    def find_rank(self, key) -> int:
+        """
+            This method flushes, then returns the 0 indexed rank of a key, or -1 if
+            it DNE.
+        """
+        self.flush()
+        return self.__tree.find_rank(key)
+
+    # returns key of the given rank, or none if rank is invalid, 0 index
+    def select(self, rank: int):
+        """
+            This method flushes, then returns the key at a 0 indexed rank, or None
+            if the rank is invalid.
+        """
+        self.flush()
+        return self.__tree.select(rank)
+
+    # returns the rank of every key in keys, or -1 for keys that DNE
+    def rank_many(self, keys):
+        """
+            This method flushes, then returns the ranks of many keys, like
+            RedBlackTree.rank_many.
+        """
+        self.flush()
+        return self.__tree.rank_many(keys)
+
+    # returns the key at every rank in ranks, or none for invalid ranks
+    def select_many(self, ranks):
+        """
+            This method flushes, then returns the keys at many ranks, like
+            RedBlackTree.select_many.
+        """
+        self.flush()
+        return self.__tree.select_many(ranks)
+
+    # returns the aggregate of the values with lo <= key <= hi, none means unbounded
+    def range_aggregate(self, lo = None, hi = None, inclusive = (True, True)):
+        """
+            This method flushes, then returns RedBlackTree.range_aggregate.
+        """
+        self.flush()
+        return self.__tree.range_aggregate(lo, hi, inclusive)
+
+    # returns the aggregate of the values with keys up to key
+    def prefix_aggregate(self, key, inclusive = True):
+        """
+            This method flushes, then returns RedBlackTree.prefix_aggregate.
+        """
+        self.flush()
+        return self.__tree.prefix_aggregate(key, inclusive)
+
+    # returns true if the tree follows every red-black rule
+    def is_valid(self) -> bool:
+        """
+            This method flushes, then checks the tree with RedBlackTree.is_valid.
+        """
+        self.flush()
+        return self.__tree.is_valid()
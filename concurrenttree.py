@@ -0,0 +1,512 @@
+import threading
+from contextlib import contextmanager
+
+from redblacktree import RedBlackTree
+
+
+class ReadWriteLock:
+
+    """
+        This class implements a readers-writer lock. Any number of readers can
+        hold it at once, while a writer holds it alone. Waiting writers go first,
+        so a steady stream of readers can't starve them. The lock is not
+        reentrant: a thread must not take it again while holding it.
+    """
+
+    __author__ = "Silver Lippert"
+    __version__ = "23.11.5"
+
+    def __init__(self):
+        self.__condition = threading.Condition(threading.Lock())
+        self.__readers = 0 # readers holding the lock
+        self.__writing = False # whether a writer holds the lock
+        self.__writers_waiting = 0
+
+    # blocks until no writer holds or waits for the lock, then joins the readers
+    def acquire_read(self):
+        with self.__condition:
+            while self.__writing or self.__writers_waiting:
+                self.__condition.wait()
+            self.__readers -= -1
+
+    # leaves the readers, waking writers once the last reader is gone
+    def release_read(self):
+        with self.__condition:
+            self.__readers -= 1
+            if self.__readers == 0:
+                self.__condition.notify_all()
+
+    # blocks until nobody else holds the lock, then takes it alone
+    def acquire_write(self):
+        with self.__condition:
+            self.__writers_waiting -= -1
+            while self.__writing or self.__readers:
+                self.__condition.wait()
+            self.__writers_waiting -= 1
+            self.__writing = True
+
+    # gives the lock up, waking every waiting reader and writer
+    def release_write(self):
+        with self.__condition:
+            self.__writing = False
+            self.__condition.notify_all()
+
+    # holds the lock as a reader for the length of a with block
+    @contextmanager
+    def reading(self):
+        """
+            Holds the lock as a reader for the length of a with block.
+        """
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    # holds the lock as the writer for the length of a with block
+    @contextmanager
+    def writing(self):
+        """
+            Holds the lock as the only writer for the length of a with block.
+        """
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class ConcurrentRedBlackTree:
+
+    """
+        This class wraps a RedBlackTree so that it can be shared between threads.
+        Lookups, order statistics and range scans take a readers-writer lock as
+        readers and can run alongside each other, while the writes, and the
+        statistics that resync the tree's counters, take it alone. Methods that would hand out a lazy iterator return a list
+        instead, so the lock is never held by a half finished generator. For
+        several reads that have to see the same version of the tree, hold
+        tree.lock.reading() around them and use tree.unsafe_tree inside.
+    """
+
+    __author__ = "Silver Lippert"
+    __version__ = "23.11.5"
+
+    def __init__(self, tree = None, **options):
+        """
+            Wraps tree, or a new RedBlackTree built with the keyword options. The
+            wrapped tree must not be used directly once it is shared.
+        """
+        self.__tree = tree if tree is not None else RedBlackTree(**options)
+        self.lock = ReadWriteLock()
+
+    # the wrapped tree, only safe to touch while holding the lock
+    @property
+    def unsafe_tree(self) -> RedBlackTree:
+        """
+            The wrapped tree. Only use it while holding the matching side of lock.
+        """
+        return self.__tree
+
+    # inserts a new k / v pair
+    def put(self, key, value):
+        """
+            This method inserts a key / value pair, or replaces the value of a key
+            that already exists, while holding the lock alone.
+        """
+        with self.lock.writing():
+            self.__tree.put(key, value)
+
+    # inserts many k / v pairs at once
+    def put_many(self, items, deletes = ()):
+        """
+            This method inserts a batch of key / value pairs, and removes the keys in
+            deletes, as one write, so readers see either none of it or all of it.
+            See RedBlackTree.put_many.
+        """
+        items = list(items.items() if hasattr(items, "items") else items) # read the input before locking
+        deletes = list(deletes)
+        with self.lock.writing():
+            self.__tree.put_many(items, deletes)
+
+    # removes a k / v pair, returns deleted val, or none if key DNE
+    def delete(self, key):
+        """
+            This method removes a key and returns its value, or None if the key DNE,
+            while holding the lock alone.
+        """
+        with self.lock.writing():
+            return self.__tree.delete(key)
+
+    # removes many keys at once, returns how many were in the tree
+    def delete_many(self, keys) -> int:
+        """
+            This method removes every key of an iterable that is in the tree as one
+            write, and returns how many it removed. See RedBlackTree.delete_many.
+        """
+        keys = list(keys) # read the input before locking
+        with self.lock.writing():
+            return self.__tree.delete_many(keys)
+
+    # get returns value of given key, or none if key does not exist
+    def get(self, key):
+        """
+            This method returns the value of a key, or None if the key DNE.
+        """
+        with self.lock.reading():
+            return self.__tree.get(key)
+
+    # returns true if key is present
+    def contains_key(self, key) -> bool:
+        """
+            This method returns whether the key is in the tree.
+        """
+        with self.lock.reading():
+            return self.__tree.contains_key(key)
+
+    # returns true if value is present
+    def contains_value(self, value) -> bool:
+        """
+            This method returns whether any key maps to the value.
+        """
+        with self.lock.reading():
+            return self.__tree.contains_value(value)
+
+    # finds key that maps to val, or none if DNE
+    def reverse_lookup(self, value):
+        """
+            This method returns a key that maps to the value, or None.
+        """
+        with self.lock.reading():
+            return self.__tree.reverse_lookup(value)
+
+    # returns num of k / v pairs
+    def __len__(self) -> int:
+        """
+        returns number of key / value pairs
+        """
+        with self.lock.reading():
+            return len(self.__tree)
+
+    # returns true if tree is empty
+    def is_empty(self) -> bool:
+        """
+            This method returns whether the tree has any pairs in it.
+        """
+        with self.lock.reading():
+            return self.__tree.is_empty()
+
+    # returns smallest key
+    def find_first_key(self):
+        """
+            This method returns the smallest key.
+        """
+        with self.lock.reading():
+            return self.__tree.find_first_key()
+
+    # returns largest key
+    def find_last_key(self):
+        """
+            This method returns the largest key.
+        """
+        with self.lock.reading():
+            return self.__tree.find_last_key()
+
+    # returns predecessor of given key or none if key DNE or has no pred.
+    def find_predecessor(self, key):
+        """
+            This method returns the key just before the given one, or None.
+        """
+        with self.lock.reading():
+            return self.__tree.find_predecessor(key)
+
+    # returns successor of key, or none if key DNE or has no succ.
+    def find_successor(self, key):
+        """
+            This method returns the key just after the given one, or None.
+        """
+        with self.lock.reading():
+            return self.__tree.find_successor(key)
+
+    # returns largest key <= key, or none if there is none
+    def floor(self, key):
+        """
+            This method returns the largest key at or below the given one, see RedBlackTree.floor.
+        """
+        with self.lock.reading():
+            return self.__tree.floor(key)
+
+    # returns smallest key >= key, or none if there is none
+    def ceiling(self, key):
+        """
+            This method returns the smallest key at or above the given one, see RedBlackTree.ceiling.
+        """
+        with self.lock.reading():
+            return self.__tree.ceiling(key)
+
+    # returns largest key < key, or none if there is none
+    def lower(self, key):
+        """
+            This method returns the largest key strictly below the given one, see RedBlackTree.lower.
+        """
+        with self.lock.reading():
+            return self.__tree.lower(key)
+
+    # returns smallest key > key, or none if there is none
+    def higher(self, key):
+        """
+            This method returns the smallest key strictly above the given one, see RedBlackTree.higher.
+        """
+        with self.lock.reading():
+            return self.__tree.higher(key)
+
+    # returns the key closest to key, or none if tree is empty
+    def nearest(self, key):
+        """
+            This method returns the key closest to the given one, see RedBlackTree.nearest.
+        """
+        with self.lock.reading():
+            return self.__tree.nearest(key)
+
+    # returns rank of key, or -1 if key DNE
+    def find_rank(self, key) -> int:
+        """
+            This method returns the 0 indexed rank of a key, or -1 if it DNE.
+        """
+        with self.lock.reading():
+            return self.__tree.find_rank(key)
+
+    # returns key of the given rank, or none if rank is invalid, 0 index
+    def select(self, rank: int):
+        """
+            This method returns the key at a 0 indexed rank, or None.
+        """
+        with self.lock.reading():
+            return self.__tree.select(rank)
+
+    # returns the rank of every key in keys
+    def rank_many(self, keys):
+        """
+            This method returns the ranks of many keys, all from the same version
+            of the tree.
+        """
+        keys = list(keys)
+        with self.lock.reading():
+            return self.__tree.rank_many(keys)
+
+    # returns the key at every rank in ranks
+    def select_many(self, ranks):
+        """
+            This method returns the keys at many ranks, all from the same version
+            of the tree.
+        """
+        ranks = list(ranks)
+        with self.lock.reading():
+            return self.__tree.select_many(ranks)
+
+    # returns the floor of every key in keys
+    def floor_many(self, keys):
+        """
+            This method answers floor for many keys, all from the same version of the tree.
+        """
+        keys = list(keys)
+        with self.lock.reading():
+            return self.__tree.floor_many(keys)
+
+    # returns the ceiling of every key in keys
+    def ceiling_many(self, keys):
+        """
+            This method answers ceiling for many keys, all from the same version of the tree.
+        """
+        keys = list(keys)
+        with self.lock.reading():
+            return self.__tree.ceiling_many(keys)
+
+    # returns the lower of every key in keys
+    def lower_many(self, keys):
+        """
+            This method answers lower for many keys, all from the same version of the tree.
+        """
+        keys = list(keys)
+        with self.lock.reading():
+            return self.__tree.lower_many(keys)
+
+    # returns the higher of every key in keys
+    def higher_many(self, keys):
+        """
+            This method answers higher for many keys, all from the same version of the tree.
+        """
+        keys = list(keys)
+        with self.lock.reading():
+            return self.__tree.higher_many(keys)
+
+    # returns the nearest of every key in keys
+    def nearest_many(self, keys):
+        """
+            This method answers nearest for many keys, all from the same version of the tree.
+        """
+        keys = list(keys)
+        with self.lock.reading():
+            return self.__tree.nearest_many(keys)
+
+    # returns k / v pairs with lo <= key <= hi in order, none means unbounded
+    def range(self, lo = None, hi = None, inclusive = (True, True)) -> list:
+        """
+            This method returns a list of the key / value pairs between lo and hi,
+            all from the same version of the tree. See RedBlackTree.range.
+        """
+        with self.lock.reading():
+            return list(self.__tree.range(lo, hi, inclusive))
+
+    # returns num of keys with lo <= key <= hi, none means unbounded
+    def count_range(self, lo = None, hi = None, inclusive = (True, True)) -> int:
+        """
+            This method counts the keys between lo and hi in O(log n).
+        """
+        with self.lock.reading():
+            return self.__tree.count_range(lo, hi, inclusive)
+
+    # returns the aggregate of the values with lo <= key <= hi, none means unbounded
+    def range_aggregate(self, lo = None, hi = None, inclusive = (True, True)):
+        """
+            This method returns the aggregate of the values between lo and hi,
+            see RedBlackTree.range_aggregate.
+        """
+        with self.lock.reading():
+            return self.__tree.range_aggregate(lo, hi, inclusive)
+
+    # returns the aggregate of the values with keys up to key
+    def prefix_aggregate(self, key, inclusive = True):
+        """
+            This method returns the aggregate of the values up to key,
+            see RedBlackTree.prefix_aggregate.
+        """
+        with self.lock.reading():
+            return self.__tree.prefix_aggregate(key, inclusive)
+
+    # returns every k / v pair in key order
+    def items(self) -> list:
+        """
+            This method returns a list of every key / value pair in key order.
+        """
+        with self.lock.reading():
+            return list(self.__tree.items())
+
+    # returns every key in order
+    def keys(self) -> list:
+        """
+            This method returns a list of every key in order.
+        """
+        with self.lock.reading():
+            return list(self.__tree.keys())
+
+    # returns every value in key order
+    def values(self) -> list:
+        """
+            This method returns a list of every value, ordered by their keys.
+        """
+        with self.lock.reading():
+            return list(self.__tree.values())
+
+    # iterates over keys in order
+    def __iter__(self):
+        """
+            This method returns an iterator over a list of the keys, in ascending
+            order, all from the same version of the tree.
+        """
+        return iter(self.keys())
+
+    # iterates over keys in reverse order
+    def __reversed__(self):
+        """
+            This method returns an iterator over a list of the keys, in descending
+            order, all from the same version of the tree.
+        """
+        with self.lock.reading():
+            return iter(list(reversed(self.__tree)))
+
+    # returns how well the lookup cache is doing
+    def cache_info(self) -> dict:
+        """
+            This method returns the lookup cache counts, see RedBlackTree.cache_info.
+            Readers update the cache side by side, so under heavy contention a few
+            hits or misses may go uncounted.
+        """
+        with self.lock.reading():
+            return self.__tree.cache_info()
+
+    # empties the lookup cache and resets its counters
+    def cache_clear(self):
+        """
+            This method empties the lookup cache, see RedBlackTree.cache_clear.
+        """
+        with self.lock.writing():
+            self.__tree.cache_clear()
+
+    # returns key at the root or none if not there
+    def get_root_key(self):
+        """
+            This method returns the key at the root of the tree, or None if empty.
+        """
+        with self.lock.reading():
+            return self.__tree.get_root_key()
+
+    # returns num of red nodes in the tree
+    def count_red_nodes(self) -> int:
+        """
+            This method returns the number of red nodes, see RedBlackTree.count_red_nodes.
+            It can resync the tree's counters, so it holds the lock alone.
+        """
+        with self.lock.writing():
+            return self.__tree.count_red_nodes()
+
+    # returns height of tree, where an empty tree has height of 0
+    def calc_height(self) -> int:
+        """
+            This method returns the height of the tree, see RedBlackTree.calc_height.
+            It walks the tree through stats, so it holds the lock alone.
+        """
+        with self.lock.writing():
+            return self.__tree.calc_height()
+
+    # returns lowest and highest possible height, without walking the tree
+    def height_bounds(self) -> tuple:
+        """
+            This method returns bounds on the height, see RedBlackTree.height_bounds.
+        """
+        with self.lock.reading():
+            return self.__tree.height_bounds()
+
+    # returns black height of tree, or 0 for empty tree
+    def calc_black_height(self) -> int:
+        """
+            This method returns the black height of the tree, or 0 if it is empty.
+        """
+        with self.lock.reading():
+            return self.__tree.calc_black_height()
+
+    # returns av distance of nodes from the root. Empty trees return NaN
+    def calc_average_depth(self) -> float:
+        """
+            This method returns the average depth of the nodes, see
+            RedBlackTree.calc_average_depth. It can resync the tree's counters, so
+            it holds the lock alone.
+        """
+        with self.lock.writing():
+            return self.__tree.calc_average_depth()
+
+    # returns every tree statistic from a single walk
+    def stats(self) -> dict:
+        """
+            This method returns the tree statistics, see RedBlackTree.stats. It
+            resyncs the tree's counters, so it holds the lock alone.
+        """
+        with self.lock.writing():
+            return self.__tree.stats()
+
+    # returns true if the tree follows every red-black rule
+    def is_valid(self) -> bool:
+        """
+            This method checks every tree invariant, see RedBlackTree.is_valid.
+        """
+        with self.lock.reading():
+            return self.__tree.is_valid()
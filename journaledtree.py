@@ -0,0 +1,482 @@
+import io
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from operator import itemgetter
+
+from mappedtree import MappedRedBlackTree
+from redblacktree import RedBlackTree, write_snapshot
+
+# journal segments start with a header, then hold frames of [crc32][length][payload],
+# where the payload is a run of pickled records: (key, value) for a put and (key,) for
+# a delete. a torn or damaged frame fails its checksum, and recovery stops reading the
+# segment there, so a frame counts whole or not at all
+JOURNAL_MAGIC = b"RBTJRNL\x00"
+JOURNAL_VERSION = 1
+JOURNAL_HEADER = struct.Struct("<8sI") # magic, version
+JOURNAL_FRAME = struct.Struct("<II") # crc32 of the payload, payload length
+
+# fsync after every put / delete, after every group of them, or never. with none the
+# groups are still handed to the operating system, so a crash of the process loses
+# nothing that was written out, but a power cut can
+SYNC_POLICIES = ("always", "group", "none")
+
+# marks a key the journal deleted, while records are being merged
+_DELETED = object()
+
+
+# returns the number in a segment or snapshot file name, or none for other files
+def _number(name, prefix, suffix):
+    if name.startswith(prefix) and name.endswith(suffix):
+        digits = name[len(prefix):-len(suffix)]
+        if digits.isdigit():
+            return int(digits)
+    return None
+
+
+# forces a file (or on posix, a directory's entries) to disk
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# reads every record of a segment into changes, the last record for a key winning.
+# with a key function, changes are kept under what it returns for the key, holding
+# the (key, value) pair, so the last record wins for keys it finds equal too.
+# stops at the end, or at the first frame that is torn or fails its checksum.
+# returns the number of records read
+def _replay_segment(path, changes, order = None) -> int:
+    with open(path, "rb") as source:
+        data = source.read()
+    if len(data) < JOURNAL_HEADER.size: # torn while the header was written
+        return 0
+    magic, version = JOURNAL_HEADER.unpack_from(data, 0)
+    if magic != JOURNAL_MAGIC:
+        raise ValueError(f"{path} is not a journal segment")
+    if version != JOURNAL_VERSION:
+        raise ValueError(f"unsupported journal version {version} in {path}")
+
+    records = 0
+    position = JOURNAL_HEADER.size
+    view = memoryview(data)
+    while position + JOURNAL_FRAME.size <= len(data):
+        crc, length = JOURNAL_FRAME.unpack_from(data, position)
+        start = position + JOURNAL_FRAME.size
+        payload = view[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        stream = io.BytesIO(payload)
+        load = pickle.Unpickler(stream).load
+        while stream.tell() < length:
+            record = load()
+            if order is None:
+                changes[record[0]] = record[1] if len(record) == 2 else _DELETED
+            else:
+                changes[order(record[0])] = record if len(record) == 2 else _DELETED
+            records -= -1
+        position = start + length
+    return records
+
+
+# merges sorted changes into sorted pairs, dropping deleted keys, and yields the
+# pairs in order. a change wins over a pair with the same key. with a key function,
+# both are in its order and are merged on what it returns, which the changes are
+# already kept under, as _replay_segment leaves them
+def _merged(pairs, changes, key = None):
+    if key is not None:
+        pairs = ((key(k), (k, v)) for k, v in pairs)
+        for _, pair in _merged(pairs, changes):
+            yield pair
+        return
+    changes = iter(changes)
+    change = next(changes, None)
+    for key, value in pairs:
+        while change is not None and change[0] < key:
+            if change[1] is not _DELETED:
+                yield change
+            change = next(changes, None)
+        if change is not None and change[0] == key:
+            if change[1] is not _DELETED:
+                yield change
+            change = next(changes, None)
+        else:
+            yield key, value
+    while change is not None:
+        if change[1] is not _DELETED:
+            yield change
+        change = next(changes, None)
+
+
+class JournaledRedBlackTree:
+
+    """
+        This class makes a RedBlackTree durable. Every put and delete is appended
+        to a journal on disk before it returns (or with its group, see sync),
+        and opening the same directory again rebuilds the tree from the newest
+        snapshot plus the journal written since. Recovery does not replay one put
+        per record: it keeps the last record for each key, sorts those, and merges
+        them with the snapshot into a balanced tree in one linear pass.
+
+        The journal is split into segments. Once compact_bytes have been journaled
+        since the last snapshot, the current segment is sealed and a background
+        thread merges the last snapshot and the sealed segments into a new
+        snapshot, then removes them. It reads only files, never the live tree, so
+        writes carry on meanwhile. Keys must be hashable, and keys and values
+        picklable. Reads go straight to the tree, which is also open as the tree
+        attribute; only write through this class. Like RedBlackTree, it is not
+        safe for threads on its own. Records and snapshots are unpickled on
+        recovery, so only open directories that nobody else can write to.
+    """
+
+    __author__ = "Silver Lippert"
+    __version__ = "23.11.5"
+
+    def __init__(self, directory, sync = "group", group_size = 256, group_delay = 0.005,
+                 compact_bytes = 64 * 2**20, **options):
+        """
+            Opens (or creates) the journal in directory and recovers the tree from it.
+            sync is one of SYNC_POLICIES. With "group", writes are gathered and
+            written with one fsync once group_size of them are waiting, or once the
+            oldest has waited group_delay seconds, which a background thread sees to
+            even if no other write comes. flush and close write out whatever is
+            waiting. Any other keyword options are passed on to the RedBlackTree.
+        """
+        if sync not in SYNC_POLICIES:
+            raise ValueError(f"sync must be one of {SYNC_POLICIES}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.sync = sync
+        self.group_size = group_size
+        self.group_delay = group_delay
+        self.compact_bytes = compact_bytes
+        self.__options = options
+        self.__order = options.get("key") # a key function of the tree, if it has one
+
+        self.__buffer = [] # pickled records not yet written
+        self.__buffered_at = 0.0
+        self.__lock = threading.Lock() # guards the buffer and the segment, shared with the flusher
+        self.__waiting = threading.Condition(self.__lock)
+        self.__flusher = None
+        self.__flush_error = None
+        self.__compactor = None
+        self.__compaction_error = None
+        self.__fd = None
+
+        start = time.perf_counter()
+        self.tree, self.__snapshot, self.__segment, self.__journal_bytes, records = self.__recover()
+        self.recovery = {"seconds": time.perf_counter() - start, "records": records, "pairs": len(self.tree)}
+        self.__open_segment()
+        if sync != "always":
+            self.__flusher = threading.Thread(target=self.__flush_when_due, name="journal flusher", daemon=True)
+            self.__flusher.start()
+
+    # inserts a new k / v pair and journals it
+    def put(self, key, value):
+        """
+            This method inserts a key / value pair, or replaces the value if the key
+            already exists, and journals the change.
+        """
+        record = pickle.dumps((key, value), pickle.HIGHEST_PROTOCOL)
+        self.tree.put(key, value)
+        self.__append((record,))
+
+    # inserts many k / v pairs and journals them as one group
+    def put_many(self, items):
+        """
+            This method inserts many key / value pairs (or a mapping) through
+            RedBlackTree.put_many, and journals them together.
+        """
+        if hasattr(items, "items"):
+            items = items.items()
+        items = list(items)
+        records = [pickle.dumps(pair, pickle.HIGHEST_PROTOCOL) for pair in items]
+        self.tree.put_many(items)
+        self.__append(records)
+
+    # removes a k / v pair and journals it, returns deleted val, or none if key DNE
+    def delete(self, key):
+        """
+            This method removes a key, journals the change, and returns the removed
+            value, or None if the key DNE.
+        """
+        record = pickle.dumps((key,), pickle.HIGHEST_PROTOCOL)
+        value = self.tree.delete(key)
+        self.__append((record,))
+        return value
+
+    # get returns value of given key, or none if key does not exist
+    def get(self, key):
+        """
+            This method returns the value of a key, or None if the key DNE.
+        """
+        return self.tree.get(key)
+
+    # returns true if key is present
+    def contains_key(self, key) -> bool:
+        """
+            This method returns whether the key is in the tree.
+        """
+        return self.tree.contains_key(key)
+
+    # returns num of k / v pairs
+    def __len__(self) -> int:
+        """
+        returns number of key / value pairs
+        """
+        return len(self.tree)
+
+    # iterates over keys in order
+    def __iter__(self):
+        """
+            This method returns an iterator over the keys, in ascending order.
+        """
+        return iter(self.tree)
+
+    # yields every k / v pair in key order
+    def items(self):
+        """
+            This method lazily yields every key / value pair in ascending key order.
+        """
+        return self.tree.items()
+
+    # writes out every waiting record
+    def flush(self):
+        """
+            This method writes every waiting record to the journal, with an fsync
+            unless sync is "none". Once it returns, those writes survive a crash.
+            Raises the error of an earlier background flush that failed.
+        """
+        with self.__lock:
+            self.__write_buffer()
+        self.__raise_flush_error()
+        if self.__journal_bytes >= self.compact_bytes and not self.compacting:
+            self.compact()
+
+    # starts a compaction in the background
+    def compact(self, wait = False):
+        """
+            This method seals the current journal segment and starts a background
+            thread that merges the last snapshot and every sealed segment into a new
+            snapshot, then removes them. With wait set, it returns only once that is
+            done. A compaction that is still running is waited for first. Raises the
+            error of an earlier compaction that failed.
+        """
+        self.__join_compactor()
+        with self.__lock:
+            covered = self.__segment + 1 # the new snapshot covers every segment up to this one
+            self.__seal_segment()
+            self.__segment = covered
+            self.__open_segment()
+            self.__journal_bytes = 0
+        self.__compactor = threading.Thread(target=self.__compact, args=(self.__snapshot, covered),
+                                            name="journal compaction", daemon=True)
+        self.__compactor.start()
+        if wait:
+            self.__join_compactor()
+
+    # returns true while a compaction runs
+    @property
+    def compacting(self) -> bool:
+        """
+            Whether a background compaction is running.
+        """
+        return self.__compactor is not None and self.__compactor.is_alive()
+
+    # writes out everything and closes the journal
+    def close(self):
+        """
+            This method writes out every waiting record with an fsync (whatever the
+            sync policy), waits for any compaction, and closes the journal. The tree
+            stays readable, but can't be written through this class afterwards.
+        """
+        if self.__fd is None:
+            return
+        if self.__flusher is not None:
+            with self.__lock:
+                flusher = self.__flusher
+                self.__flusher = None
+                self.__waiting.notify()
+            flusher.join()
+        with self.__lock:
+            self.__seal_segment()
+        self.__join_compactor()
+        self.__raise_flush_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # builds the tree back from the newest snapshot and the journal after it. returns
+    # the tree, the snapshot number, the number of the next segment, the journal bytes
+    # since the snapshot, and the number of records replayed
+    def __recover(self) -> tuple:
+        names = os.listdir(self.directory)
+        snapshots = sorted(n for n in (_number(name, "snapshot-", ".rbt") for name in names) if n is not None)
+        segments = sorted(n for n in (_number(name, "journal-", ".log") for name in names) if n is not None)
+
+        snapshot = snapshots[-1] if snapshots else 0 # covers every segment below its number
+        changes = {}
+        records = 0
+        journal_bytes = 0
+        for number in segments:
+            if number >= snapshot:
+                path = self.__segment_path(number)
+                records += _replay_segment(path, changes, self.__order)
+                journal_bytes += os.path.getsize(path)
+        ordered = self.__sorted_changes(changes)
+        changes = None
+
+        if snapshot:
+            with MappedRedBlackTree(self.__snapshot_path(snapshot), self.__order) as base:
+                tree = RedBlackTree.from_sorted(_merged(base.items(), ordered, self.__order), **self.__options)
+        else:
+            tree = RedBlackTree.from_sorted(_merged((), ordered, self.__order), **self.__options)
+        self.__remove_covered(snapshot) # left over if a compaction stopped part way
+        for name in names:
+            if name.startswith("snapshot-") and name.endswith(".rbt.tmp"):
+                os.remove(os.path.join(self.directory, name))
+        segment = max([snapshot] + [number + 1 for number in segments])
+        return tree, snapshot, segment, journal_bytes, records
+
+    # merges a snapshot and the segments from it up to covered into a new snapshot,
+    # then removes what it replaces. runs on the compaction thread and only touches
+    # files the writer no longer does
+    def __compact(self, snapshot, covered):
+        try:
+            changes = {}
+            for number in range(snapshot, covered):
+                path = self.__segment_path(number)
+                if os.path.exists(path):
+                    _replay_segment(path, changes, self.__order)
+            ordered = self.__sorted_changes(changes)
+            changes = None
+
+            target = self.__snapshot_path(covered)
+            temporary = target + ".tmp"
+            if snapshot:
+                with MappedRedBlackTree(self.__snapshot_path(snapshot), self.__order) as base:
+                    write_snapshot(temporary, _merged(base.items(), ordered, self.__order))
+            else:
+                write_snapshot(temporary, _merged((), ordered, self.__order))
+            _fsync_path(temporary)
+            os.replace(temporary, target) # the new snapshot appears whole or not at all
+            self.__sync_directory()
+            self.__snapshot = covered
+            self.__remove_covered(covered)
+        except BaseException as error:
+            self.__compaction_error = error
+
+    # returns the last change of every key, sorted in the tree's order. with a key
+    # function, the changes are already kept under what it returns
+    def __sorted_changes(self, changes) -> list:
+        return sorted(changes.items(), key=itemgetter(0))
+
+    # waits for a running compaction, and raises its error if it failed
+    def __join_compactor(self):
+        if self.__compactor is not None:
+            self.__compactor.join()
+            self.__compactor = None
+        if self.__compaction_error is not None:
+            error = self.__compaction_error
+            self.__compaction_error = None
+            raise error
+
+    # removes every snapshot and segment older than the given snapshot
+    def __remove_covered(self, snapshot):
+        for name in os.listdir(self.directory):
+            number = _number(name, "snapshot-", ".rbt")
+            if number is None:
+                number = _number(name, "journal-", ".log")
+            if number is not None and number < snapshot:
+                os.remove(os.path.join(self.directory, name))
+
+    # queues records, writing the group out when it is due
+    def __append(self, records):
+        with self.__lock:
+            if not self.__buffer:
+                self.__buffered_at = time.monotonic()
+                self.__waiting.notify() # starts the flusher's group_delay clock
+            self.__buffer.extend(records)
+            due = (self.sync == "always" or len(self.__buffer) >= self.group_size
+                   or time.monotonic() - self.__buffered_at >= self.group_delay)
+        if due:
+            self.flush()
+        elif self.__journal_bytes >= self.compact_bytes and not self.compacting: # the flusher wrote it
+            self.compact()
+
+    # runs on the flusher thread until close, writing out every group once its oldest
+    # record has waited group_delay seconds
+    def __flush_when_due(self):
+        with self.__lock:
+            while self.__flusher is not None:
+                if not self.__buffer:
+                    self.__waiting.wait()
+                    continue
+                remaining = self.__buffered_at + self.group_delay - time.monotonic()
+                if remaining > 0:
+                    self.__waiting.wait(remaining)
+                    continue
+                try:
+                    self.__write_buffer()
+                except BaseException as error: # raised by the next flush or close
+                    self.__flush_error = error
+                    return
+
+    # raises the error of a background flush that failed
+    def __raise_flush_error(self):
+        if self.__flush_error is not None:
+            error = self.__flush_error
+            self.__flush_error = None
+            raise error
+
+    # creates the current segment and writes its header
+    def __open_segment(self):
+        path = self.__segment_path(self.__segment)
+        self.__fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o644)
+        self.__write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION))
+        if self.sync != "none":
+            os.fsync(self.__fd)
+            self.__sync_directory()
+
+    # writes the waiting records to the current segment as one frame
+    def __write_buffer(self):
+        if self.__buffer:
+            payload = b"".join(self.__buffer)
+            self.__buffer = []
+            frame = JOURNAL_FRAME.pack(zlib.crc32(payload), len(payload)) + payload
+            self.__write(frame)
+            if self.sync != "none":
+                os.fsync(self.__fd)
+            self.__journal_bytes += len(frame)
+
+    # writes out the current segment with an fsync and closes it
+    def __seal_segment(self):
+        self.__write_buffer()
+        os.fsync(self.__fd)
+        os.close(self.__fd)
+        self.__fd = None
+
+    # writes all of data to the current segment
+    def __write(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.__fd, view):]
+
+    # makes new and renamed files in the directory survive a crash
+    def __sync_directory(self):
+        if os.name == "posix":
+            _fsync_path(self.directory)
+
+    def __segment_path(self, number) -> str:
+        return os.path.join(self.directory, f"journal-{number:08d}.log")
+
+    def __snapshot_path(self, number) -> str:
+        return os.path.join(self.directory, f"snapshot-{number:08d}.rbt")
@@ -0,0 +1,341 @@
+import mmap
+import pickle
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from redblacktree import SNAPSHOT_LENGTH, SNAPSHOT_OFFSET, read_snapshot_header
+
+
+class MappedRedBlackTree:
+
+    """
+        This class answers read only queries straight from a snapshot written by
+        RedBlackTree.dump, through a memory map. No Node objects are built: the
+        pairs are stored in key order in blocks, with a table of where each block
+        starts, so a rank is a table lookup and a key is a binary search over the
+        first keys of the blocks, then within one block. Only the blocks that a
+        query touches are unpickled, the last one read is kept, and the operating
+        system pages the file in as needed, so opening even a huge snapshot is
+        instant. The blocks are unpickled, and unpickling a crafted file can run
+        any code, so only open snapshots you wrote yourself.
+    """
+
+    __author__ = "Silver Lippert"
+    __version__ = "23.11.5"
+
+    def __init__(self, path, key = None):
+        """
+            Opens the snapshot at path. Raises ValueError if it is not a snapshot.
+            A snapshot of a tree built with a key function is in that function's
+            order, so pass the same one as key to search it.
+        """
+        self.__key = key
+        self.__file = open(path, "rb")
+        self.__map = None
+        try:
+            self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__count, table, self.__block_size = read_snapshot_header(self.__map)
+        except Exception:
+            if self.__map is not None:
+                self.__map.close()
+            self.__file.close()
+            raise
+        self.__blocks = -(-self.__count // self.__block_size)
+        self.__cached = (-1, None, None) # the last block read: its number, keys, and values or none
+        end = table + self.__blocks * SNAPSHOT_OFFSET.size
+        if sys.byteorder == "little": # the table can be read in place
+            self.__offsets = memoryview(self.__map)[table:end].cast("Q")
+        else:
+            self.__offsets = array("Q", self.__map[table:end])
+            self.__offsets.byteswap()
+
+    # releases the memory map and the file
+    def close(self):
+        """
+            This method closes the snapshot. The tree can't be used afterwards.
+        """
+        if isinstance(self.__offsets, memoryview):
+            self.__offsets.release() # the map can't close while a view of it is alive
+        self.__map.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # returns num of k / v pairs
+    def __len__(self) -> int:
+        """
+        returns number of key / value pairs
+        """
+        return self.__count
+
+    # returns true if tree is empty
+    def is_empty(self) -> bool:
+        """
+            This method returns a boolean indicating whether the snapshot has
+            any pairs in it.
+        """
+        return self.__count == 0
+
+    # get returns value of given key, or none if key does not exist
+    def get(self, key):
+        """
+            This method takes a key and searches the snapshot for it. It will return
+            the value associated with the key, or none if the key is not there.
+        """
+        rank = self.find_rank(key)
+        if rank < 0:
+            return None
+        return self.__pair_at(rank)[1]
+
+    # returns true if key is present
+    def contains_key(self, key) -> bool:
+        """
+            This method takes a key as input, and returns a boolean
+            indicating whether the key is in the snapshot.
+        """
+        return self.find_rank(key) >= 0
+
+    # returns rank of key, or -1 if key DNE
+    def find_rank(self, key) -> int:
+        """
+            This method takes a key as input, and returns the rank
+            that it is in the snapshot. It will return -1 if the key DNE.
+        """
+        rank = self.__count_below(key)
+        if rank < self.__count and self.__same(self.__key_at(rank), key):
+            return rank
+        return -1
+
+    # returns key of the given rank, or none if rank is invalid, 0 index
+    def select(self, rank: int):
+        """
+            This method takes a rank as input, and returns the key it is
+            associated with. It will return None if the rank is invalid.
+            The ranks are 0 indexed.
+        """
+        if 0 <= rank < self.__count:
+            return self.__key_at(rank)
+        return None
+
+    # returns smallest key, or none if there is none
+    def find_first_key(self):
+        """
+            This method finds and returns the smallest key in order.
+        """
+        return self.select(0)
+
+    # returns largest key or none if there is none
+    def find_last_key(self):
+        """
+            This method finds and returns the largest key in order.
+        """
+        return self.select(self.__count - 1)
+
+    # returns predecessor of given key or none if key DNE or has no pred.
+    def find_predecessor(self, key):
+        """
+            This method takes a key as input, and then finds and returns its predecessor.
+            Returns None if the key DNE, or if it has no predecessor.
+        """
+        rank = self.find_rank(key)
+        if rank > 0:
+            return self.__key_at(rank - 1)
+        return None
+
+    # returns successor of key, or none if key DNE or has no succ.
+    def find_successor(self, key):
+        """
+            This method takes a key as input, and searches for and returns its
+            successor. It may return None if the key DNE, or has no successor.
+        """
+        rank = self.find_rank(key)
+        if 0 <= rank < self.__count - 1:
+            return self.__key_at(rank + 1)
+        return None
+
+    # returns largest key <= key, or none if there is none
+    def floor(self, key):
+        """
+            This method returns the largest key at or below the given one, which
+            need not be in the file, or None if every key is above it.
+        """
+        rank = self.__count_below(key, True)
+        return self.__key_at(rank - 1) if rank > 0 else None
+
+    # returns smallest key >= key, or none if there is none
+    def ceiling(self, key):
+        """
+            This method returns the smallest key at or above the given one, which
+            need not be in the file, or None if every key is below it.
+        """
+        rank = self.__count_below(key)
+        return self.__key_at(rank) if rank < self.__count else None
+
+    # returns largest key < key, or none if there is none
+    def lower(self, key):
+        """
+            This method returns the largest key strictly below the given one,
+            or None if there is none.
+        """
+        rank = self.__count_below(key)
+        return self.__key_at(rank - 1) if rank > 0 else None
+
+    # returns smallest key > key, or none if there is none
+    def higher(self, key):
+        """
+            This method returns the smallest key strictly above the given one,
+            or None if there is none.
+        """
+        rank = self.__count_below(key, True)
+        return self.__key_at(rank) if rank < self.__count else None
+
+    # returns the key closest to key, or none if tree is empty
+    def nearest(self, key):
+        """
+            This method returns the key closest to the given one, the same way
+            RedBlackTree.nearest does, from a single binary search.
+        """
+        rank = self.__count_below(key)
+        above = self.__key_at(rank) if rank < self.__count else None
+        if rank == 0 or (above is not None and self.__same(above, key)):
+            return above
+        below = self.__key_at(rank - 1)
+        if above is None or abs(key - below) <= abs(above - key):
+            return below
+        return above
+
+    # yields k / v pairs with lo <= key <= hi in order, none means unbounded
+    def range(self, lo = None, hi = None, inclusive = (True, True)):
+        """
+            This method lazily yields the key / value pairs whose keys fall between
+            lo and hi, in ascending order, the same way RedBlackTree.range does.
+        """
+        lo_inclusive, hi_inclusive = inclusive
+        start = 0 if lo is None else self.__count_below(lo, not lo_inclusive)
+        stop = self.__count if hi is None else self.__count_below(hi, hi_inclusive)
+        yield from self.__pairs(start, stop)
+
+    # returns num of keys with lo <= key <= hi, none means unbounded
+    def count_range(self, lo = None, hi = None, inclusive = (True, True)) -> int:
+        """
+            This method counts the keys that fall between lo and hi with two
+            binary searches. Bounds and inclusive work the same as in range.
+        """
+        lo_inclusive, hi_inclusive = inclusive
+        start = 0 if lo is None else self.__count_below(lo, not lo_inclusive)
+        stop = self.__count if hi is None else self.__count_below(hi, hi_inclusive)
+        return max(stop - start, 0)
+
+    # iterates over keys in order
+    def __iter__(self):
+        """
+            This method returns an iterator over the keys, in ascending order.
+        """
+        return self.keys()
+
+    # yields every key in order
+    def keys(self):
+        """
+            This method lazily yields every key in ascending order.
+        """
+        for block in range(self.__blocks):
+            yield from self.__block(block)[0]
+
+    # yields every value in key order
+    def values(self):
+        """
+            This method lazily yields every value, ordered by their keys.
+        """
+        for _, value in self.__pairs(0, self.__count):
+            yield value
+
+    # yields every k / v pair in key order
+    def items(self):
+        """
+            This method lazily yields every key / value pair in ascending key order.
+        """
+        yield from self.__pairs(0, self.__count)
+
+    # returns the keys of a block, and its values if with_values, unpickling only
+    # what the last block read did not already hold
+    def __block(self, block, with_values = False) -> tuple:
+        number, keys, values = self.__cached
+        if number != block:
+            keys = values = None
+        if keys is None or (with_values and values is None):
+            position = self.__offsets[block]
+            length = SNAPSHOT_LENGTH.unpack_from(self.__map, position)[0]
+            position -= -(SNAPSHOT_LENGTH.size + length) # past the first key
+            length = SNAPSHOT_LENGTH.unpack_from(self.__map, position)[0]
+            position -= -SNAPSHOT_LENGTH.size
+            if keys is None:
+                keys = pickle.loads(self.__map[position:position + length])
+            if with_values:
+                position -= -length
+                length = SNAPSHOT_LENGTH.unpack_from(self.__map, position)[0]
+                position -= -SNAPSHOT_LENGTH.size
+                values = pickle.loads(self.__map[position:position + length])
+            self.__cached = (block, keys, values)
+        return keys, values
+
+    # unpickles the first key of a block, without the rest of it
+    def __first_key(self, block):
+        position = self.__offsets[block]
+        length = SNAPSHOT_LENGTH.unpack_from(self.__map, position)[0]
+        position -= -SNAPSHOT_LENGTH.size
+        return pickle.loads(self.__map[position:position + length])
+
+    # returns the key stored at a rank
+    def __key_at(self, rank):
+        return self.__block(rank // self.__block_size)[0][rank % self.__block_size]
+
+    # returns the k / v pair stored at a rank
+    def __pair_at(self, rank) -> tuple:
+        keys, values = self.__block(rank // self.__block_size, True)
+        rank %= self.__block_size
+        return (keys[rank], values[rank])
+
+    # yields the k / v pairs from rank start up to stop, a block at a time
+    def __pairs(self, start, stop):
+        size = self.__block_size
+        while start < stop:
+            block, first = divmod(start, size)
+            keys, values = self.__block(block, True)
+            last = min(size, first + stop - start)
+            yield from zip(keys[first:last], values[first:last])
+            start += last - first
+
+    # returns true if two keys are the same key, under the key function if any
+    def __same(self, a, b) -> bool:
+        if self.__key is None:
+            return a == b
+        return self.__key(a) == self.__key(b)
+
+    # returns num of keys below the given key, counting the key itself if inclusive
+    def __count_below(self, key, inclusive = False) -> int:
+        derive = self.__key
+        if derive is not None:
+            key = derive(key)
+        lo = 0
+        hi = self.__blocks
+        while lo < hi: # binary search for the first block that starts past the key
+            mid = (lo + hi) // 2
+            probe = self.__first_key(mid)
+            if derive is not None:
+                probe = derive(probe)
+            if probe < key or (inclusive and probe == key):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0: # every key is past it
+            return 0
+        keys = self.__block(lo - 1)[0]
+        if derive is not None:
+            keys = [derive(probe) for probe in keys]
+        split = bisect_right if inclusive else bisect_left
+        return (lo - 1) * self.__block_size + split(keys, key)
@@ -0,0 +1,485 @@
+from itertools import islice
+
+from redblacktree import RedBlackTree
+
+try: # optional, built with: python setup.py build_ext --inplace
+    import _rbtnative
+except ImportError:
+    _rbtnative = None
+
+# true when the compiled backend is there
+NATIVE = _rbtnative is not None
+
+# the range of keys the compiled backend can hold in an int tree
+INT_MIN = -2 ** 63
+INT_MAX = 2 ** 63 - 1
+
+
+# returns int or float if every key is a number the compiled backend can hold, else none
+def numeric_key_type(keys):
+    key_type = int
+    for key in keys:
+        if type(key) is float:
+            if key != key: # nan has no place in the order
+                return None
+            key_type = float
+        elif not isinstance(key, int) or not INT_MIN <= key <= INT_MAX:
+            return None
+    return key_type
+
+
+# builds the fastest tree that can hold the given pairs
+def tree_for(items = (), **options):
+    """
+        This function takes a mapping or an iterable of key / value pairs in any
+        order and returns a tree holding them. When every key is an int or a float
+        and the compiled backend is built, that is a NumericRedBlackTree. Otherwise,
+        or when there are no keys to go by, or when any RedBlackTree options are
+        given (those only exist on the plain tree), it is a RedBlackTree.
+    """
+    if hasattr(items, "items"):
+        items = items.items()
+    items = list(items)
+    key_type = numeric_key_type(key for key, _ in items)
+    if NATIVE and items and key_type is not None and not options:
+        return NumericRedBlackTree.from_items(items, key_type)
+    return RedBlackTree.from_items(items, **options)
+
+
+class _PythonTree:
+
+    """
+        The same methods as _rbtnative.Tree, on top of a RedBlackTree, for when
+        the compiled backend is not built. Keys are checked and converted the same
+        way, so both backends hand back the same answers.
+    """
+
+    __author__ = "Silver Lippert"
+    __version__ = "23.11.5"
+
+    def __init__(self, is_float = False):
+        self.__tree = RedBlackTree()
+        self.__is_float = is_float
+
+    # checks a key and turns it into the type the tree holds
+    def __key(self, key):
+        if self.__is_float:
+            if not isinstance(key, (int, float)):
+                raise TypeError(f"keys must be int or float, not {type(key).__name__}")
+            key = float(key)
+            if key != key:
+                raise ValueError("nan can't be used as a key")
+            return key
+        if not isinstance(key, int):
+            raise TypeError(f"keys must be int, not {type(key).__name__}")
+        if not INT_MIN <= key <= INT_MAX:
+            raise OverflowError("int too big to be a key")
+        return key
+
+    def __len__(self) -> int:
+        return len(self.__tree)
+
+    def put(self, key, value):
+        self.__tree.put(self.__key(key), value)
+
+    def get(self, key):
+        return self.__tree.get(self.__key(key))
+
+    def contains(self, key) -> bool:
+        return self.__tree.contains_key(self.__key(key))
+
+    def delete(self, key):
+        return self.__tree.delete(self.__key(key))
+
+    def select(self, rank):
+        return self.__tree.select(rank)
+
+    def rank(self, key) -> int:
+        return self.__tree.find_rank(self.__key(key))
+
+    def count_below(self, key, inclusive) -> int:
+        return self.__tree.count_range(None, self.__key(key), (True, inclusive))
+
+    def bound(self, key, below, inclusive):
+        key = self.__key(key)
+        if below:
+            return self.__tree.floor(key) if inclusive else self.__tree.lower(key)
+        return self.__tree.ceiling(key) if inclusive else self.__tree.higher(key)
+
+    def neighbour(self, key, below):
+        key = self.__key(key)
+        return self.__tree.find_predecessor(key) if below else self.__tree.find_successor(key)
+
+    def slice(self, start, stop, what) -> list:
+        start = max(start, 0)
+        first = self.__tree.select(start)
+        if first is None or stop <= start:
+            return []
+        pairs = islice(self.__tree.range(first), stop - start)
+        if what == 1:
+            return [key for key, _ in pairs]
+        if what == 2:
+            return [value for _, value in pairs]
+        return list(pairs)
+
+    def height(self) -> int:
+        return self.__tree.calc_height()
+
+    def is_valid(self) -> bool:
+        return self.__tree.is_valid()
+
+    def clear(self):
+        self.__tree = RedBlackTree()
+
+
+class NumericRedBlackTree:
+
+    """
+        This class is a red-black tree for keys that are all ints, or all floats,
+        with the ordered map methods of RedBlackTree: put, get, delete and their
+        _many forms, lookups by key and by rank, range and count_range, iteration,
+        calc_height and is_valid. When the _rbtnative extension is built
+        (python setup.py build_ext --inplace) the tree lives in typed C arrays:
+        comparisons are machine comparisons and a node takes 29 bytes instead of a
+        Python object. Without it the same methods run on a plain RedBlackTree.
+        native tells which backend a tree got.
+
+        An int tree holds ints from -2^63 to 2^63 - 1 and only takes int queries.
+        A float tree takes ints and floats, stores them as floats, and hands them
+        back as floats. Other keys raise TypeError, nan raises ValueError. The
+        value index, caches, metrics and aggregates of RedBlackTree are not offered,
+        and neither are the methods built on them or on walking the nodes
+        (contains_value, reverse_lookup, get_root_key, count_red_nodes,
+        calc_black_height, calc_average_depth, stats) or the set operations.
+    """
+
+    __author__ = "Silver Lippert"
+    __version__ = "23.11.5"
+
+    # pairs fetched from the backend at a time while iterating
+    CHUNK = 512
+
+    def __init__(self, key_type = int, native = None):
+        """
+            Creates an empty tree for int keys, or float keys if key_type is float.
+            native picks the backend: True demands the compiled one, False forces
+            the pure Python one, and None (the default) uses the compiled one when
+            it is built.
+        """
+        if key_type is not int and key_type is not float:
+            raise ValueError("key_type must be int or float")
+        if native is None:
+            native = NATIVE
+        if native and not NATIVE:
+            raise ImportError("the _rbtnative extension is not built, see setup.py")
+        self.key_type = key_type
+        self.native = native
+        self.__tree = (_rbtnative.Tree if native else _PythonTree)(key_type is float)
+
+        # the busiest methods answer straight from the backend, with no Python
+        # call in between, so they are bound here instead of defined on the class.
+        # they work as in RedBlackTree: put(key, value), get(key) and delete(key)
+        # (None if the key DNE), contains_key(key), find_rank(key) (-1 if the key
+        # DNE) and select(rank) (None if the rank is invalid, 0 indexed)
+        self.get = self.__tree.get
+        self.put = self.__tree.put
+        self.delete = self.__tree.delete
+        self.contains_key = self.__tree.contains
+        self.select = self.__tree.select
+        self.find_rank = self.__tree.rank
+
+    # builds a new tree from k / v pairs that are already in ascending key order
+    @classmethod
+    def from_sorted(cls, items, key_type = None, **options):
+        """
+            This method takes key / value pairs in ascending key order and builds a
+            tree out of them. Raises ValueError if the keys are out of order. Without
+            a key_type, float is picked if any key is a float, else int.
+        """
+        items = list(items)
+        for i in range(1, len(items)):
+            if items[i][0] < items[i - 1][0]:
+                raise ValueError(f"keys are not in ascending order at {items[i][0]!r}")
+        return cls.from_items(items, key_type, **options)
+
+    # builds a new tree from k / v pairs in any order
+    @classmethod
+    def from_items(cls, items, key_type = None, **options):
+        """
+            This method takes a mapping or an iterable of key / value pairs in any
+            order and builds a tree out of them. If a key repeats, the last pair wins.
+            Without a key_type, float is picked if any key is a float, else int.
+        """
+        if hasattr(items, "items"):
+            items = items.items()
+        items = list(items)
+        if key_type is None:
+            key_type = float if any(type(key) is float for key, _ in items) else int
+        tree = cls(key_type, **options)
+        tree.put_many(items)
+        return tree
+
+    # inserts many k / v pairs, later pairs win on repeated keys
+    def put_many(self, items, deletes = ()):
+        """
+            This method takes an iterable of key / value pairs (or a mapping) and
+            inserts all of them, one put per pair. The keys in deletes, if any, are
+            removed first, as in RedBlackTree.put_many.
+        """
+        if hasattr(items, "items"):
+            items = items.items()
+        delete = self.__tree.delete
+        for key in deletes:
+            delete(key)
+        put = self.__tree.put
+        for key, value in items:
+            put(key, value)
+
+    # removes every key in keys that is in the tree, returns how many went
+    def delete_many(self, keys) -> int:
+        """
+            This method removes every key of an iterable that is in the tree, one
+            delete per key, and returns how many it removed.
+        """
+        before = len(self.__tree)
+        delete = self.__tree.delete
+        for key in keys:
+            delete(key)
+        return before - len(self.__tree)
+
+    # returns num of k / v pairs
+    def __len__(self) -> int:
+        """
+        returns number of key / value pairs
+        """
+        return len(self.__tree)
+
+    # returns true if tree is empty
+    def is_empty(self) -> bool:
+        """
+            This method returns whether the tree has any pairs in it.
+        """
+        return len(self.__tree) == 0
+
+    # iterates over keys in order
+    def __iter__(self):
+        """
+            This method returns an iterator over the keys, in ascending order.
+        """
+        return self.keys()
+
+    # iterates over keys in reverse order
+    def __reversed__(self):
+        """
+            This method returns an iterator over the keys, in descending order.
+        """
+        stop = len(self.__tree)
+        while stop > 0:
+            start = max(stop - self.CHUNK, 0)
+            yield from reversed(self.__tree.slice(start, stop, 1))
+            stop = start
+
+    # yields every key in order
+    def keys(self):
+        """
+            This method lazily yields every key in ascending order.
+        """
+        return self.__ranks(0, len(self.__tree), 1)
+
+    # yields every value in key order
+    def values(self):
+        """
+            This method lazily yields every value, ordered by their keys.
+        """
+        return self.__ranks(0, len(self.__tree), 2)
+
+    # yields every k / v pair in key order
+    def items(self):
+        """
+            This method lazily yields every key / value pair in ascending key order.
+        """
+        return self.__ranks(0, len(self.__tree), 0)
+
+    # yields k / v pairs with lo <= key <= hi in order, none means unbounded
+    def range(self, lo = None, hi = None, inclusive = (True, True)):
+        """
+            This method lazily yields the key / value pairs between lo and hi, the
+            same way RedBlackTree.range does.
+        """
+        start, stop = self.__rank_bounds(lo, hi, inclusive)
+        return self.__ranks(start, stop, 0)
+
+    # returns num of keys with lo <= key <= hi, none means unbounded
+    def count_range(self, lo = None, hi = None, inclusive = (True, True)) -> int:
+        """
+            This method counts the keys between lo and hi in O(log n).
+        """
+        start, stop = self.__rank_bounds(lo, hi, inclusive)
+        return max(stop - start, 0)
+
+    # returns smallest key, or none if there is none
+    def find_first_key(self):
+        """
+            This method finds and returns the smallest key in order.
+        """
+        return self.__tree.select(0)
+
+    # returns largest key or none if there is none
+    def find_last_key(self):
+        """
+            This method finds and returns the largest key in order.
+        """
+        return self.__tree.select(len(self.__tree) - 1)
+
+    # returns predecessor of given key or none if key DNE or has no pred.
+    def find_predecessor(self, key):
+        """
+            This method returns the key just before the given one, or None if the
+            key DNE or has no predecessor.
+        """
+        return self.__tree.neighbour(key, True)
+
+    # returns successor of key, or none if key DNE or has no succ.
+    def find_successor(self, key):
+        """
+            This method returns the key just after the given one, or None if the
+            key DNE or has no successor.
+        """
+        return self.__tree.neighbour(key, False)
+
+    # returns largest key <= key, or none if there is none
+    def floor(self, key):
+        """
+            This method returns the largest key at or below the given one, see
+            RedBlackTree.floor.
+        """
+        return self.__tree.bound(key, True, True)
+
+    # returns smallest key >= key, or none if there is none
+    def ceiling(self, key):
+        """
+            This method returns the smallest key at or above the given one, see
+            RedBlackTree.ceiling.
+        """
+        return self.__tree.bound(key, False, True)
+
+    # returns largest key < key, or none if there is none
+    def lower(self, key):
+        """
+            This method returns the largest key strictly below the given one, see
+            RedBlackTree.lower.
+        """
+        return self.__tree.bound(key, True, False)
+
+    # returns smallest key > key, or none if there is none
+    def higher(self, key):
+        """
+            This method returns the smallest key strictly above the given one, see
+            RedBlackTree.higher.
+        """
+        return self.__tree.bound(key, False, False)
+
+    # returns the key closest to key, or none if tree is empty
+    def nearest(self, key):
+        """
+            This method returns the key closest to the given one, the lower one on
+            a tie, see RedBlackTree.nearest.
+        """
+        below = self.__tree.bound(key, True, True)
+        if below == key:
+            return below
+        above = self.__tree.bound(key, False, True)
+        if below is None:
+            return above
+        if above is None or key - below <= above - key:
+            return below
+        return above
+
+    # returns the floor of every key in keys, or none where there is none
+    def floor_many(self, keys) -> list:
+        """
+            This method returns the floor of many keys, in the same order, with None
+            where every key of the tree is above.
+        """
+        bound = self.__tree.bound
+        return [bound(key, True, True) for key in keys]
+
+    # returns the ceiling of every key in keys, or none where there is none
+    def ceiling_many(self, keys) -> list:
+        """
+            This method returns the ceiling of many keys, in the same order.
+        """
+        bound = self.__tree.bound
+        return [bound(key, False, True) for key in keys]
+
+    # returns the lower of every key in keys, or none where there is none
+    def lower_many(self, keys) -> list:
+        """
+            This method returns the lower key of many keys, in the same order.
+        """
+        bound = self.__tree.bound
+        return [bound(key, True, False) for key in keys]
+
+    # returns the higher of every key in keys, or none where there is none
+    def higher_many(self, keys) -> list:
+        """
+            This method returns the higher key of many keys, in the same order.
+        """
+        bound = self.__tree.bound
+        return [bound(key, False, False) for key in keys]
+
+    # returns the nearest key to every key in keys, or none if tree is empty
+    def nearest_many(self, keys) -> list:
+        """
+            This method returns the nearest key to many keys, in the same order.
+        """
+        return [self.nearest(key) for key in keys]
+
+    # returns the rank of every key in keys, or -1 for keys that DNE
+    def rank_many(self, keys) -> list:
+        """
+            This method returns the ranks of many keys, in the same order, with -1
+            for keys that DNE.
+        """
+        rank = self.__tree.rank
+        return [rank(key) for key in keys]
+
+    # returns the key at every rank in ranks, or none for invalid ranks
+    def select_many(self, ranks) -> list:
+        """
+            This method returns the keys at many 0 indexed ranks, in the same order,
+            with None for invalid ranks.
+        """
+        select = self.__tree.select
+        return [select(rank) for rank in ranks]
+
+    # returns height of tree, where an empty tree has height of 0
+    def calc_height(self) -> int:
+        """
+            This method returns the height of the tree, 0 when empty.
+        """
+        return self.__tree.height()
+
+    # returns true if the tree follows every left leaning red-black rule
+    def is_valid(self) -> bool:
+        """
+            This method checks every tree invariant: key order, subtree sizes, no
+            right leaning or double red links, and equal black heights.
+        """
+        return self.__tree.is_valid()
+
+    # returns the ranks that lo and hi bound, as a start and a stop
+    def __rank_bounds(self, lo, hi, inclusive) -> tuple:
+        lo_inclusive, hi_inclusive = inclusive
+        start = 0 if lo is None else self.__tree.count_below(lo, not lo_inclusive)
+        stop = len(self.__tree) if hi is None else self.__tree.count_below(hi, hi_inclusive)
+        return start, stop
+
+    # yields pairs (0), keys (1) or values (2) of ranks start to stop, a chunk at a time
+    def __ranks(self, start, stop, what):
+        while start < stop:
+            chunk = self.__tree.slice(start, min(start + self.CHUNK, stop), what)
+            if not chunk: # the tree shrank underneath
+                return
+            yield from chunk
+            start += len(chunk)
@@ -0,0 +1,355 @@
+import random
+import weakref
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+
+from redblacktree import RedBlackTree
+
+
+# RedBlackTree options a partition can't honour. the boundaries are raw keys, so a key
+# function would file keys under the wrong partition, and metrics would be counted in
+# the worker processes where nobody can read them
+_UNSUPPORTED = ("key", "metrics")
+
+
+# the partition held by this worker process. each partition has a process of its
+# own, so the tree stays in that process between calls and only the arguments and
+# answers cross over
+_partition = None
+
+
+# starts a worker off with an empty partition
+def _start_worker(options):
+    global _partition
+    _partition = RedBlackTree(**options)
+
+
+# replaces the worker's partition with one built from unsorted pairs
+def _build(pairs, options) -> int:
+    global _partition
+    _partition = RedBlackTree.from_items(pairs, **options)
+    return len(_partition)
+
+
+# stops worker processes. it is a function of its own so that a tree's finalizer
+# does not keep the tree alive
+def _shut_down(workers):
+    for worker in workers:
+        worker.shutdown()
+
+
+# runs a method on the worker's partition, returns its answer and the new size
+def _call(method, args) -> tuple:
+    answer = getattr(_partition, method)(*args)
+    return (answer, len(_partition))
+
+
+# returns the pairs of the worker's partition between lo and hi
+def _range(lo, hi, inclusive) -> list:
+    return list(_partition.range(lo, hi, inclusive))
+
+
+class PartitionedRedBlackTree:
+
+    """
+        This class spreads one sorted map over several RedBlackTrees, each holding
+        a range of the keys and living in a worker process of its own, so bulk work
+        runs on as many cores as there are partitions. Bulk builds, put_many,
+        rank_many, select_many and range scans send each partition its share at
+        once and wait for all of them together. The facade keeps the size of every
+        partition, so select and find_rank turn global ranks into local ones without
+        asking every worker. Single key operations work too, but each one is a round
+        trip to a worker process and is much slower than on a plain RedBlackTree.
+        Keys and values must be picklable. Call close (or use a with block) to stop
+        the workers; they are also stopped once the tree is garbage collected.
+    """
+
+    __author__ = "Silver Lippert"
+    __version__ = "23.11.5"
+
+    # pairs sampled per partition when from_items picks the boundaries
+    SAMPLES_PER_PARTITION = 256
+
+    def __init__(self, boundaries, **options):
+        """
+            Creates an empty tree split at the given boundaries, in ascending order.
+            Partition i holds the keys from boundaries[i - 1] up to (not including)
+            boundaries[i], so there is one more partition than boundaries. Any keyword
+            options are passed on to the RedBlackTree of every partition, except key
+            and metrics, which raise ValueError.
+        """
+        unsupported = [name for name in _UNSUPPORTED if name in options]
+        if unsupported:
+            raise ValueError(f"PartitionedRedBlackTree does not support the {' and '.join(unsupported)} option"
+                             + ("s" if len(unsupported) > 1 else ""))
+        self.boundaries = list(boundaries)
+        for i in range(1, len(self.boundaries)):
+            if not self.boundaries[i - 1] < self.boundaries[i]:
+                raise ValueError("boundaries must be in ascending order with no repeats")
+        self.__options = options
+        self.__sizes = [0] * (len(self.boundaries) + 1)
+        self.__workers = [ProcessPoolExecutor(1, initializer=_start_worker, initargs=(options,))
+                          for _ in self.__sizes]
+        self.__finalizer = weakref.finalize(self, _shut_down, self.__workers)
+
+    # builds a tree from k / v pairs in any order, over the given number of partitions
+    @classmethod
+    def from_items(cls, items, partitions = 4, **options):
+        """
+            This method takes a mapping or an iterable of key / value pairs in any
+            order and builds a tree of the given number of partitions. Boundaries are
+            picked from a sample of the keys so the partitions come out about the same
+            size, then every partition sorts and builds its share in parallel.
+            If a key repeats, the last pair wins.
+        """
+        if hasattr(items, "items"):
+            items = items.items()
+        items = list(items)
+        sample = random.Random(0).sample(items, min(len(items), partitions * cls.SAMPLES_PER_PARTITION))
+        keys = sorted({key for key, _ in sample})
+        boundaries = []
+        for i in range(1, partitions): # keys at even steps through the sample
+            boundary = keys[i * len(keys) // partitions] if keys else None
+            if boundary is not None and (not boundaries or boundaries[-1] < boundary):
+                boundaries.append(boundary)
+        tree = cls(boundaries, **options)
+        shares = tree.__share_out(items, key_of=lambda pair: pair[0])
+        futures = [worker.submit(_build, share, options) for worker, share in zip(tree.__workers, shares)]
+        tree.__sizes = [future.result() for future in futures]
+        return tree
+
+    # stops every worker process
+    def close(self):
+        """
+            This method shuts the worker processes down. The tree can't be used afterwards.
+        """
+        self.__finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # returns the number of partitions
+    @property
+    def partitions(self) -> int:
+        """
+            The number of partitions, and of worker processes.
+        """
+        return len(self.__workers)
+
+    # returns the size of every partition
+    def partition_sizes(self) -> list:
+        """
+            This method returns the number of pairs in each partition, in key order.
+        """
+        return list(self.__sizes)
+
+    # inserts a new k / v pair
+    def put(self, key, value):
+        """
+            This method inserts a key / value pair into its partition, or replaces the
+            value if the key already exists.
+        """
+        self.__call_one(self.__partition_of(key), "put", key, value)
+
+    # inserts many k / v pairs at once, later pairs win on repeated keys
+    def put_many(self, items):
+        """
+            This method takes an iterable of key / value pairs (or a mapping) and
+            inserts them, with every partition handling its share in parallel.
+        """
+        if hasattr(items, "items"):
+            items = items.items()
+        shares = self.__share_out(list(items), key_of=lambda pair: pair[0])
+        self.__call_all("put_many", [(share,) if share else None for share in shares])
+
+    # removes a k / v pair, returns deleted val, or none if key DNE
+    def delete(self, key):
+        """
+            This method removes a key and returns its value, or None if the key DNE.
+        """
+        return self.__call_one(self.__partition_of(key), "delete", key)
+
+    # get returns value of given key, or none if key does not exist
+    def get(self, key):
+        """
+            This method returns the value of a key, or None if the key DNE.
+        """
+        return self.__call_one(self.__partition_of(key), "get", key)
+
+    # returns true if key is present
+    def contains_key(self, key) -> bool:
+        """
+            This method returns whether the key is in the tree.
+        """
+        return self.__call_one(self.__partition_of(key), "contains_key", key)
+
+    # returns num of k / v pairs
+    def __len__(self) -> int:
+        """
+        returns number of key / value pairs
+        """
+        return sum(self.__sizes)
+
+    # returns true if tree is empty
+    def is_empty(self) -> bool:
+        """
+            This method returns whether the tree has any pairs in it.
+        """
+        return len(self) == 0
+
+    # returns rank of key, or -1 if key DNE
+    def find_rank(self, key) -> int:
+        """
+            This method returns the 0 indexed rank of a key over every partition,
+            or -1 if it DNE.
+        """
+        index = self.__partition_of(key)
+        rank = self.__call_one(index, "find_rank", key)
+        if rank < 0:
+            return -1
+        return sum(self.__sizes[:index]) + rank
+
+    # returns key of the given rank, or none if rank is invalid, 0 index
+    def select(self, rank: int):
+        """
+            This method returns the key at a 0 indexed rank over every partition,
+            or None if the rank is invalid. Only the partition holding it is asked.
+        """
+        if not 0 <= rank < len(self):
+            return None
+        starts = self.__starts()
+        index = bisect_right(starts, rank) - 1
+        return self.__call_one(index, "select", rank - starts[index])
+
+    # returns the rank of every key in keys, or -1 for keys that DNE
+    def rank_many(self, keys) -> list:
+        """
+            This method returns the ranks of many keys, in the same order, with -1
+            for keys that DNE. Each partition ranks its share of the keys in parallel.
+        """
+        keys = list(keys)
+        places = self.__share_out(range(len(keys)), key_of=keys.__getitem__)
+        answers = self.__call_all("rank_many", [([keys[i] for i in place],) if place else None
+                                               for place in places])
+        starts = self.__starts()
+        ranks = [-1] * len(keys)
+        for index, (place, local) in enumerate(zip(places, answers)):
+            offset = starts[index]
+            for i, rank in zip(place, local or ()):
+                if rank >= 0:
+                    ranks[i] = offset + rank
+        return ranks
+
+    # returns the key at every rank in ranks, or none for invalid ranks
+    def select_many(self, ranks) -> list:
+        """
+            This method returns the keys at many 0 indexed ranks, in the same order,
+            with None for invalid ranks. Each partition answers its share in parallel.
+        """
+        ranks = list(ranks)
+        starts = self.__starts()
+        size = len(self)
+        places = [[] for _ in self.__workers]
+        for i, rank in enumerate(ranks):
+            if 0 <= rank < size:
+                places[bisect_right(starts, rank) - 1].append(i)
+        answers = self.__call_all("select_many", [([ranks[i] - starts[index] for i in place],) if place else None
+                                                 for index, place in enumerate(places)])
+        found = [None] * len(ranks)
+        for place, local in zip(places, answers):
+            for i, key in zip(place, local or ()):
+                found[i] = key
+        return found
+
+    # yields k / v pairs with lo <= key <= hi in order, none means unbounded
+    def range(self, lo = None, hi = None, inclusive = (True, True)):
+        """
+            This method yields the key / value pairs between lo and hi in ascending
+            order, the same way RedBlackTree.range does. Every partition that overlaps
+            the range scans its part in parallel, and the parts are yielded in order.
+        """
+        first = 0 if lo is None else self.__partition_of(lo)
+        last = len(self.__workers) - 1 if hi is None else self.__partition_of(hi)
+        futures = [self.__workers[i].submit(_range, lo, hi, inclusive) for i in range(first, last + 1)]
+        for future in futures:
+            yield from future.result()
+
+    # returns num of keys with lo <= key <= hi, none means unbounded
+    def count_range(self, lo = None, hi = None, inclusive = (True, True)) -> int:
+        """
+            This method counts the keys between lo and hi. Partitions that lie wholly
+            inside the range are counted from the sizes the facade keeps.
+        """
+        first = 0 if lo is None else self.__partition_of(lo)
+        last = len(self.__workers) - 1 if hi is None else self.__partition_of(hi)
+        if first > last: # hi < lo
+            return 0
+        if first == last:
+            return self.__call_one(first, "count_range", lo, hi, inclusive)
+        futures = [self.__workers[first].submit(_call, "count_range", (lo, None, inclusive)),
+                   self.__workers[last].submit(_call, "count_range", (None, hi, inclusive))]
+        return sum(self.__sizes[first + 1:last]) + sum(future.result()[0] for future in futures)
+
+    # yields every k / v pair in key order
+    def items(self):
+        """
+            This method yields every key / value pair in ascending key order, one
+            partition at a time.
+        """
+        for worker in self.__workers:
+            yield from worker.submit(_range, None, None, (True, True)).result()
+
+    # yields every key in order
+    def keys(self):
+        """
+            This method yields every key in ascending order.
+        """
+        for key, _ in self.items():
+            yield key
+
+    # iterates over keys in order
+    def __iter__(self):
+        """
+            This method returns an iterator over the keys, in ascending order.
+        """
+        return self.keys()
+
+    # returns the partition a key belongs to
+    def __partition_of(self, key) -> int:
+        return bisect_right(self.boundaries, key)
+
+    # returns the global rank of the first key of every partition
+    def __starts(self) -> list:
+        return [0] + list(accumulate(self.__sizes))[:-1]
+
+    # sorts items out into one list per partition, by the key key_of gives each
+    def __share_out(self, items, key_of) -> list:
+        shares = [[] for _ in self.__workers]
+        boundaries = self.boundaries
+        for item in items:
+            shares[bisect_right(boundaries, key_of(item))].append(item)
+        return shares
+
+    # runs a method on one partition and returns its answer
+    def __call_one(self, index, method, *args):
+        answer, size = self.__workers[index].submit(_call, method, args).result()
+        self.__sizes[index] = size
+        return answer
+
+    # runs a method on every partition with arguments at once, skipping those given
+    # none, and returns the answers in partition order
+    def __call_all(self, method, arguments) -> list:
+        futures = [worker.submit(_call, method, args) if args is not None else None
+                   for worker, args in zip(self.__workers, arguments)]
+        answers = []
+        for index, future in enumerate(futures):
+            if future is None:
+                answers.append(None)
+                continue
+            answer, self.__sizes[index] = future.result()
+            answers.append(answer)
+        return answers
@@ -0,0 +1,431 @@
+from redblacktree import Node, RedBlackTree
+
+
+class PersistentRedBlackTree:
+
+    """
+        This class implements a persistent red-black tree. A version never
+        changes once made: put and delete leave it alone and return a new version
+        instead. The new version copies only the O(log n) nodes on the search path
+        and shares every other subtree with the old one, so keeping a version around
+        as a snapshot is free and each update allocates O(log n) nodes. Every
+        version answers the same queries as a RedBlackTree, including select,
+        find_rank, find_predecessor and find_successor.
+    """
+
+    __author__ = "Silver Lippert"
+    __version__ = "23.11.5"
+
+    root = None
+
+    def __init__(self, items = ()):
+        """
+            Creates a version holding the given key / value pairs (or mapping),
+            or an empty one. If a key repeats, the last pair wins.
+        """
+        if items:
+            self.root = RedBlackTree.from_items(items).root
+        self.__view = None
+
+    # returns a new version with the k / v pair inserted
+    def put(self, key, value) -> "PersistentRedBlackTree":
+        """
+            This method returns a new version with the key / value pair inserted,
+            or with the value replaced if the key already exists. This version is
+            left unchanged.
+        """
+        root = self.__insert(self.root, key, value)
+        root.is_black = True # root is always a fresh copy, so it can be changed
+        return self.__derive(root)
+
+    # returns a new version with every k / v pair inserted
+    def put_many(self, items) -> "PersistentRedBlackTree":
+        """
+            This method returns a new version with every key / value pair (or
+            mapping entry) inserted. Later pairs win on repeated keys.
+        """
+        if hasattr(items, "items"):
+            items = items.items()
+        root = self.root
+        for key, value in items:
+            root = self.__insert(root, key, value)
+            root.is_black = True
+        return self.__derive(root)
+
+    # returns a new version without the key, or this one if key DNE
+    def delete(self, key) -> "PersistentRedBlackTree":
+        """
+            This method returns a new version with the key removed. If the key DNE,
+            this version is returned as is. Use get first to keep the removed value.
+        """
+        if not self.contains_key(key):
+            return self
+        root = self.__copy(self.root)
+        if not self.__is_red(root.left_child) and not self.__is_red(root.right_child):
+            root.is_black = False # make root red so there is a red link to push down
+        root = self.__delete(root, key)
+        if root is not None:
+            root.is_black = True
+        return self.__derive(root)
+
+    # get returns value of given key, or none if key does not exist
+    def get(self, key):
+        """
+            This method takes a key and returns its value in this version,
+            or None if the key is not there.
+        """
+        return self.__tree().get(key)
+
+    # returns true if key is present
+    def contains_key(self, key) -> bool:
+        """
+            This method returns whether the key is in this version.
+        """
+        return self.__tree().contains_key(key)
+
+    # returns true if this version is empty
+    def is_empty(self) -> bool:
+        """
+            This method returns whether this version has any pairs in it.
+        """
+        return self.root is None
+
+    # returns num of k / v pairs
+    def __len__(self) -> int:
+        """
+        returns number of key / value pairs
+        """
+        if self.root:
+            return self.root.size
+        return 0
+
+    # iterates over keys in order
+    def __iter__(self):
+        """
+            This method returns an iterator over the keys, in ascending order.
+        """
+        return self.__tree().keys()
+
+    # iterates over keys in reverse order
+    def __reversed__(self):
+        """
+            This method returns an iterator over the keys, in descending order.
+        """
+        return reversed(self.__tree())
+
+    # yields every key in order
+    def keys(self):
+        """
+            This method lazily yields every key in ascending order.
+        """
+        return self.__tree().keys()
+
+    # yields every value in key order
+    def values(self):
+        """
+            This method lazily yields every value, ordered by their keys.
+        """
+        return self.__tree().values()
+
+    # yields every k / v pair in key order
+    def items(self):
+        """
+            This method lazily yields every key / value pair in ascending key order.
+        """
+        return self.__tree().items()
+
+    # returns smallest key
+    def find_first_key(self):
+        """
+            This method finds and returns the smallest key in order.
+        """
+        return self.__tree().find_first_key()
+
+    # returns largest key
+    def find_last_key(self):
+        """
+            This method finds and returns the largest key in order.
+        """
+        return self.__tree().find_last_key()
+
+    # returns predecessor of given key or none if key DNE or has no pred.
+    def find_predecessor(self, key):
+        """
+            This method returns the key just before the given one, or None if the
+            key DNE or has no predecessor.
+        """
+        return self.__tree().find_predecessor(key)
+
+    # returns successor of key, or none if key DNE or has no succ.
+    def find_successor(self, key):
+        """
+            This method returns the key just after the given one, or None if the
+            key DNE or has no successor.
+        """
+        return self.__tree().find_successor(key)
+
+    # returns largest key <= key, or none if there is none
+    def floor(self, key):
+        """
+            This method returns the largest key at or below the given one, see RedBlackTree.floor.
+        """
+        return self.__tree().floor(key)
+
+    # returns smallest key >= key, or none if there is none
+    def ceiling(self, key):
+        """
+            This method returns the smallest key at or above the given one, see RedBlackTree.ceiling.
+        """
+        return self.__tree().ceiling(key)
+
+    # returns largest key < key, or none if there is none
+    def lower(self, key):
+        """
+            This method returns the largest key strictly below the given one, see RedBlackTree.lower.
+        """
+        return self.__tree().lower(key)
+
+    # returns smallest key > key, or none if there is none
+    def higher(self, key):
+        """
+            This method returns the smallest key strictly above the given one, see RedBlackTree.higher.
+        """
+        return self.__tree().higher(key)
+
+    # returns the key closest to key, or none if version is empty
+    def nearest(self, key):
+        """
+            This method returns the key closest to the given one, see RedBlackTree.nearest.
+        """
+        return self.__tree().nearest(key)
+
+    # returns rank of key, or -1 if key DNE
+    def find_rank(self, key) -> int:
+        """
+            This method returns the 0 indexed rank of a key, or -1 if it DNE.
+        """
+        return self.__tree().find_rank(key)
+
+    # returns key of the given rank, or none if rank is invalid, 0 index
+    def select(self, rank: int):
+        """
+            This method returns the key at a 0 indexed rank, or None if the
+            rank is invalid.
+        """
+        return self.__tree().select(rank)
+
+    # returns the rank of every key in keys, or -1 for keys that DNE
+    def rank_many(self, keys):
+        """
+            This method returns the ranks of many keys, see RedBlackTree.rank_many.
+        """
+        return self.__tree().rank_many(keys)
+
+    # returns the key at every rank in ranks, or none for invalid ranks
+    def select_many(self, ranks):
+        """
+            This method returns the keys at many ranks, see RedBlackTree.select_many.
+        """
+        return self.__tree().select_many(ranks)
+
+    # returns the floor of every key in keys
+    def floor_many(self, keys):
+        """
+            This method answers floor for many keys at once, see RedBlackTree.floor_many.
+        """
+        return self.__tree().floor_many(keys)
+
+    # returns the ceiling of every key in keys
+    def ceiling_many(self, keys):
+        """
+            This method answers ceiling for many keys at once, see RedBlackTree.ceiling_many.
+        """
+        return self.__tree().ceiling_many(keys)
+
+    # returns the lower of every key in keys
+    def lower_many(self, keys):
+        """
+            This method answers lower for many keys at once, see RedBlackTree.lower_many.
+        """
+        return self.__tree().lower_many(keys)
+
+    # returns the higher of every key in keys
+    def higher_many(self, keys):
+        """
+            This method answers higher for many keys at once, see RedBlackTree.higher_many.
+        """
+        return self.__tree().higher_many(keys)
+
+    # returns the nearest of every key in keys
+    def nearest_many(self, keys):
+        """
+            This method answers nearest for many keys at once, see RedBlackTree.nearest_many.
+        """
+        return self.__tree().nearest_many(keys)
+
+    # yields k / v pairs with lo <= key <= hi in order, none means unbounded
+    def range(self, lo = None, hi = None, inclusive = (True, True)):
+        """
+            This method lazily yields the key / value pairs between lo and hi,
+            see RedBlackTree.range.
+        """
+        return self.__tree().range(lo, hi, inclusive)
+
+    # returns num of keys with lo <= key <= hi, none means unbounded
+    def count_range(self, lo = None, hi = None, inclusive = (True, True)) -> int:
+        """
+            This method counts the keys between lo and hi in O(log n).
+        """
+        return self.__tree().count_range(lo, hi, inclusive)
+
+    # returns every tree statistic from a single walk
+    def stats(self) -> dict:
+        """
+            This method returns the statistics of this version, see RedBlackTree.stats.
+        """
+        return self.__tree().stats()
+
+    # returns true if the tree follows every red-black rule
+    def is_valid(self) -> bool:
+        """
+            This method checks every tree invariant, see RedBlackTree.is_valid.
+        """
+        return self.__tree().is_valid()
+
+    # a RedBlackTree over this version's nodes, only ever used for reading
+    def __tree(self) -> RedBlackTree:
+        if self.__view is None:
+            self.__view = RedBlackTree()
+            self.__view.root = self.root
+        return self.__view
+
+    # wraps a root in a new version
+    def __derive(self, root) -> "PersistentRedBlackTree":
+        version = PersistentRedBlackTree.__new__(type(self))
+        version.root = root
+        version.__view = None
+        return version
+
+    # every change below works on fresh copies, never on nodes an older version can see
+
+    # returns a copy of node that shares its children
+    def __copy(self, node) -> Node:
+        fresh = Node(node.key, node.value, node.size, node.is_black)
+        fresh.left_child = node.left_child
+        fresh.right_child = node.right_child
+        return fresh
+
+    # returns true if the node exists and is red
+    def __is_red(self, node) -> bool:
+        return node is not None and not node.is_black
+
+    # returns a copy of the subtree top with the k / v pair inserted below it
+    def __insert(self, node, key, value) -> Node:
+        if node is None:
+            return Node(key, value, 1)
+        node = self.__copy(node)
+        if key < node.key:
+            node.left_child = self.__insert(node.left_child, key, value)
+        elif node.key < key:
+            node.right_child = self.__insert(node.right_child, key, value)
+        else: # key exists, just replace the value
+            node.value = value
+            return node
+        return self.__balance(node)
+
+    # returns a fresh subtree top with the key removed below it. key must exist
+    def __delete(self, node, key) -> Node:
+        if key < node.key:
+            if not self.__is_red(node.left_child) and not self.__is_red(node.left_child.left_child):
+                node = self.__move_red_left(node)
+            node.left_child = self.__delete(self.__copy(node.left_child), key)
+        else:
+            if self.__is_red(node.left_child):
+                node = self.__right_rotate(node)
+            if node.key == key and node.right_child is None:
+                return None
+            if not self.__is_red(node.right_child) and not self.__is_red(node.right_child.left_child):
+                node = self.__move_red_right(node)
+            if node.key == key: # take over the successor's pair, then remove it below
+                successor = node.right_child
+                while successor.left_child:
+                    successor = successor.left_child
+                node.key = successor.key
+                node.value = successor.value
+                node.right_child = self.__delete_min(self.__copy(node.right_child))
+            else:
+                node.right_child = self.__delete(self.__copy(node.right_child), key)
+        return self.__balance(node)
+
+    # returns a fresh subtree top with its smallest key removed
+    def __delete_min(self, node) -> Node:
+        if node.left_child is None:
+            return None
+        if not self.__is_red(node.left_child) and not self.__is_red(node.left_child.left_child):
+            node = self.__move_red_left(node)
+        node.left_child = self.__delete_min(self.__copy(node.left_child))
+        return self.__balance(node)
+
+    # restores the left leaning rules at a fresh node, returns the new subtree top
+    def __balance(self, node) -> Node:
+        node.size = 1 + (node.left_child.size if node.left_child else 0) + (node.right_child.size if node.right_child else 0)
+        left = node.left_child
+        right = node.right_child
+        if right is not None and not right.is_black and (left is None or left.is_black):
+            node = self.__left_rotate(node)
+        left = node.left_child
+        if left is not None and not left.is_black and left.left_child is not None and not left.left_child.is_black:
+            node = self.__right_rotate(node)
+        left = node.left_child
+        right = node.right_child
+        if left is not None and not left.is_black and right is not None and not right.is_black:
+            self.__color_flip(node)
+        return node
+
+    # flips the colors of a fresh node and of copies of its children
+    def __color_flip(self, parent) -> Node:
+        parent.left_child = self.__copy(parent.left_child)
+        parent.right_child = self.__copy(parent.right_child)
+        parent.left_child.is_black = not parent.left_child.is_black
+        parent.right_child.is_black = not parent.right_child.is_black
+        parent.is_black = not parent.is_black
+        return parent
+
+    # rotates a fresh node left, returns a copy of its right child as the new top
+    def __left_rotate(self, parent) -> Node:
+        temp = self.__copy(parent.right_child)
+        parent.right_child = temp.left_child
+        temp.left_child = parent
+        temp.is_black = parent.is_black
+        parent.is_black = False
+        temp.size = parent.size
+        parent.size = 1 + (parent.left_child.size if parent.left_child else 0) + (parent.right_child.size if parent.right_child else 0)
+        return temp
+
+    # rotates a fresh node right, returns a copy of its left child as the new top
+    def __right_rotate(self, parent) -> Node:
+        temp = self.__copy(parent.left_child)
+        parent.left_child = temp.right_child
+        temp.right_child = parent
+        temp.is_black = parent.is_black
+        parent.is_black = False
+        temp.size = parent.size
+        parent.size = 1 + (parent.left_child.size if parent.left_child else 0) + (parent.right_child.size if parent.right_child else 0)
+        return temp
+
+    # makes the left child or one of its children red, before deleting below it
+    def __move_red_left(self, parent) -> Node:
+        self.__color_flip(parent)
+        if self.__is_red(parent.right_child.left_child): # borrow from the right sibling
+            parent.right_child = self.__right_rotate(parent.right_child)
+            parent = self.__left_rotate(parent)
+            self.__color_flip(parent)
+        return parent
+
+    # makes the right child or one of its children red, before deleting below it
+    def __move_red_right(self, parent) -> Node:
+        self.__color_flip(parent)
+        if self.__is_red(parent.left_child.left_child): # borrow from the left sibling
+            parent = self.__right_rotate(parent)
+            self.__color_flip(parent)
+        return parent
@@ -1,3 +1,21 @@
+import gc
+import pickle
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import islice
+from operator import add, itemgetter
+from time import perf_counter
+
+try: # optional, only used to hand NumPy arrays back to callers that pass them in
+    import numpy
+except ImportError:
+    numpy = None
+
+
 class Node:
     """
         This class creates a node with relevant data to be used in
@@ -6,20 +24,141 @@ class Node:
 
     __author__ = "Silver Lippert"
     __version__ = "23.11.5"
-    
-    is_black = False
-    key = None
-    value = None
-    size = 0
 
-    left_child = None
-    right_child = None
+    # fixed attribute layout, so nodes carry no per-instance __dict__
+    __slots__ = ("is_black", "key", "value", "size", "left_child", "right_child")
 
     def __init__(self, k, v, s = 0,  is_bl = False):
         self.is_black = is_bl
         self.key = k
         self.value = v
         self.size = s
+        self.left_child = None
+        self.right_child = None
+
+
+# the key as the caller gave it. a plain node holds only that key, so item reads
+# the same slot as key and costs nothing extra
+Node.item = Node.key
+
+
+# a node that also holds the aggregate of its subtree. only trees built with an
+# aggregate make these, so plain nodes stay as small as they were
+class _AggregateNode(Node):
+    __slots__ = ("agg",)
+
+
+# nodes of a tree built with a key function. key holds the comparison key derived
+# from the caller's key, worked out once when the node is made, and item holds
+# the caller's key, which is what the tree hands back
+class _KeyedNode(Node):
+    __slots__ = ("item",)
+
+
+class _KeyedAggregateNode(_AggregateNode):
+    __slots__ = ("item",)
+
+
+# the value itself, the default measure of an aggregate
+def _value_only(key, value):
+    return value
+
+
+# turns found keys into a numpy array for callers that passed one in. plain numbers
+# make a typed array, anything else (tuples, strings, none for a miss) goes in an
+# object array one key per slot, since numpy.array would unpack tuples into another
+# dimension, or fail on tuples of different lengths
+def _key_array(found):
+    if all(type(key) is float or (type(key) is int and -2 ** 63 <= key < 2 ** 63) for key in found):
+        return numpy.array(found)
+    array = numpy.empty(len(found), dtype=object)
+    for i, key in enumerate(found): # slice assignment would unpack equal length tuples
+        array[i] = key
+    return array
+
+
+# the smaller of two aggregates, where none stands for no values at all
+def _smaller(a, b):
+    if a is None:
+        return b
+    if b is None or a < b:
+        return a
+    return b
+
+
+# the larger of two aggregates, where none stands for no values at all
+def _larger(a, b):
+    if a is None:
+        return b
+    if b is None or b < a:
+        return a
+    return b
+
+
+class Aggregate:
+
+    """
+        This class describes a value a RedBlackTree can keep for every subtree,
+        so sums, minimums or maximums over any key range come back in O(log n).
+        measure(key, value) turns a pair into an element, combine(a, b) joins two
+        elements with a's keys before b's, and identity is the answer for no pairs.
+        combine must be associative, but need not be commutative.
+    """
+
+    __author__ = "Silver Lippert"
+    __version__ = "23.11.5"
+
+    __slots__ = ("combine", "identity", "measure")
+
+    def __init__(self, combine, identity, measure = None):
+        self.combine = combine
+        self.identity = identity
+        self.measure = measure if measure is not None else _value_only
+
+    # adds values up
+    @classmethod
+    def sum(cls, measure = None) -> "Aggregate":
+        """
+            Sums the measured values, 0 for no pairs.
+        """
+        return cls(add, 0, measure)
+
+    # keeps the smallest value
+    @classmethod
+    def min(cls, measure = None) -> "Aggregate":
+        """
+            Keeps the smallest measured value, None for no pairs.
+        """
+        return cls(_smaller, None, measure)
+
+    # keeps the largest value
+    @classmethod
+    def max(cls, measure = None) -> "Aggregate":
+        """
+            Keeps the largest measured value, None for no pairs.
+        """
+        return cls(_larger, None, measure)
+
+
+# marks a missing entry where none could be a real value
+_MISSING = object()
+
+# snapshot files written by dump: a header, then the k / v pairs in key order, in
+# blocks of SNAPSHOT_BLOCK as [length][pickled first key][length][pickled list of
+# keys][length][pickled list of values], then a table holding the file offset of
+# every block. readers decode a whole block with two unpickles, and jump straight to
+# the block of any rank, or binary search the first keys for the block of a key
+SNAPSHOT_MAGIC = b"RBTSNAP\x00"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HEADER = struct.Struct("<8sIIQQ") # magic, version, pairs per block, count, table offset
+SNAPSHOT_LENGTH = struct.Struct("<I")
+SNAPSHOT_OFFSET = struct.Struct("<Q")
+SNAPSHOT_BLOCK = 64
+
+
+# the keys sharing one value in the value index, kept in insertion order
+class _KeySet(dict):
+    __slots__ = ()
 
 
 class RedBlackTree:
@@ -34,15 +173,280 @@ class RedBlackTree:
 
     root = None
 
+    # put_many rebuilds the tree once the batch is at least 1 / MERGE_RATIO of its size
+    MERGE_RATIO = 4
+
+    # floor_many and the like share walks between keys once there is at least one
+    # key for every SHARED_WALK_RATIO in the tree
+    SHARED_WALK_RATIO = 32
+
+    def __init__(self, index_values = False, cache_size = 0, metrics = None, aggregate = None, key = None):
+        """
+            Creates an empty tree. With index_values set, the tree also keeps a hash
+            map from each value to the keys that hold it, which makes reverse_lookup and
+            contains_value O(1) on average instead of a scan of the whole tree. The index
+            costs one dict entry per distinct value, about 40 bytes per key on CPython when
+            values are unique (shared values add a small set of keys), and put / delete do
+            one or two extra hash updates. Values that cannot be hashed are left out.
+
+            With cache_size above 0, the answers of get, find_predecessor and
+            find_successor are remembered for up to cache_size keys each, dropping the
+            least recently used key first. A repeated lookup is then one hash probe
+            instead of a walk down the tree. put and delete forget only the answers they
+            change, at the cost of one extra walk to find the neighbouring keys.
+            cache_info reports the hits and misses.
+
+            With metrics set to a TreeMetrics (from treemetrics.py), the tree counts
+            its rotations and color flips, and times every get, put and delete along
+            with how many nodes each one walks past, counted on the walk itself. A
+            tree without metrics only pays a check of the metrics attribute.
+
+            With aggregate set to an Aggregate, every node also keeps the aggregate of
+            its subtree, which range_aggregate and prefix_aggregate combine in O(log n).
+            put and delete refresh it on the nodes they pass, rotations on the two nodes
+            they move, and bulk loads in one pass over the new tree.
+
+            With key set to a function of one argument, like the key of sorted, keys
+            are ordered by what it returns. It is called once per key on the way in:
+            every node stores the result next to the key it came from, and every
+            lookup works it out once for the key it was given, so the walk down the
+            tree compares only those results. When keys are objects with costly
+            comparisons, a key returning a tuple, a str, or better an int or bytes
+            encoding of them, makes every step cheaper. Keys with equal results count
+            as the same key. Keys are still handed back as given, and an aggregate's
+            measure is called with them.
+        """
+        self.__value_index = {} if index_values else None
+        self.__key = key
+
+        # the subtree aggregate, and the kind of node that can hold it (and the key)
+        self.__aggregate = aggregate
+        if key is None:
+            self.__node = _AggregateNode if aggregate is not None else Node
+        else:
+            self.__node = _KeyedAggregateNode if aggregate is not None else _KeyedNode
+
+        # lookup caches, each a map from the asked key to the answer in LRU order
+        self.__cache_size = cache_size
+        self.__cache_hits = 0
+        self.__cache_misses = 0
+        if cache_size > 0:
+            self.__value_cache = OrderedDict()
+            self.__predecessor_cache = OrderedDict()
+            self.__successor_cache = OrderedDict()
+        else:
+            self.__value_cache = None
+
+        self.metrics = metrics
+        self.__timing = False # true while a get, put or delete is being timed
+        self.__visited = 0 # nodes the last put or delete walked past
+
+        # running statistics, recounted by stats() whenever __stats_valid is off
+        self.__red_count = 0
+        self.__depth_sum = 0
+        self.__stats_valid = True
+
     # inserts a new k / v pair. Assume neither is none
     def put(self, key, value):
         """
             This method takes a key / value pair and inserts it into the red-black tree.
             If the key already exists, it will replace the old value with the input one.
+            With a key function, a key it finds equal to one in the tree replaces
+            that key too.
+        """
+        if self.metrics is not None and not self.__timing:
+            return self.__timed("put", self.put, key, value)
+        item = key
+        if self.__key is not None:
+            key = self.__key(key)
+        node = self.root
+        if node is None:
+            self.root = self.__node(key, value, 1, True)
+            if self.__key is not None:
+                self.root.item = item
+            if self.__aggregate is not None:
+                self.__fix_aggregate(self.root)
+            if self.__value_index is not None:
+                self.__index_add(item, value)
+            if self.__value_cache is not None:
+                self.__cache_forget(key)
+            return
+
+        path = [] # every node passed on the way down, to fix on the way up
+        while node is not None:
+            if node.key == key: # key exists, just replace the value
+                if self.__value_index is not None:
+                    self.__index_remove(node.item, node.value)
+                if self.__key is not None: # the last key written wins, as in put_many
+                    node.item = item
+                if self.__value_index is not None:
+                    self.__index_add(item, value)
+                if self.__value_cache is not None:
+                    if self.__key is not None: # the neighbours cached the old key as their answer
+                        self.__cache_forget(key)
+                    else:
+                        self.__value_cache.pop(key, None)
+                node.value = value
+                if self.__aggregate is not None:
+                    self.__fix_aggregate(node)
+                    for above in reversed(path):
+                        self.__fix_aggregate(above)
+                self.__visited = len(path) + 1
+                return
+            path.append(node)
+            if node.key < key:
+                node = node.right_child
+            else:
+                node = node.left_child
+
+        self.__visited = len(path)
+        leaf = self.__node(key, value, 1)
+        if self.__key is not None:
+            leaf.item = item
+        if path[-1].key < key:
+            path[-1].right_child = leaf
+        else:
+            path[-1].left_child = leaf
+        tracking = self.__aggregate is not None
+        if tracking:
+            self.__fix_aggregate(leaf)
+        if self.__value_index is not None:
+            self.__index_add(item, value)
+        self.__red_count -= -1 # new nodes start out red
+        self.__depth_sum += len(path)
+
+        # fixing the tree now that its all messed up. once a black node needs no
+        # fixing, nothing above it does either, and those nodes only grow by one
+        i = len(path) - 1
+        while i >= 0:
+            root = path[i]
+            root.size -= -1
+            top = root
+            left = top.left_child
+            right = top.right_child
+            if right is not None and not right.is_black and (left is None or left.is_black):
+                top = self.__left_rotate(top)
+            left = top.left_child
+            if left is not None and not left.is_black and left.left_child is not None and not left.left_child.is_black:
+                top = self.__right_rotate(top)
+            left = top.left_child
+            right = top.right_child
+            if left is not None and not left.is_black and right is not None and not right.is_black:
+                self.__color_flip(top)
+            elif top is root and root.is_black:
+                break
+            if top is not root:
+                self.__relink(path[i - 1] if i else None, root, top)
+            elif tracking: # rotations fix their own nodes
+                self.__fix_aggregate(top)
+            i -= 1
+        for j in range(i):
+            path[j].size -= -1
+        if tracking: # the nodes the loop stopped short of
+            for j in range(i, -1, -1):
+                self.__fix_aggregate(path[j])
+        if not self.root.is_black:
+            self.root.is_black = True
+            self.__red_count -= 1
+        if self.__value_cache is not None:
+            self.__cache_forget(key)
+
+    # inserts many k / v pairs at once, later pairs win on repeated keys
+    def put_many(self, items, deletes = ()):
+        """
+            This method takes an iterable of key / value pairs (or a mapping) and
+            inserts all of them. Sorted input is detected and used as is, anything else
+            is sorted first. Large batches are merged with the existing keys and the tree
+            is rebuilt in linear time, small ones fall back to one put per pair.
+            The keys in deletes, if any, are removed in the same pass, before the
+            pairs go in, with each one weighed as two puts in choosing between the two.
+        """
+        batch = self.__sorted_batch(items)
+        deletes = list(deletes)
+        if not batch and not deletes:
+            return
+        if (len(batch) + 2 * len(deletes)) * self.MERGE_RATIO < len(self): # too small to pay for a rebuild
+            for key in deletes:
+                self.delete(key)
+            for entry in batch:
+                self.put(entry[-1] if self.__key is not None else entry[0], entry[1])
+            return
+
+        keyed = self.__key is not None
+        if keyed:
+            deletes = [self.__key(key) for key in deletes]
+        deletes.sort()
+        merged = []
+        i = 0
+        j = 0
+        for node in self.__in_order_nodes():
+            while i < len(batch) and batch[i][0] < node.key: # new keys that come first
+                merged.append(batch[i])
+                i -= -1
+            if i < len(batch) and batch[i][0] == node.key: # batch value replaces old one
+                merged.append(batch[i])
+                i -= -1
+                continue
+            while j < len(deletes) and deletes[j] < node.key:
+                j -= -1
+            if j < len(deletes) and deletes[j] == node.key: # goes
+                continue
+            if keyed:
+                merged.append((node.key, node.value, node.item))
+            else:
+                merged.append((node.key, node.value))
+        merged.extend(batch[i:])
+        self.__set_root(self.__build_balanced(merged))
+
+    # removes many keys at once, returns how many were in the tree
+    def delete_many(self, keys) -> int:
+        """
+            This method removes every key of an iterable that is in the tree, and
+            returns how many it removed. It goes through put_many, so a small batch
+            costs one delete per key, and a larger one a sweep over the keys in
+            order that rebuilds the tree from those that stay.
+        """
+        before = len(self)
+        self.put_many((), keys)
+        return before - len(self)
+
+    # builds a new tree from k / v pairs that are already in ascending key order
+    @classmethod
+    def from_sorted(cls, items, **options):
         """
-        self.root = self.__find_and_add(self.root, key, value) # helper method
-        self.root.is_black = True
-        
+            This method takes an iterable of key / value pairs in ascending key order,
+            and builds a balanced tree out of them in linear time. If a key repeats,
+            the last pair wins. Raises ValueError if the keys are out of order.
+            Any keyword options are passed on to the constructor. With a key function,
+            the pairs must be in the order it gives.
+        """
+        tree = cls(**options)
+        derive = tree.__key
+        batch = []
+        for key, value in items:
+            entry = (key, value) if derive is None else (derive(key), value, key)
+            if batch and not batch[-1][0] < entry[0]:
+                if batch[-1][0] == entry[0]: # repeated key, keep the later value
+                    batch[-1] = entry
+                    continue
+                raise ValueError(f"keys are not in ascending order at {key!r}")
+            batch.append(entry)
+        tree.__set_root(tree.__build_balanced(batch))
+        return tree
+
+    # builds a new tree from k / v pairs in any order
+    @classmethod
+    def from_items(cls, items, **options):
+        """
+            This method takes a mapping or an iterable of key / value pairs in any
+            order, and builds a balanced tree out of them. If a key repeats, the last
+            pair wins. The input is only sorted if it is not in order already.
+            Any keyword options are passed on to the constructor.
+        """
+        tree = cls(**options)
+        tree.__set_root(tree.__build_balanced(tree.__sorted_batch(items)))
+        return tree
+
 
     # get returns value of given key, or none if key does not exist
     def get(self, key):
@@ -50,35 +454,111 @@ class RedBlackTree:
             This method takes a key and searches the tree for it. It will return
             the value associated with the key, or none if the key is not within the tree.
         """
-        tree = []
-        tree.append(self.root)
-
-        for item in tree: # loop through the tree
-            if item:
-                if item.key == key:
-                    return item.value
-                elif item.key > key:
-                    tree.append(item.left_child)
-                else:
-                    tree.append(item.right_child)
-        return None
+        if self.metrics is not None:
+            return self.__timed_get(key)
+        if self.__key is not None:
+            key = self.__key(key)
+        if self.__value_cache is not None:
+            return self.__cached(self.__value_cache, key, self.__value_of)
+        return self.__value_of(key)
 
 
     # removed a k / v pair, returns deleted val, or none is key DNE
     def delete(self, key):
         """
             This method takes a key as input, and searches the tree for it. If found,
-            it then removes that key / value pair from the tree.
-        """
-        val = self.get(key)
-        if val and self.root: # if the key exists, and the root exists
-            self.root.is_black = False # make root red
-            self.root = self.__find_and_delete(self.root, key) # helper method
-            if self.root:
-                self.root.is_black = True
-            return val
-        else: # if key or root DNE
+            it then removes that key / value pair from the tree and returns its value.
+            The search, the swap with the successor and the rebalancing all happen in
+            a single walk down the tree and back up the stored path.
+        """
+        if self.metrics is not None and not self.__timing:
+            return self.__timed("delete", self.delete, key)
+        if self.root is None:
             return None
+        if self.__key is not None:
+            key = self.__key(key)
+        if not self.__is_red(self.root.left_child) and not self.__is_red(self.root.right_child):
+            self.root.is_black = False # make root red so there is a red link to push down
+            self.__red_count -= -1
+
+        path = [] # every node passed on the way down, to rebalance on the way up
+        node = self.root
+        val = None
+        shrink = 0 # becomes 1 once a node is cut off
+        target = None # node holding the key, once found with a right subtree
+        target_at = 0 # where target sits in path
+
+        while True:
+            left = node.left_child
+            if target is None and key < node.key:
+                if left is None: # key DNE
+                    path.append(node)
+                    break
+                if left.is_black and (left.left_child is None or left.left_child.is_black):
+                    node = self.__swap_in(path, node, self.__move_red_left(node))
+                path.append(node)
+                node = node.left_child
+
+            elif target is not None: # looking for the smallest key under target
+                if left is None: # found it, it takes the place of target
+                    self.__forget_node(node, len(path))
+                    self.__relink(path[-1], node, None)
+                    node.left_child = target.left_child
+                    node.right_child = target.right_child
+                    node.is_black = target.is_black
+                    node.size = target.size
+                    self.__relink(path[target_at - 1] if target_at else None, target, node)
+                    path[target_at] = node
+                    shrink = 1
+                    break
+                if left.is_black and (left.left_child is None or left.left_child.is_black):
+                    node = self.__swap_in(path, node, self.__move_red_left(node))
+                path.append(node)
+                node = node.left_child
+
+            else:
+                if left is not None and not left.is_black:
+                    node = self.__swap_in(path, node, self.__right_rotate(node))
+                right = node.right_child
+                if right is None:
+                    if node.key == key: # a leaf, just remove it
+                        self.__forget_node(node, len(path))
+                        val = node.value
+                        item = node.item
+                        self.__relink(path[-1] if path else None, node, None)
+                        shrink = 1
+                    else: # key DNE
+                        path.append(node)
+                    break
+                if right.is_black and (right.left_child is None or right.left_child.is_black):
+                    node = self.__swap_in(path, node, self.__move_red_right(node))
+                if node.key == key: # swap with the successor instead of removing it here
+                    val = node.value
+                    item = node.item
+                    target = node
+                    target_at = len(path)
+                path.append(node)
+                node = node.right_child
+
+        self.__visited = len(path) + shrink # a node cut off was not added to path
+        if shrink and self.__value_index is not None:
+            self.__index_remove(item, val)
+
+        # on the way back up, fix every node we touched. if nothing was cut off, only
+        # rotations changed any subtree, and they fix their own aggregates
+        tracking = shrink and self.__aggregate is not None
+        for i in range(len(path) - 1, -1, -1):
+            top = self.__balance(path[i], shrink)
+            if top is not path[i]:
+                self.__relink(path[i - 1] if i else None, path[i], top)
+            elif tracking: # rotations fix their own nodes
+                self.__fix_aggregate(top)
+        if self.root and not self.root.is_black:
+            self.root.is_black = True
+            self.__red_count -= 1
+        if shrink and self.__value_cache is not None:
+            self.__cache_forget(key)
+        return val
 
     # returns true if key is present
     def contains_key(self, key) -> bool:
@@ -86,7 +566,9 @@ class RedBlackTree:
             This method takes a key as input, and returns a boolean
             indicating whether the key is in the tree.
         """
-        if self.get(key):
+        if self.__key is not None:
+            key = self.__key(key)
+        if self.__find_node(key):
             return True
         return False
 
@@ -94,10 +576,14 @@ class RedBlackTree:
     def contains_value(self, value) -> bool:
         """
             This method takes a value as input, and returns a boolean
-            indicating whether the key is in the tree.
+            indicating whether any key maps to it.
         """
-        if self.reverse_lookup(value):
-            return True
+        keys = self.__indexed_keys(value)
+        if keys is not None:
+            return len(keys) > 0
+        for node in self.__in_order_nodes():
+            if node.value == value:
+                return True
         return False
 
     # returns true if tree is empty
@@ -119,20 +605,60 @@ class RedBlackTree:
             return self.root.size
         return 0
 
+    # iterates over keys in order
+    def __iter__(self):
+        """
+            This method returns an iterator over the keys, in ascending order.
+        """
+        return self.keys()
+
+    # iterates over keys in reverse order
+    def __reversed__(self):
+        """
+            This method returns an iterator over the keys, in descending order.
+        """
+        for node in self.__in_order_nodes(reverse=True):
+            yield node.item
+
+    # yields every key in order
+    def keys(self):
+        """
+            This method lazily yields every key in ascending order.
+        """
+        for node in self.__in_order_nodes():
+            yield node.item
+
+    # yields every value in key order
+    def values(self):
+        """
+            This method lazily yields every value, ordered by their keys.
+        """
+        for node in self.__in_order_nodes():
+            yield node.value
+
+    # yields every k / v pair in key order
+    def items(self):
+        """
+            This method lazily yields every key / value pair in ascending key order.
+        """
+        for node in self.__in_order_nodes():
+            yield (node.item, node.value)
+
     # finds key that maps to val, or none if DNE
     def reverse_lookup(self, value):
         """
-           This method takes a value as input, and finds the key that maps to it.
-           It returns the key, or none if the key DNE. 
+           This method takes a value as input, and finds a key that maps to it.
+           It returns the key, or none if the key DNE. With the value index on this is
+           a hash lookup, otherwise the tree is scanned in key order one node at a time.
         """
-        tree = []
-        tree.append(self.root)
-        for item in tree: # loop through the tree
-            if item:
-                if item.value == value:
-                    return item.key
-                tree.append(item.left_child) # search both nodes
-                tree.append(item.right_child)
+        keys = self.__indexed_keys(value)
+        if keys is not None:
+            for key in keys:
+                return key
+            return None
+        for node in self.__in_order_nodes():
+            if node.value == value:
+                return node.item
         return None
 
     # returns smallest key, or none if there is none
@@ -145,7 +671,7 @@ class RedBlackTree:
         for item in tree: # loop through the tree
             if item and item.left_child:
                 tree.append(item.left_child)
-        return tree.pop().key
+        return tree.pop().item
 
     # returns largest key or none if there is none
     def find_last_key(self):
@@ -157,7 +683,7 @@ class RedBlackTree:
         for item in tree: # loop through the tree
             if item and item.right_child:
                 tree.append(item.right_child)
-        return tree.pop().key
+        return tree.pop().item
 
     # returns key at the root or none if not there
     def get_root_key(self):
@@ -165,49 +691,28 @@ class RedBlackTree:
             This method returns the key that is situated at the root position.
         """
         if self.root:
-            return self.root.key
+            return self.root.item
         return None
 
+    # returns the key function, or none if keys are compared as given
+    def get_key_function(self):
+        """
+            This method returns the key function the tree orders its keys by, or
+            None if it has none.
+        """
+        return self.__key
+
     # returns predecessor of given key or none if key DNE or has no pred.
     def find_predecessor(self, key):
         """
             This method takes a key as input, and then finds and returns its predecessor.
             Returns None if the key DNE, or if it has no predecessor.
         """
-        tree = []
-        tree.append(self.root)
-        found = None
-        recent_right = None
-
-        for item in tree: # find Node w/ input key
-            if item:
-                if item.key > key:
-                    tree.append(item.left_child)
-                elif item.key == key:
-                    found = item
-                    break
-                else:
-                    tree.append(item.right_child)
-                    recent_right = item # remember node travelled left from
-
-        
-        if found == None: # if key is not found
-            return None
-        else:
-            tree = []
-            tree.append(found.left_child)
-            for item in tree: # find the child furthest to the right, if exists
-                if item and item.right_child:
-                    tree.append(item.right_child)
-
-        final_node = tree.pop()
-
-        if final_node: # if a predecessor beneath the key exists
-            return final_node.key
-        elif recent_right: # if the most recent right node before the key exists
-            return recent_right.key
-        else:
-            return None
+        if self.__key is not None:
+            key = self.__key(key)
+        if self.__value_cache is not None:
+            return self.__cached(self.__predecessor_cache, key, self.__predecessor_of)
+        return self.__predecessor_of(key)
 
     # returns successor of key, or none if key DNE or has no succ.
     def find_successor(self, key):
@@ -215,39 +720,109 @@ class RedBlackTree:
             This method takes a key as input, and searches for and returns its
             successor. It may return None if the key DNE, or has no successor.
         """
-        tree = []
-        tree.append(self.root)
-        found = None
-        recent_left = None
+        if self.__key is not None:
+            key = self.__key(key)
+        if self.__value_cache is not None:
+            return self.__cached(self.__successor_cache, key, self.__successor_of)
+        return self.__successor_of(key)
+
+    # returns largest key <= key, or none if there is none
+    def floor(self, key):
+        """
+            This method returns the largest key at or below the given one, which
+            need not be in the tree, or None if every key is above it.
+        """
+        if self.__key is not None:
+            key = self.__key(key)
+        node = self.__bound_node(self.root, key, True, True)
+        return node.item if node is not None else None
 
-        for item in tree: # find Node w/ input key
-            if item:
-                if item.key > key:
-                    tree.append(item.left_child)
-                    recent_left = item # remember node travelled left from
-                elif item.key == key:
-                    found = item
-                    break
-                else:
-                    tree.append(item.right_child)
-        
-        if found == None: # if key DNE
-            return None
-        else:
-            tree = []
-            tree.append(found.right_child)
-            for item in tree: # search for leftmost child
-                if item and item.left_child:
-                    tree.append(item.left_child)
+    # returns smallest key >= key, or none if there is none
+    def ceiling(self, key):
+        """
+            This method returns the smallest key at or above the given one, which
+            need not be in the tree, or None if every key is below it.
+        """
+        if self.__key is not None:
+            key = self.__key(key)
+        node = self.__bound_node(self.root, key, False, True)
+        return node.item if node is not None else None
 
-        final_node = tree.pop()
+    # returns largest key < key, or none if there is none
+    def lower(self, key):
+        """
+            This method returns the largest key strictly below the given one, which
+            need not be in the tree, or None if there is none.
+        """
+        if self.__key is not None:
+            key = self.__key(key)
+        node = self.__bound_node(self.root, key, True, False)
+        return node.item if node is not None else None
 
-        if final_node: # if decendant successor exists
-            return final_node.key
-        elif recent_left: # if ancestor successor exists
-            return recent_left.key
-        else:
-            return None
+    # returns smallest key > key, or none if there is none
+    def higher(self, key):
+        """
+            This method returns the smallest key strictly above the given one, which
+            need not be in the tree, or None if there is none.
+        """
+        if self.__key is not None:
+            key = self.__key(key)
+        node = self.__bound_node(self.root, key, False, False)
+        return node.item if node is not None else None
+
+    # returns the key closest to key, or none if tree is empty
+    def nearest(self, key):
+        """
+            This method returns the key closest to the given one, which need not be
+            in the tree, or None if the tree is empty. Keys must support subtraction,
+            like numbers or timestamps. On a tie the lower key wins. The floor and
+            the ceiling are both found in the same walk down the tree. With a key
+            function, the distance is still taken between the keys as given, and a
+            tie goes to the key that comes first.
+        """
+        probe = key if self.__key is None else self.__key(key)
+        node = self.root
+        below = None
+        above = None
+        while node is not None:
+            if probe < node.key:
+                above = node
+                node = node.left_child
+            elif node.key < probe:
+                below = node
+                node = node.right_child
+            else:
+                return node.item
+        return self.__closer(key, below.item if below else None, above.item if above else None)
+
+    # returns how well the lookup cache is doing
+    def cache_info(self) -> dict:
+        """
+            This method returns a dict with the hits and misses of the lookup cache
+            since it was last cleared, its capacity (cache_size) and the number of
+            answers it holds. Without a cache every count is 0.
+        """
+        held = 0
+        if self.__value_cache is not None:
+            held = len(self.__value_cache) + len(self.__predecessor_cache) + len(self.__successor_cache)
+        return {
+            "hits": self.__cache_hits,
+            "misses": self.__cache_misses,
+            "capacity": self.__cache_size,
+            "size": held,
+        }
+
+    # empties the lookup cache and resets its counters
+    def cache_clear(self):
+        """
+            This method forgets every cached answer and resets the hit and miss counts.
+        """
+        if self.__value_cache is not None:
+            self.__value_cache.clear()
+            self.__predecessor_cache.clear()
+            self.__successor_cache.clear()
+        self.__cache_hits = 0
+        self.__cache_misses = 0
 
     # returns rank of key, or -1 if key DNE
     def find_rank(self, key) -> int:
@@ -255,6 +830,8 @@ class RedBlackTree:
             This method takes a key as input, and returns the rank
             that it is in the tree. It will return -1 if the key DNE.
         """
+        if self.__key is not None:
+            key = self.__key(key)
         tree = []
         tree.append(self.root)
         rank = 0
@@ -272,7 +849,7 @@ class RedBlackTree:
                     if item.left_child:
                         rank -= -item.left_child.size
                     tree.append(item.right_child)
-
+        return -1
 
     # returns key of the given rank, or none if rank is invalid, 0 index
     def select (self, rank: int):
@@ -294,53 +871,286 @@ class RedBlackTree:
                 if left_size > rank:
                     tree.append(item.left_child)
                 elif left_size == rank:
-                    return item.key
+                    return item.item
                 else:
-                    rank = rank - 1 - item.left_child.size
+                    rank = rank - 1 - left_size
                     tree.append(item.right_child)
 
-    # returns num of red nodes in the tree
-    def count_red_nodes(self)-> int:
+    # returns the rank of every key in keys, or -1 for keys that DNE
+    def rank_many(self, keys):
         """
-            This method counts and returns the number of red nodes
-            in the tree.
+            This method takes many keys and returns their ranks, in the same order,
+            with -1 for keys that are not in the tree. The keys are sorted (unless they
+            already are) and answered in one walk that splits them up at each node, so
+            shared parts of the search paths are only walked once. A NumPy array of keys
+            gives back a NumPy array of ranks.
         """
-        tree = []
-        num_red = 0
-        tree.append(self.root)
-
-        for item in tree: # loop through tree
-            if item == None:
+        as_array = numpy is not None and isinstance(keys, numpy.ndarray)
+        keys = keys.tolist() if as_array else list(keys)
+        if self.__key is not None:
+            keys = [self.__key(key) for key in keys]
+        order, wanted = self.__sorted_queries(keys)
+        ranks = [-1] * len(keys)
+
+        stack = [(self.root, 0, 0, len(wanted))] # node, keys before it, slice of wanted
+        while stack:
+            node, offset, lo, hi = stack.pop()
+            if hi - lo == 1: # a lone key finishes with a plain descent
+                key = wanted[lo]
+                while node is not None:
+                    left_size = node.left_child.size if node.left_child else 0
+                    if node.key > key:
+                        node = node.left_child
+                    elif node.key == key:
+                        ranks[order[lo]] = offset + left_size
+                        break
+                    else:
+                        offset += left_size + 1
+                        node = node.right_child
+                continue
+            if node is None: # keys that reach an empty spot DNE
                 continue
+            first = bisect_left(wanted, node.key, lo, hi)
+            last = bisect_right(wanted, node.key, first, hi)
+            left_size = node.left_child.size if node.left_child else 0
+            for i in range(first, last):
+                ranks[order[i]] = offset + left_size
+            if lo < first:
+                stack.append((node.left_child, offset, lo, first))
+            if last < hi:
+                stack.append((node.right_child, offset + left_size + 1, last, hi))
+
+        if as_array:
+            return numpy.array(ranks, dtype=numpy.int64)
+        return ranks
+
+    # returns the key at every rank in ranks, or none for invalid ranks
+    def select_many(self, ranks):
+        """
+            This method takes many 0 indexed ranks and returns the keys at them, in
+            the same order, with None for ranks outside the tree. Like rank_many, the
+            ranks are answered together in one walk. A NumPy array of ranks gives back
+            a NumPy array of keys.
+        """
+        as_array = numpy is not None and isinstance(ranks, numpy.ndarray)
+        ranks = ranks.tolist() if as_array else list(ranks)
+        size = len(self)
+        found = [None] * len(ranks)
+
+        # ranks out of range stay none, the rest are sorted and answered together
+        valid = [i for i, rank in enumerate(ranks) if 0 <= rank < size]
+        order, wanted = self.__sorted_queries([ranks[i] for i in valid])
+        order = [valid[i] for i in order]
+
+        stack = [(self.root, 0, 0, len(wanted))] if wanted else [] # node, keys before it, slice of wanted
+        while stack:
+            node, offset, lo, hi = stack.pop()
+            if hi - lo == 1: # a lone rank finishes with a plain descent
+                rank = wanted[lo] - offset
+                while True:
+                    left_size = node.left_child.size if node.left_child else 0
+                    if left_size > rank:
+                        node = node.left_child
+                    elif left_size == rank:
+                        found[order[lo]] = node.item
+                        break
+                    else:
+                        rank -= left_size + 1
+                        node = node.right_child
+                continue
+            node_rank = offset + (node.left_child.size if node.left_child else 0)
+            first = bisect_left(wanted, node_rank, lo, hi)
+            last = bisect_right(wanted, node_rank, first, hi)
+            for i in range(first, last):
+                found[order[i]] = node.item
+            if lo < first:
+                stack.append((node.left_child, offset, lo, first))
+            if last < hi:
+                stack.append((node.right_child, node_rank + 1, last, hi))
+
+        if as_array:
+            return _key_array(found)
+        return found
+
+    # returns the floor of every key in keys, or none where there is none
+    def floor_many(self, keys):
+        """
+            This method returns the floor of many keys, in the same order, with None
+            where every key of the tree is above. The keys are sorted (unless they
+            already are), and each search picks up where the one before stopped
+            instead of at the root, so keys close together share most of their walk.
+            Keys that are few next to the tree are searched one at a time instead.
+            A NumPy array of keys gives back a NumPy array.
+        """
+        return self.__bound_keys_many(keys, True, True)
+
+    # returns the ceiling of every key in keys, or none where there is none
+    def ceiling_many(self, keys):
+        """
+            This method returns the ceiling of many keys, in the same order, with None
+            where every key of the tree is below, answered together like floor_many.
+        """
+        return self.__bound_keys_many(keys, False, True)
+
+    # returns the lower key of every key in keys, or none where there is none
+    def lower_many(self, keys):
+        """
+            This method returns the next key strictly below each of many keys, in the
+            same order, with None where there is none, answered together like floor_many.
+        """
+        return self.__bound_keys_many(keys, True, False)
+
+    # returns the higher key of every key in keys, or none where there is none
+    def higher_many(self, keys):
+        """
+            This method returns the next key strictly above each of many keys, in the
+            same order, with None where there is none, answered together like floor_many.
+        """
+        return self.__bound_keys_many(keys, False, False)
+
+    # returns the nearest key to every key in keys, or none if tree is empty
+    def nearest_many(self, keys):
+        """
+            This method returns the nearest key to each of many keys, in the same
+            order, the same way nearest does. It finds the floors and the ceilings
+            like floor_many does.
+        """
+        as_array = numpy is not None and isinstance(keys, numpy.ndarray)
+        keys = keys.tolist() if as_array else list(keys)
+        floors = self.__bound_keys_many(keys, True, True)
+        ceilings = self.__bound_keys_many(keys, False, True)
+        found = [self.__closer(key, below, above) for key, below, above in zip(keys, floors, ceilings)]
+        if as_array:
+            return _key_array(found)
+        return found
+
+    # yields k / v pairs with lo <= key <= hi in order, none means unbounded
+    def range(self, lo = None, hi = None, inclusive = (True, True)):
+        """
+            This method lazily yields the key / value pairs whose keys fall between
+            lo and hi, in ascending order. A bound of None leaves that side open.
+            inclusive is a pair of booleans saying whether lo and hi themselves count.
+            Finding the first pair takes O(log n), and each pair after it O(1) on average.
+        """
+        lo_inclusive, hi_inclusive = inclusive
+        if self.__key is not None:
+            lo, hi = self.__derived_bounds(lo, hi)
+        stack = []
+        node = self.root
+        while node: # stack up the path to the first key inside the range
+            if lo is None or node.key > lo or (lo_inclusive and node.key == lo):
+                stack.append(node)
+                node = node.left_child
             else:
-                tree.append(item.left_child)
-                tree.append(item.right_child)
-                if not item.is_black:
-                    num_red -= -1
+                node = node.right_child
+
+        while stack:
+            node = stack.pop()
+            if hi is not None and (node.key > hi or (not hi_inclusive and node.key == hi)):
+                return
+            yield (node.item, node.value)
+            node = node.right_child
+            while node: # smallest key to the right comes next
+                stack.append(node)
+                node = node.left_child
+
+    # returns num of keys with lo <= key <= hi, none means unbounded
+    def count_range(self, lo = None, hi = None, inclusive = (True, True)) -> int:
+        """
+            This method counts the keys that fall between lo and hi in O(log n),
+            using the subtree sizes. Bounds and inclusive work the same as in range.
+        """
+        lo_inclusive, hi_inclusive = inclusive
+        if self.__key is not None:
+            lo, hi = self.__derived_bounds(lo, hi)
+        if hi is None:
+            count = len(self)
+        else:
+            count = self.__count_below(hi, hi_inclusive)
+        if lo is not None:
+            count -= self.__count_below(lo, not lo_inclusive)
+        return max(count, 0)
+
+    # returns the aggregate of the values with lo <= key <= hi, none means unbounded
+    def range_aggregate(self, lo = None, hi = None, inclusive = (True, True)):
+        """
+            This method combines the values whose keys fall between lo and hi with the
+            tree's aggregate, in key order, and returns the aggregate's identity if there
+            are none. Bounds and inclusive work the same as in range. Whole subtrees
+            inside the range answer from their stored aggregate, so it takes O(log n).
+            Raises ValueError if the tree was built without an aggregate.
+        """
+        aggregate = self.__aggregate_or_raise()
+        lo_inclusive, hi_inclusive = inclusive
+        if self.__key is not None:
+            lo, hi = self.__derived_bounds(lo, hi)
+        node = self.root
+        while node is not None: # find the highest node inside the range
+            if lo is not None and (node.key < lo or (node.key == lo and not lo_inclusive)):
+                node = node.right_child
+            elif hi is not None and (hi < node.key or (node.key == hi and not hi_inclusive)):
+                node = node.left_child
+            else:
+                break
+        if node is None:
+            return aggregate.identity
+
+        # everything else in the range hangs below it, the low end on its left
+        # and the high end on its right
+        if lo is None:
+            total = node.left_child.agg if node.left_child else aggregate.identity
+        else:
+            total = self.__aggregate_above(node.left_child, lo, lo_inclusive)
+        total = aggregate.combine(total, aggregate.measure(node.item, node.value))
+        if hi is None:
+            if node.right_child:
+                total = aggregate.combine(total, node.right_child.agg)
+        else:
+            total = aggregate.combine(total, self.__aggregate_below(node.right_child, hi, hi_inclusive))
+        return total
 
-        return num_red
+    # returns the aggregate of the values with keys up to key
+    def prefix_aggregate(self, key, inclusive = True):
+        """
+            This method combines the values of every key below key (and of key
+            itself, if inclusive) with the tree's aggregate, in O(log n). With a sum,
+            this is the running total up to key. Raises ValueError if the tree was
+            built without an aggregate.
+        """
+        self.__aggregate_or_raise()
+        if self.__key is not None:
+            key = self.__key(key)
+        return self.__aggregate_below(self.root, key, inclusive)
+
+    # returns num of red nodes in the tree
+    def count_red_nodes(self)-> int:
+        """
+            This method returns the number of red nodes in the tree. The count is
+            kept up to date on every color change, so this is O(1).
+        """
+        self.__ensure_stats()
+        return self.__red_count
 
     # returns height of tree, where an empty tree has height of 0
     def calc_height(self) -> int:
         """
             This method returns the height of the longest path in the tree.
-            An empty tree returns 0.
+            An empty tree returns 0. This needs a full walk of the tree, but only
+            keeps the current path in memory. height_bounds is O(log n).
         """
-        height = 1
-        max_height = 0
-        tree = []
-        tree.append((self.root, height))
+        return self.stats()["height"]
 
-        for item in tree: # loop through the tree
-            if item[0] == None:
-                continue
-            else:
-                height = item[1]
-                if height > max_height:
-                    max_height = height
-                tree.append((item[0].left_child, height + 1))
-                tree.append((item[0].right_child, height + 1))
-        return max_height
+    # returns lowest and highest possible height, without walking the tree
+    def height_bounds(self) -> tuple:
+        """
+            This method returns a (lowest, highest) pair that the height must fall
+            within, in O(log n). It follows from the black height, since every path
+            holds the same number of black nodes and at most one red node per black one,
+            and from the size, since a binary tree of n nodes is at least log2(n + 1) tall.
+        """
+        black_height = self.calc_black_height()
+        lowest = max(black_height, len(self).bit_length())
+        return (lowest, 2 * black_height)
 
 
     # returns black height of tree, or 0 for empty tree
@@ -359,209 +1169,590 @@ class RedBlackTree:
     # returns av distance of nodes from the root. Empty trees return NaN
     def calc_average_depth(self) -> float:
         """
-            This method calculates and returns the average height of each node 
-            in the tree. Empty trees return NaN.
+            This method calculates and returns the average depth of each node
+            in the tree, where the root has depth 0. Empty trees return NaN.
+            The sum of all depths is kept up to date through every insert, delete
+            and rotation, so this is O(1).
         """
         if self.is_empty():
             return float('nan')
-        tree = []
-        tree.append((self.root, 0))
-        counter = 0
-        total_height = 0
+        self.__ensure_stats()
+        return self.__depth_sum / self.root.size
 
-        for item in tree: # loop through the tree
-            if item[0] == None:
+    # returns every tree statistic from a single walk
+    def stats(self) -> dict:
+        """
+            This method walks the tree once and returns a dict with its size,
+            red_nodes, height, black_height, depth_sum and average_depth. The walk
+            only keeps the current path in memory. It also resyncs the counters used
+            by count_red_nodes and calc_average_depth.
+        """
+        red_nodes = 0
+        depth_sum = 0
+        height = 0
+        stack = [(self.root, 1)] if self.root else []
+        while stack: # depth first, so the stack stays about as tall as the tree
+            node, depth = stack.pop()
+            if not node.is_black:
+                red_nodes -= -1
+            depth_sum -= -(depth - 1)
+            if depth > height:
+                height = depth
+            if node.left_child:
+                stack.append((node.left_child, depth + 1))
+            if node.right_child:
+                stack.append((node.right_child, depth + 1))
+
+        self.__red_count = red_nodes
+        self.__depth_sum = depth_sum
+        self.__stats_valid = True
+        size = len(self)
+        return {
+            "size": size,
+            "red_nodes": red_nodes,
+            "height": height,
+            "black_height": self.calc_black_height(),
+            "depth_sum": depth_sum,
+            "average_depth": depth_sum / size if size else float('nan'),
+        }
+
+    # returns true if the tree follows every left leaning red-black rule
+    def is_valid(self) -> bool:
+        """
+            This method checks the whole tree and returns whether the keys are in
+            order, every size field is right, the root is black, no red link leans right
+            or follows another red link, and every path holds the same number of black
+            nodes. Meant for testing, it takes O(n).
+        """
+        if self.root is None:
+            return True
+        if not self.root.is_black:
+            return False
+
+        previous = _MISSING
+        for node in self.__in_order_nodes():
+            if previous is not _MISSING and not previous < node.key:
+                return False
+            previous = node.key
+            left = node.left_child
+            right = node.right_child
+            if right is not None and not right.is_black: # red links lean left only
+                return False
+            if not node.is_black and left is not None and not left.is_black: # no two reds in a row
+                return False
+            if node.size != 1 + (left.size if left else 0) + (right.size if right else 0):
+                return False
+
+        # every path down to an empty spot has to cross the same number of black nodes
+        black_height = self.calc_black_height()
+        stack = [(self.root, 0)]
+        while stack:
+            node, blacks = stack.pop()
+            if node is None:
+                if blacks != black_height:
+                    return False
                 continue
-            else:
-                counter = item[1]
-                total_height -= -counter
-                tree.append((item[0].left_child, counter+1))
-                tree.append((item[0].right_child, counter+1))
-                
-        return total_height / (self.root.size -1)
-        
-        
+            blacks -= -node.is_black
+            stack.append((node.left_child, blacks))
+            stack.append((node.right_child, blacks))
+        return True
+
+    # moves every key from key upward into a new tree, which is returned
+    def split(self, key) -> "RedBlackTree":
+        """
+            This method splits the tree at key. This tree keeps the keys below key,
+            and a new tree holding key and everything above it is returned. Whole
+            subtrees change hands, so this takes O(log n). With index_values set, the
+            index entries of the moved keys are moved too, which takes time in
+            proportion to how many moved. The new tree has the same options as this one.
+        """
+        if self.__key is not None:
+            key = self.__key(key)
+        left, _, found, right, right_height = self.__split(self.root, self.calc_black_height(), key)
+        if found is not None: # key goes with the upper half
+            right, _ = self.__join(None, 0, found, right, right_height)
+        if self.__value_index is not None:
+            self.__forget_subtree(right)
+        upper = self.__spawn()
+        upper.__set_root(right)
+        self.__set_root(left, False)
+        return upper
+
+    # joins two trees around a middle key into one new tree
+    @classmethod
+    def join(cls, left, key, value, right) -> "RedBlackTree":
+        """
+            This method takes a tree whose keys are all below key, a key / value pair,
+            and a tree whose keys are all above key, and joins them into one new tree
+            in O(log n), by hanging the shorter tree into the taller one at the level
+            where their black heights match. The nodes move into the new tree, so left
+            and right are left empty. The new tree has the same options as left.
+            Raises ValueError if the keys are not in that order. With a key function,
+            the trees are expected to share it.
+        """
+        item = key
+        if left.__key is not None:
+            key = left.__key(key)
+        if not left.is_empty() and not left.__edge_node(True).key < key:
+            raise ValueError(f"every key of left must be below {item!r}")
+        if not right.is_empty() and not key < right.__edge_node(False).key:
+            raise ValueError(f"every key of right must be above {item!r}")
+        tree = left.__spawn()
+        middle = tree.__node(key, value)
+        if tree.__key is not None:
+            middle.item = item
+        if tree.__aggregate is not None: # rotations in __join read it
+            tree.__fix_aggregate(middle)
+        root, _ = tree.__join(left.root, left.calc_black_height(), middle,
+                              right.root, right.calc_black_height())
+        left.__set_root(None)
+        right.__set_root(None)
+        tree.__set_root(root)
+        return tree
+
+    # adds every pair of other to this tree
+    def union(self, other):
+        """
+            This method adds every key / value pair of other to this tree, with the
+            values of other winning on keys that are in both. other is not changed.
+            It goes through put_many, so a small other costs one put per pair and a
+            large one a single linear merge.
+        """
+        if other is not self:
+            self.put_many(other.items())
+
+    # keeps only the keys that are also in other
+    def intersection(self, other):
+        """
+            This method removes every key that is not also in other, keeping this
+            tree's values. other is not changed. Each key of the smaller tree is looked
+            up in the larger one, and the keys found are rebuilt into a balanced tree,
+            so it takes O(m log n) for trees of m and n keys, m <= n.
+        """
+        if other is self:
+            return
+        kept = []
+        if len(self) <= len(other):
+            for node in self.__in_order_nodes():
+                if other.contains_key(node.item):
+                    kept.append(self.__entry(node))
+        else:
+            for key in other.keys():
+                node = self.__find_node(key if self.__key is None else self.__key(key))
+                if node is not None:
+                    kept.append(self.__entry(node))
+        self.__set_root(self.__build_balanced(kept))
+
+    # removes every key that is in other
+    def difference(self, other):
+        """
+            This method removes every key that is in other. other is not changed. A
+            small other costs one delete per key, like put_many's small batches.
+            Otherwise every key of this tree is looked up in other once and the rest
+            are rebuilt into a balanced tree.
+        """
+        if other is self:
+            self.__set_root(None)
+        elif len(other) * 2 * self.MERGE_RATIO < len(self): # a delete costs about two puts
+            for key in other.keys():
+                self.delete(key)
+        else:
+            kept = [self.__entry(node) for node in self.__in_order_nodes() if not other.contains_key(node.item)]
+            self.__set_root(self.__build_balanced(kept))
+
+    # writes every k / v pair to a binary snapshot file
+    def dump(self, path):
+        """
+            This method writes the tree to a compact binary snapshot at path. Pairs
+            are stored in key order in blocks, followed by a table of where each
+            block starts. load reads it back in linear time, two unpickles per block,
+            and MappedRedBlackTree (in mappedtree.py) can answer queries straight
+            from the file. Keys and values are stored with pickle, so they must be
+            picklable.
+        """
+        write_snapshot(path, ((node.item, node.value) for node in self.__in_order_nodes()))
+
+    # builds a new tree from a snapshot file written by dump
+    @classmethod
+    def load(cls, path, **options):
+        """
+            This method reads a snapshot written by dump and builds a balanced tree
+            from it in linear time, since the pairs are already in key order. Any
+            keyword options are passed on to the constructor. Raises ValueError if the
+            file is not a snapshot. With a key function, the pairs are sorted again
+            if its order differs from the one they were written in. The pairs are
+            unpickled, and unpickling a crafted file can run any code, so only load
+            snapshots you wrote yourself.
+        """
+        with open(path, "rb") as source:
+            data = source.read()
+        count, table, block_size = read_snapshot_header(data)
+
+        batch = []
+        position = SNAPSHOT_HEADER.size
+        view = memoryview(data)
+        with _gc_paused(): # only fresh pairs are made here, nothing for the collector
+            while len(batch) < count:
+                length = SNAPSHOT_LENGTH.unpack_from(data, position)[0]
+                position -= -(SNAPSHOT_LENGTH.size + length) # the first key is only for searches
+                length = SNAPSHOT_LENGTH.unpack_from(data, position)[0]
+                position -= -SNAPSHOT_LENGTH.size
+                keys = pickle.loads(view[position:position + length])
+                position -= -length
+                length = SNAPSHOT_LENGTH.unpack_from(data, position)[0]
+                position -= -SNAPSHOT_LENGTH.size
+                values = pickle.loads(view[position:position + length])
+                position -= -length
+                batch.extend(zip(keys, values))
+
+        tree = cls(**options)
+        if tree.__key is not None:
+            batch = tree.__sorted_batch(batch)
+        tree.__set_root(tree.__build_balanced(batch))
+        return tree
 
     # performs a color flip on input node and its children
     def __color_flip(self, parent)-> Node:
-        parent.left_child.is_black  = parent.is_black
-        parent.right_child.is_black  = parent.is_black
+        # of the three nodes, the black ones turn red and the red ones turn black
+        turned_red = parent.is_black + parent.left_child.is_black + parent.right_child.is_black
+        self.__red_count += 2 * turned_red - 3
+        if self.metrics is not None:
+            self.metrics.color_flips -= -1
+        parent.left_child.is_black  = not parent.left_child.is_black
+        parent.right_child.is_black  = not parent.right_child.is_black
         parent.is_black = not parent.is_black
         return parent
 
-    # performs a left rotation on input node
+    # performs a left rotation on input node, returns the node that replaces it
     def __left_rotate(self, parent)-> Node:
-        t_key = parent.key
-        t_val = parent.value
         temp = parent.right_child
 
-        # parent and temp swap keys and values
-        parent.key = temp.key
-        parent.value = temp.value
-        temp.key = t_key
-        temp.value = t_val
-
-        # rearrange children
-        parent.right_child = temp.right_child
-        temp.right_child = temp.left_child
-        temp.left_child = parent.left_child
-        parent.left_child = temp
+        # relink instead of moving keys and values, so every node keeps its pair
+        parent.right_child = temp.left_child
+        temp.left_child = parent
 
-        # adjust the size of each node
-        self.__fix_size(temp)
+        # temp takes over the color and size of the subtree top
+        if temp.is_black:
+            self.__red_count -= -1
+        temp.is_black = parent.is_black
+        parent.is_black = False
+        temp.size = parent.size
         self.__fix_size(parent)
-        return parent
 
-    
-    # performs a right rotation on input node
+        # parent's old left subtree sinks a level, temp's right subtree rises one
+        self.__depth_sum += (parent.left_child.size if parent.left_child else 0) - (temp.right_child.size if temp.right_child else 0)
+        if self.__aggregate is not None: # only the subtrees of the two nodes moved changed
+            self.__fix_aggregate(parent)
+            self.__fix_aggregate(temp)
+        if self.metrics is not None:
+            self.metrics.left_rotations -= -1
+        return temp
+
+    # performs a right rotation on input node, returns the node that replaces it
     def __right_rotate(self, parent: Node)-> Node:
-        t_key = parent.key
-        t_val = parent.value
         temp = parent.left_child
 
-        # parent and temp swap keys and values
-        parent.key = temp.key
-        parent.value = temp.value
-        temp.key = t_key
-        temp.value = t_val
-
-        # rearrange children
-        parent.left_child = temp.left_child
-        temp.left_child = temp.right_child
-        temp.right_child = parent.right_child
-        parent.right_child = temp
+        # relink instead of moving keys and values, so every node keeps its pair
+        parent.left_child = temp.right_child
+        temp.right_child = parent
 
-        # adjust the size of each node
-        self.__fix_size(temp)
+        # temp takes over the color and size of the subtree top
+        if temp.is_black:
+            self.__red_count -= -1
+        temp.is_black = parent.is_black
+        parent.is_black = False
+        temp.size = parent.size
         self.__fix_size(parent)
-        return parent
-        
 
-    def __find_and_delete(self, root, key) -> Node:
-
-        # if node is a leaf
-        if not root.left_child and not root.right_child:
-            if root.key == key: # if node matches, delete
-                return None
+        # parent's old right subtree sinks a level, temp's left subtree rises one
+        self.__depth_sum += (parent.right_child.size if parent.right_child else 0) - (temp.left_child.size if temp.left_child else 0)
+        if self.__aggregate is not None: # only the subtrees of the two nodes moved changed
+            self.__fix_aggregate(parent)
+            self.__fix_aggregate(temp)
+        if self.metrics is not None:
+            self.metrics.right_rotations -= -1
+        return temp
+
+    # returns true if the node exists and is red
+    def __is_red(self, node) -> bool:
+        return node is not None and not node.is_black
+
+    # returns the node holding the key, or none if key DNE
+    def __find_node(self, key) -> Node:
+        node = self.root
+        while node:
+            if node.key == key:
+                return node
+            elif node.key > key:
+                node = node.left_child
             else:
-                return root # otherwise, do nothing
-            
-        elif not root.right_child and root.left_child: # if left only
-            if root.key == key: # if match, promote left child
-                return root.left_child
-            else: # note: this child HAS to be red, so no changes are needed
-                root.left_child = self.__find_and_delete(root.left_child, key) # otherwise, recurse
-
-        elif root.left_child and root.right_child: # if left and right child
-
-            # should only come up on rotation situations where right
-            # child needed to be red in order to step into it
-            if root.left_child.is_black and not root.right_child.is_black:
-                if root.key < key:
-                    root.right_child = self.__find_and_delete(root.right_child, key)
-                elif root.key == key:
-                    root = self.__swap_with_pred(root)
-                else: # this shouldnt happen? but just in case...
-                    root = self.__left_rotate(root)
-                    root.left_child = self.__find_and_delete(root.left_child, key)
-
-            elif root.left_child.is_black: # if both children are black   
-                root = self.__color_flip(root) # make children red
-                if root.key > key:
-                    root.left_child = self.__find_and_delete(root.left_child, key)
-                elif root.key < key:
-                    root.right_child = self.__find_and_delete(root.right_child, key)
-                else: # current node needs to be deleted
-                    root = self.__swap_with_pred(root) # this is now its pred
-
-            elif not root.left_child.is_black: # if left is red
-                if root.key > key: # no changes needed
-                    root.left_child = self.__find_and_delete(root.left_child, key)
-                elif root.key < key:
-                    root = self.__right_rotate(root) # changes root to the l child
-                    # this will basically call it on the same node, but in a different position
-                    root.right_child = self.__find_and_delete(root.right_child, key)
-                else: # found the key we need
-                    root = self.__swap_with_pred(root)
-
-        # on the way back up...
-
-        # if left DNE but right exists
-        if not root.left_child and root.right_child:
-            root = self.__left_rotate(root)
-
-        # if r and l children are both red
-        if root.is_black and root.left_child and not root.left_child.is_black and root.right_child and not root.right_child.is_black:
-            root = self.__color_flip(root)
-
-        # if right child is red and root is black
-        if root.left_child and root.left_child.is_black and root.right_child and not root.right_child.is_black:
-            root = self.__left_rotate(root)
+                node = node.right_child
+        return None
 
-        # if r child is red and its r child is red
-        if root.right_child and not root.right_child.is_black and root.right_child.right_child and not root.right_child.right_child.is_black:
-            root = self.__left_rotate(root)
+    # returns the node with the largest key, or the smallest if last is false
+    def __edge_node(self, last) -> Node:
+        node = self.root
+        while node is not None:
+            child = node.right_child if last else node.left_child
+            if child is None:
+                return node
+            node = child
+        return None
 
-        # if l child is red and its r child is red
-        if root.left_child and not root.left_child.is_black and root.left_child.right_child and not root.left_child.right_child.is_black:
-            root.left_child = self.__left_rotate(root.left_child)
+    # returns the comparison keys of range bounds, leaving none as none
+    def __derived_bounds(self, lo, hi) -> tuple:
+        return (None if lo is None else self.__key(lo), None if hi is None else self.__key(hi))
 
-        # if l child is red and its l child is red
-        if root.left_child and not root.left_child.is_black and root.left_child.left_child and not root.left_child.left_child.is_black: 
-                root = self.__right_rotate(root)
+    # returns a node's pair in the form __build_balanced takes
+    def __entry(self, node) -> tuple:
+        if self.__key is None:
+            return (node.key, node.value)
+        return (node.key, node.value, node.item)
 
-        # if both children are red again due to rotation
-        if root.is_black and root.left_child and not root.left_child.is_black and root.right_child and not root.right_child.is_black:
-            root = self.__color_flip(root)
+    # returns value of key with no cache in front, or none if key DNE
+    def __value_of(self, key):
+        node = self.root
+        while node is not None: # walk down without building a list of the path
+            if node.key == key:
+                return node.value
+            elif node.key > key:
+                node = node.left_child
+            else:
+                node = node.right_child
+        return None
 
-        self.__fix_size(root)
-        return root
+    # returns predecessor of key with no cache in front. once the key is found, the
+    # walk goes on into its left subtree, so the predecessor is found in the same descent
+    def __predecessor_of(self, key):
+        node = self.root
+        found = False
+        best = None # the last node travelled right from
+        while node is not None:
+            if node.key < key:
+                best = node
+                node = node.right_child
+            elif key < node.key:
+                node = node.left_child
+            else:
+                found = True
+                node = node.left_child
+        if found and best is not None:
+            return best.item
+        return None
 
+    # returns successor of key with no cache in front, in one descent like __predecessor_of
+    def __successor_of(self, key):
+        node = self.root
+        found = False
+        best = None # the last node travelled left from
+        while node is not None:
+            if key < node.key:
+                best = node
+                node = node.left_child
+            elif node.key < key:
+                node = node.right_child
+            else:
+                found = True
+                node = node.right_child
+        if found and best is not None:
+            return best.item
+        return None
 
-    def __swap_with_pred(self, root) -> Node:
-        # replace key with pred key
-        # get val associated with key
-        # call delete on pred
-        pred_key = self.find_predecessor(root.key)
-        pred_value = self.get(pred_key)
+    # returns the node with the largest key below key, or with the smallest above it
+    # if below is false, counting key itself if inclusive. the walk starts at node,
+    # with best as the answer found so far
+    def __bound_node(self, node, key, below, inclusive, best = None) -> Node:
+        while node is not None:
+            if key < node.key:
+                if not below:
+                    best = node
+                node = node.left_child
+            elif node.key < key:
+                if below:
+                    best = node
+                node = node.right_child
+            elif inclusive:
+                return node
+            elif below:
+                node = node.left_child
+            else:
+                node = node.right_child
+        return best
+
+    # answers __bound_node for many keys, giving back keys (or none). unless they are
+    # few next to the tree, the keys are taken in ascending order, and each search resumes where the last one left off
+    # instead of at the root. it backs up only past the nodes where the last search
+    # turned left that are not above the key, so keys close together share most of
+    # their walk
+    def __bound_keys_many(self, keys, below, inclusive):
+        as_array = numpy is not None and isinstance(keys, numpy.ndarray)
+        keys = keys.tolist() if as_array else list(keys)
+        if self.__key is not None:
+            keys = [self.__key(key) for key in keys]
+        found = [None] * len(keys)
+        if len(keys) * self.SHARED_WALK_RATIO < len(self): # too far apart to share much of a walk
+            for i, key in enumerate(keys):
+                node = self.__bound_node(self.root, key, below, inclusive)
+                if node is not None:
+                    found[i] = node.item
+            return _key_array(found) if as_array else found
+        order, wanted = self.__sorted_queries(keys)
+
+        # resuming at a node the key is not below, the search goes right of it or stops
+        # there. a floor or lower takes the node as its best then, and a ceiling or
+        # higher keeps the best it had on reaching the node, which is the turn above it
+        turns = [] # every node the last search turned left at, root first
+        turn_left = turns.append
+        node = self.root # where the last search stopped, with the best on reaching it
+        best = None
+        left_on_tie = below and not inclusive
+        for i, key in enumerate(wanted):
+            if node is None: # empty tree
+                break
+            if turns and not (key < turns[-1].key or (left_on_tie and key == turns[-1].key)):
+                node = turns.pop()
+                while turns and not (key < turns[-1].key or (left_on_tie and key == turns[-1].key)):
+                    node = turns.pop()
+                if not below:
+                    best = turns[-1] if turns else None
+            while True:
+                if key < node.key or (left_on_tie and key == node.key):
+                    child = node.left_child
+                    if child is None:
+                        answer = best if below else node
+                        break
+                    turn_left(node)
+                    if not below:
+                        best = node
+                    node = child
+                elif node.key < key or not inclusive:
+                    child = node.right_child
+                    if child is None:
+                        answer = node if below else best
+                        break
+                    if below:
+                        best = node
+                    node = child
+                else: # the key itself
+                    answer = node
+                    break
+            if answer is not None:
+                found[order[i]] = answer.item
+
+        if as_array:
+            return _key_array(found)
+        return found
+
+    # returns whichever of below and above is closer to key, the lower one on a tie.
+    # under a key function, below can be the larger, hence the abs
+    def __closer(self, key, below, above):
+        if below is None:
+            return above
+        if above is None or abs(key - below) <= abs(above - key):
+            return below
+        return above
+
+    # makes the left child or one of its children red, before deleting below it
+    def __move_red_left(self, parent) -> Node:
+        self.__color_flip(parent)
+        if self.__is_red(parent.right_child.left_child): # borrow from the right sibling
+            parent.right_child = self.__right_rotate(parent.right_child)
+            parent = self.__left_rotate(parent)
+            self.__color_flip(parent)
+        return parent
 
-        root.key = pred_key
-        root.value = pred_value
+    # makes the right child or one of its children red, before deleting below it
+    def __move_red_right(self, parent) -> Node:
+        self.__color_flip(parent)
+        if self.__is_red(parent.left_child.left_child): # borrow from the left sibling
+            parent = self.__right_rotate(parent)
+            self.__color_flip(parent)
+        return parent
 
-        root.left_child = self.__find_and_delete(root.left_child, pred_key) # delete pred to promote it
-        
+    # restores the left leaning rules at a node after a delete passed through it.
+    # sizes on the path are still from before the delete, so they only shrink
+    def __balance(self, root, shrink) -> Node:
+        root.size -= shrink
+        left = root.left_child
+        right = root.right_child
+        if right is not None and not right.is_black and (left is None or left.is_black):
+            root = self.__left_rotate(root)
+        left = root.left_child
+        if left is not None and not left.is_black and left.left_child is not None and not left.left_child.is_black:
+            root = self.__right_rotate(root)
+        left = root.left_child
+        right = root.right_child
+        if left is not None and not left.is_black and right is not None and not right.is_black:
+            self.__color_flip(root)
         return root
 
-
-    # adding to tree function, recursive, returns Node
-    def __find_and_add(self, root, key, value) -> Node:
-        # finding / modifying / adding Node with key
-        
-        if root == None:
-            return Node(key, value, 1)
-        if root.key == key:
-            root.value = value
-            return root
-        elif root.key < key:
-            root.right_child = self.__find_and_add(root.right_child, key, value)
+    # links new in where old hung below the last node on the path, returns new
+    def __swap_in(self, path, old, new) -> Node:
+        if new is not old:
+            self.__relink(path[-1] if path else None, old, new)
+        return new
+
+    # points parent (or the root, if parent is none) at new where it pointed at old
+    def __relink(self, parent, old, new):
+        if parent is None:
+            self.root = new
+        elif parent.left_child is old:
+            parent.left_child = new
         else:
-            root.left_child = self.__find_and_add(root.left_child, key, value)
-
-
-        # fixing the tree now that its all messed up
-        if root.right_child and not root.right_child.is_black:
-            self.__left_rotate(root)
-
-        if root.left_child and root.left_child.left_child and not root.left_child.is_black and not root.left_child.left_child.is_black:
-            self.__right_rotate(root)
-
-
-        if root.left_child and root.right_child and not root.left_child.is_black and not root.right_child.is_black:
-            self.__color_flip(root)
-
-        self.__fix_size(root)
-
-        return root
+            parent.right_child = new
+
+    # recalculates every aggregate below root, children before their parents
+    def __fix_aggregates(self, root):
+        order = []
+        stack = [root] if root is not None else []
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            if node.left_child is not None:
+                stack.append(node.left_child)
+            if node.right_child is not None:
+                stack.append(node.right_child)
+        for node in reversed(order):
+            self.__fix_aggregate(node)
+
+    # returns the aggregate, or raises if the tree has none
+    def __aggregate_or_raise(self) -> Aggregate:
+        if self.__aggregate is None:
+            raise ValueError("this tree was built without an aggregate")
+        return self.__aggregate
+
+    # combines the values of a subtree with keys above lo (or equal, if inclusive).
+    # every node the walk turns left at is in, along with its right subtree
+    def __aggregate_above(self, node, lo, inclusive):
+        aggregate = self.__aggregate
+        taken = []
+        while node is not None:
+            if lo < node.key or (inclusive and node.key == lo):
+                taken.append(node)
+                node = node.left_child
+            else:
+                node = node.right_child
+        total = aggregate.identity
+        for node in reversed(taken): # the deepest holds the smallest keys
+            total = aggregate.combine(total, aggregate.measure(node.item, node.value))
+            if node.right_child is not None:
+                total = aggregate.combine(total, node.right_child.agg)
+        return total
+
+    # combines the values of a subtree with keys below hi (or equal, if inclusive).
+    # every node the walk turns right at is in, along with its left subtree
+    def __aggregate_below(self, node, hi, inclusive):
+        aggregate = self.__aggregate
+        total = aggregate.identity
+        while node is not None:
+            if node.key < hi or (inclusive and node.key == hi):
+                if node.left_child is not None:
+                    total = aggregate.combine(total, node.left_child.agg)
+                total = aggregate.combine(total, aggregate.measure(node.item, node.value))
+                node = node.right_child
+            else:
+                node = node.left_child
+        return total
 
     # quick method for recalculating size field
     def __fix_size(self, root):
@@ -572,6 +1763,423 @@ class RedBlackTree:
             root.size -= -root.right_child.size
 
 
+    # puts a new root in place, refreshing anything that was derived from the old one.
+    # callers that kept the value index up to date themselves pass reindex as false
+    def __set_root(self, root, reindex = True):
+        self.root = root
+        self.__stats_valid = False
+        if self.__value_cache is not None:
+            self.__value_cache.clear()
+            self.__predecessor_cache.clear()
+            self.__successor_cache.clear()
+        if reindex and self.__value_index is not None:
+            self.__value_index = {}
+            for node in self.__in_order_nodes():
+                self.__index_add(node.item, node.value)
+        if self.__aggregate is not None:
+            self.__fix_aggregates(root)
+
+    # returns a new empty tree with the same options as this one
+    def __spawn(self) -> "RedBlackTree":
+        return type(self)(index_values=self.__value_index is not None, cache_size=self.__cache_size,
+                          metrics=self.metrics, aggregate=self.__aggregate, key=self.__key)
+
+    # split and join below work on detached subtrees and pass their black heights
+    # along, where a black height counts the black nodes on any path down from the
+    # subtree top. every subtree they hand back is a valid tree with a black top
+
+    # hangs middle between two subtrees whose keys are below and above it, returns
+    # the joined subtree and its black height
+    def __join(self, left, left_height, middle, right, right_height) -> tuple:
+        if left_height == right_height:
+            middle.left_child = left
+            middle.right_child = right
+            middle.is_black = True
+            self.__fix_size(middle)
+            return (middle, left_height + 1)
+
+        # walk down the taller side to a black node as tall as the shorter side,
+        # and put middle there as a red node over both of them
+        path = []
+        middle.is_black = False
+        if left_height > right_height:
+            extra = 1 + (right.size if right else 0)
+            node = left
+            height = left_height
+            while height > right_height: # right links are never red, so every step is black
+                node.size += extra
+                path.append(node)
+                height -= node.is_black
+                node = node.right_child
+            middle.left_child = node
+            middle.right_child = right
+            self.__fix_size(middle)
+            path[-1].right_child = middle
+        else:
+            extra = 1 + (left.size if left else 0)
+            node = right
+            height = right_height
+            while node is not None and not (node.is_black and height == left_height):
+                node.size += extra
+                path.append(node)
+                height -= node.is_black
+                node = node.left_child
+            middle.left_child = left
+            middle.right_child = node
+            self.__fix_size(middle)
+            path[-1].left_child = middle
+
+        # the red node fits in like a fresh insert, so fix the path the same way. once
+        # a black node needs no fixing, nothing above it does either
+        top = path[0]
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            was_black = node.is_black
+            fixed = self.__balance(node, 0)
+            if fixed is node and was_black and node.is_black:
+                break
+            if i:
+                if fixed is not node:
+                    self.__relink(path[i - 1], node, fixed)
+            else:
+                top = fixed
+        height = max(left_height, right_height)
+        if not top.is_black:
+            top.is_black = True
+            height -= -1
+        return (top, height)
+
+    # splits a subtree around key. returns the part below key and its black height,
+    # the node holding key (or none), and the part above key and its black height
+    def __split(self, root, height, key) -> tuple:
+        if root is None:
+            return (None, 0, None, None, 0)
+        left, left_height, right, right_height = self.__detach_children(root, height)
+        if key == root.key:
+            return (left, left_height, root, right, right_height)
+        if key < root.key:
+            below, below_height, found, above, above_height = self.__split(left, left_height, key)
+            above, above_height = self.__join(above, above_height, root, right, right_height)
+        else:
+            below, below_height, found, above, above_height = self.__split(right, right_height, key)
+            below, below_height = self.__join(left, left_height, root, below, below_height)
+        return (below, below_height, found, above, above_height)
+
+    # returns both children of a node as standalone subtrees with their black heights.
+    # a red child turns black, which makes it one taller
+    def __detach_children(self, root, height) -> tuple:
+        child_height = height - root.is_black
+        left = root.left_child
+        right = root.right_child
+        left_height = child_height
+        right_height = child_height
+        if left is not None and not left.is_black:
+            left.is_black = True
+            left_height -= -1
+        if right is not None and not right.is_black:
+            right.is_black = True
+            right_height -= -1
+        return (left, left_height, right, right_height)
+
+    # takes every pair of a subtree out of the value index
+    def __forget_subtree(self, root):
+        stack = [root] if root is not None else []
+        while stack:
+            node = stack.pop()
+            self.__index_remove(node.item, node.value)
+            if node.left_child is not None:
+                stack.append(node.left_child)
+            if node.right_child is not None:
+                stack.append(node.right_child)
+
+    # takes a node that is about to be cut off out of the running statistics
+    def __forget_node(self, node, depth):
+        if not node.is_black:
+            self.__red_count -= 1
+        self.__depth_sum -= depth
+
+    # recounts the statistics if something replaced the tree wholesale
+    def __ensure_stats(self):
+        if not self.__stats_valid:
+            self.stats()
+
+    # records that key maps to value in the value index. a value held by one key
+    # maps straight to that key, and only shared values get a set of keys
+    def __index_add(self, key, value):
+        try:
+            keys = self.__value_index.get(value, _MISSING)
+        except TypeError: # unhashable values are not indexed
+            return
+        if keys is _MISSING:
+            self.__value_index[value] = key
+        elif type(keys) is _KeySet:
+            keys[key] = None
+        elif keys != key:
+            self.__value_index[value] = _KeySet(((keys, None), (key, None)))
+
+    # forgets that key maps to value in the value index
+    def __index_remove(self, key, value):
+        try:
+            keys = self.__value_index.get(value, _MISSING)
+        except TypeError:
+            return
+        if type(keys) is _KeySet:
+            keys.pop(key, None)
+            if len(keys) == 1: # back to a single key
+                self.__value_index[value] = next(iter(keys))
+        elif keys is not _MISSING and keys == key:
+            del self.__value_index[value]
+
+    # returns the indexed keys for a value, or none if the index can't answer
+    def __indexed_keys(self, value):
+        if self.__value_index is None:
+            return None
+        try:
+            keys = self.__value_index.get(value, _MISSING)
+        except TypeError: # unhashable, fall back to a scan
+            return None
+        if keys is _MISSING:
+            return ()
+        if type(keys) is _KeySet:
+            return keys
+        return (keys,)
+
+    # recalculates the aggregate of a node from its pair and its children. this runs
+    # on every node a write passes, so the usual measure is skipped
+    def __fix_aggregate(self, node):
+        aggregate = self.__aggregate
+        if aggregate.measure is _value_only:
+            total = node.value
+        else:
+            total = aggregate.measure(node.item, node.value)
+        left = node.left_child
+        if left is not None:
+            total = aggregate.combine(left.agg, total)
+        right = node.right_child
+        if right is not None:
+            total = aggregate.combine(total, right.agg)
+        node.agg = total
+
+    # times a put or delete (method) and records it with the nodes it walked past,
+    # which the method leaves in __visited. __timing stops the method from timing
+    # itself again when it is called back through here
+    def __timed(self, operation, method, *args):
+        self.__timing = True
+        self.__visited = 0
+        start = perf_counter()
+        try:
+            result = method(*args)
+        finally:
+            self.__timing = False
+        self.metrics.record(operation, perf_counter() - start, self.__visited)
+        return result
+
+    # get for a tree with metrics: a cache hit walks past no nodes, a miss counts
+    # them on its way down
+    def __timed_get(self, key):
+        start = perf_counter()
+        self.__visited = 0
+        if self.__key is not None:
+            key = self.__key(key)
+        if self.__value_cache is not None:
+            value = self.__cached(self.__value_cache, key, self.__counted_value_of)
+        else:
+            value = self.__counted_value_of(key)
+        self.metrics.record("get", perf_counter() - start, self.__visited)
+        return value
+
+    # returns value of key like __value_of, leaving the nodes walked past in __visited
+    def __counted_value_of(self, key):
+        visited = 0
+        node = self.root
+        while node is not None:
+            visited -= -1
+            if node.key == key:
+                break
+            elif node.key > key:
+                node = node.left_child
+            else:
+                node = node.right_child
+        self.__visited = visited
+        return node.value if node is not None else None
+
+    # answers a lookup from cache, or computes it and remembers it as most recent.
+    # readers sharing a tree may race on the cache, so a key that vanishes between
+    # two steps just counts as a miss
+    def __cached(self, cache, key, compute):
+        try:
+            answer = cache.get(key, _MISSING)
+        except TypeError: # unhashable keys are never cached
+            return compute(key)
+        if answer is not _MISSING:
+            self.__cache_hits -= -1
+            try:
+                cache.move_to_end(key)
+            except KeyError:
+                pass
+            return answer
+        self.__cache_misses -= -1
+        answer = compute(key)
+        cache[key] = answer
+        if len(cache) > self.__cache_size:
+            try:
+                cache.popitem(last=False) # least recently used
+            except KeyError:
+                pass
+        return answer
+
+    # forgets every cached answer that inserting or removing key changed: the key's
+    # own answers, the successor of the key just below it, and the predecessor of
+    # the key just above it
+    def __cache_forget(self, key):
+        try:
+            self.__value_cache.pop(key, None)
+            self.__predecessor_cache.pop(key, None)
+            self.__successor_cache.pop(key, None)
+        except TypeError:
+            return
+        below = _MISSING
+        above = _MISSING
+        node = self.root
+        while node is not None: # one walk finds both neighbours
+            if node.key < key:
+                below = node.key
+                node = node.right_child
+            elif node.key > key:
+                above = node.key
+                node = node.left_child
+            else: # the key itself, its neighbours are the extremes of its subtrees
+                if node.left_child is not None:
+                    child = node.left_child
+                    while child.right_child is not None:
+                        child = child.right_child
+                    below = child.key
+                if node.right_child is not None:
+                    child = node.right_child
+                    while child.left_child is not None:
+                        child = child.left_child
+                    above = child.key
+                break
+        if below is not _MISSING:
+            self.__successor_cache.pop(below, None)
+        if above is not _MISSING:
+            self.__predecessor_cache.pop(above, None)
+
+    # sorts query values for a batched walk. returns the positions of the queries in
+    # sorted order, and the sorted values. queries already in order are not sorted
+    def __sorted_queries(self, queries) -> tuple:
+        for i in range(1, len(queries)):
+            if queries[i] < queries[i - 1]:
+                order = sorted(range(len(queries)), key=queries.__getitem__)
+                return order, [queries[i] for i in order]
+        return range(len(queries)), queries
+
+    # yields every node in key order (or reverse order), using a stack instead of recursion
+    def __in_order_nodes(self, reverse = False):
+        stack = []
+        node = self.root
+        while stack or node:
+            while node: # walk down to the smallest (or largest) unvisited key
+                stack.append(node)
+                node = node.right_child if reverse else node.left_child
+            node = stack.pop()
+            yield node
+            node = node.left_child if reverse else node.right_child
+
+    # returns num of keys below the given key, counting the key itself if inclusive
+    def __count_below(self, key, inclusive = False) -> int:
+        count = 0
+        node = self.root
+        while node:
+            if node.key < key or (inclusive and node.key == key):
+                count -= -1
+                if node.left_child:
+                    count -= -node.left_child.size
+                node = node.right_child
+            else:
+                node = node.left_child
+        return count
+
+    # turns a mapping or iterable of k / v pairs into a list sorted by key with
+    # no repeated keys, where the last pair for a key wins. with a key function, the
+    # list holds (comparison key, value, key) instead
+    def __sorted_batch(self, items) -> list:
+        if hasattr(items, "items"): # mappings hand over their pairs
+            items = items.items()
+        if self.__key is None:
+            batch = [(key, value) for key, value in items]
+        else: # the comparison key goes first, with the caller's key kept last
+            derive = self.__key
+            batch = [(derive(key), value, key) for key, value in items]
+
+        in_order = True
+        strictly = True
+        for i in range(1, len(batch)):
+            if batch[i][0] < batch[i - 1][0]:
+                in_order = False
+                break
+            if not batch[i - 1][0] < batch[i][0]:
+                strictly = False
+        if strictly and in_order: # nothing to sort or merge
+            return batch
+        if not in_order:
+            batch.sort(key=itemgetter(0)) # stable, so later pairs stay later
+
+        deduped = []
+        for pair in batch:
+            if deduped and deduped[-1][0] == pair[0]:
+                deduped[-1] = pair
+            else:
+                deduped.append(pair)
+        return deduped
+
+    # builds a valid tree out of a sorted list of k / v pairs (or the triples of
+    # __sorted_batch) in linear time
+    def __build_balanced(self, batch) -> Node:
+        # the tallest black height that can hold this many keys keeps the tree shallow
+        height = (len(batch) + 1).bit_length() - 1
+        with _gc_paused():
+            root = self.__build(batch, 0, len(batch), height)
+        if self.__key is not None: # hand every node its caller's key, in key order
+            stack = []
+            node = root
+            i = 0
+            while stack or node:
+                while node:
+                    stack.append(node)
+                    node = node.left_child
+                node = stack.pop()
+                node.item = batch[i][2]
+                i -= -1
+                node = node.right_child
+        return root
+
+    # builds the subtree for batch[lo:hi] as a 2-3 tree of the given black height.
+    # the slice always holds between 2^height - 1 and 3^height - 1 pairs
+    def __build(self, batch, lo, hi, height) -> Node:
+        if height == 0:
+            return None
+        count = hi - lo
+        child_max = 3 ** (height - 1) - 1
+
+        if count - 1 <= 2 * child_max: # a 2-node fits, split the rest evenly
+            mid = lo + (count - 1) // 2
+            root = self.__node(batch[mid][0], batch[mid][1], count, True)
+            root.left_child = self.__build(batch, lo, mid, height - 1)
+            root.right_child = self.__build(batch, mid + 1, hi, height - 1)
+            return root
+
+        # otherwise a 3-node, stored as a black node with a red left child
+        first = lo + (count - 2) // 3
+        second = first + 1 + (count - 2 - (first - lo)) // 2
+        red = self.__node(batch[first][0], batch[first][1], second - lo, False)
+        red.left_child = self.__build(batch, lo, first, height - 1)
+        red.right_child = self.__build(batch, first + 1, second, height - 1)
+        root = self.__node(batch[second][0], batch[second][1], count, True)
+        root.left_child = red
+        root.right_child = self.__build(batch, second + 1, hi, height - 1)
+        return root
+
     # method to print out the tree for testing
     def string(self, root = None, height = 0):
         if height == 0:
@@ -579,5 +2187,69 @@ class RedBlackTree:
         if root == None:
             return ""
         tab = "\t" * height
-        return (f'{tab}{root.is_black}, ({root.key}, {root.value})\n L{self.string(root.left_child, height+1)}\n R{self.string(root.right_child, height+1)}')
-    
\ No newline at end of file
+        return (f'{tab}{root.is_black}, ({root.item}, {root.value})\n L{self.string(root.left_child, height+1)}\n R{self.string(root.right_child, height+1)}')
+    
+
+
+# pauses the cycle collector for a block that only allocates tree nodes. nodes have
+# no parent links, so they can't form cycles, while collector passes over millions of
+# fresh nodes would take most of the time of a bulk build
+@contextmanager
+def _gc_paused():
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+# writes k / v pairs, which must be in ascending key order, as a snapshot file. the
+# pairs are only walked once, so they can stream in from anywhere
+def write_snapshot(path, pairs):
+    with open(path, "wb") as out:
+        out.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, SNAPSHOT_BLOCK, 0, 0))
+        offsets = []
+        position = SNAPSHOT_HEADER.size
+        count = 0
+        pairs = iter(pairs)
+        while True:
+            block = list(islice(pairs, SNAPSHOT_BLOCK))
+            if not block:
+                break
+            keys = [pair[0] for pair in block]
+            parts = (pickle.dumps(keys[0], pickle.HIGHEST_PROTOCOL),
+                     pickle.dumps(keys, pickle.HIGHEST_PROTOCOL),
+                     pickle.dumps([pair[1] for pair in block], pickle.HIGHEST_PROTOCOL))
+            offsets.append(position)
+            for part in parts:
+                out.write(SNAPSHOT_LENGTH.pack(len(part)))
+                out.write(part)
+                position -= -(SNAPSHOT_LENGTH.size + len(part))
+            count += len(block)
+
+        padding = -position % SNAPSHOT_OFFSET.size # keep the table aligned
+        out.write(b"\x00" * padding)
+        table = position + padding
+        offsets = array("Q", offsets)
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        out.write(offsets.tobytes())
+        out.seek(0)
+        out.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, SNAPSHOT_BLOCK, count, table))
+
+
+# checks the header of a snapshot, returns its pair count, table offset and pairs per block.
+# a good header says nothing about the pickles after it, see load
+def read_snapshot_header(data) -> tuple:
+    if len(data) < SNAPSHOT_HEADER.size:
+        raise ValueError("file is too short to be a RedBlackTree snapshot")
+    magic, version, block_size, count, table = SNAPSHOT_HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("file is not a RedBlackTree snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    if block_size < 1 or table + -(-count // block_size) * SNAPSHOT_OFFSET.size > len(data):
+        raise ValueError("snapshot is truncated")
+    return count, table, block_size
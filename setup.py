@@ -0,0 +1,17 @@
+"""
+    Builds the optional _rbtnative extension next to the sources, which
+    numerictree.py picks up on its own:
+
+        python setup.py build_ext --inplace
+
+    Everything else is plain Python and needs no build. If the extension does
+    not compile, numerictree.py falls back to the pure Python tree.
+"""
+
+from setuptools import Extension, setup
+
+setup(
+    name="redblacktree",
+    version="23.11.5",
+    ext_modules=[Extension("_rbtnative", ["_rbtnative.c"], optional=True)],
+)
@@ -0,0 +1,94 @@
+"""
+    Checks range_aggregate and prefix_aggregate against sums and minimums worked
+    out from the pairs, and that aggregate trees copy and pickle.
+
+    usage: python -m unittest discover tests
+"""
+
+import copy
+import os
+import pickle
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from redblacktree import Aggregate, RedBlackTree  # noqa: E402
+
+
+# returns the keys of pairs between lo and hi, none meaning unbounded
+def between(pairs, lo, hi, inclusive):
+    return [(key, value) for key, value in sorted(pairs.items())
+            if (lo is None or lo < key or (inclusive[0] and lo == key))
+            and (hi is None or key < hi or (inclusive[1] and key == hi))]
+
+
+class TestAggregate(unittest.TestCase):
+
+    # checks random ranges and prefixes of a sum tree against the pairs
+    def assert_sums(self, tree, pairs, rng):
+        self.assertTrue(tree.is_valid())
+        self.assertEqual(tree.range_aggregate(), sum(pairs.values()))
+        for _ in range(30):
+            lo = rng.choice((None, rng.randrange(-5, 505)))
+            hi = rng.choice((None, rng.randrange(-5, 505)))
+            inclusive = (rng.random() < 0.5, rng.random() < 0.5)
+            expected = sum(value for _, value in between(pairs, lo, hi, inclusive))
+            self.assertEqual(tree.range_aggregate(lo, hi, inclusive), expected)
+            key = rng.randrange(-5, 505)
+            expected = sum(value for _, value in between(pairs, None, key, (True, True)))
+            self.assertEqual(tree.prefix_aggregate(key), expected)
+            expected = sum(value for _, value in between(pairs, None, key, (True, False)))
+            self.assertEqual(tree.prefix_aggregate(key, False), expected)
+
+    def test_sum_through_writes(self):
+        rng = random.Random(0)
+        tree = RedBlackTree(aggregate=Aggregate.sum())
+        pairs = {}
+        for step in range(2000):
+            key = rng.randrange(500)
+            if rng.random() < 0.35:
+                tree.delete(key)
+                pairs.pop(key, None)
+            else:
+                tree.put(key, step)
+                pairs[key] = step
+            if step % 200 == 0:
+                self.assert_sums(tree, pairs, rng)
+        batch = {rng.randrange(500): -1 for _ in range(300)}
+        tree.put_many(batch)
+        pairs.update(batch)
+        self.assert_sums(tree, pairs, rng)
+
+    def test_min_and_measure(self):
+        pairs = {key: (key * 7919) % 1000 for key in range(300)}
+        tree = RedBlackTree.from_items(pairs.items(), aggregate=Aggregate.min())
+        for lo, hi in ((0, 299), (10, 20), (150, 151), (200, 100)):
+            values = [value for _, value in between(pairs, lo, hi, (True, True))]
+            self.assertEqual(tree.range_aggregate(lo, hi), min(values) if values else None)
+        counted = RedBlackTree.from_items(pairs.items(), aggregate=Aggregate.sum(lambda key, value: 1))
+        self.assertEqual(counted.range_aggregate(10, 19), 10)
+        self.assertEqual(counted.prefix_aggregate(99, False), 99)
+
+    def test_empty_and_without_aggregate(self):
+        self.assertEqual(RedBlackTree(aggregate=Aggregate.sum()).range_aggregate(), 0)
+        self.assertIsNone(RedBlackTree(aggregate=Aggregate.max()).prefix_aggregate(5))
+        with self.assertRaises(ValueError):
+            RedBlackTree().range_aggregate()
+
+    def test_copy_and_pickle(self):
+        tree = RedBlackTree.from_items(((key, key) for key in range(100)), aggregate=Aggregate.sum())
+        depth = tree.calc_average_depth()
+        for clone in (copy.deepcopy(tree), pickle.loads(pickle.dumps(tree))):
+            for key in range(100, 200):
+                clone.put(key, key)
+            clone.delete(0)
+            self.assertEqual(clone.range_aggregate(), sum(range(1, 200)))
+            self.assertTrue(clone.is_valid())
+            self.assertEqual(tree.range_aggregate(), sum(range(100)))
+            self.assertEqual(tree.calc_average_depth(), depth)
+            self.assertTrue(tree.is_valid())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+    Runs the same operations on BPlusTree, at a small fanout so the blocks split
+    and merge often, and on RedBlackTree, and checks they give the same answers.
+
+    usage: python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from bplustree import BPlusTree  # noqa: E402
+from redblacktree import RedBlackTree  # noqa: E402
+
+
+class TestBPlusTree(unittest.TestCase):
+
+    def test_matches_red_black_tree(self):
+        rng = random.Random(3)
+        for fanout in (4, 5, 16):
+            with self.subTest(fanout = fanout):
+                tree = BPlusTree(fanout)
+                plain = RedBlackTree()
+                for step in range(3000):
+                    key = rng.randrange(600)
+                    roll = rng.random()
+                    if roll < 0.35:
+                        self.assertEqual(tree.delete(key), plain.delete(key))
+                    elif roll < 0.38:
+                        batch = [(rng.randrange(600), step) for _ in range(15)]
+                        gone = [rng.randrange(600) for _ in range(15)]
+                        tree.put_many(batch, deletes = gone)
+                        plain.put_many(batch, deletes = gone)
+                    elif roll < 0.4:
+                        gone = [rng.randrange(600) for _ in range(25)]
+                        self.assertEqual(tree.delete_many(gone), plain.delete_many(gone))
+                    else:
+                        tree.put(key, step)
+                        plain.put(key, step)
+                    self.assertEqual(tree.get(key), plain.get(key))
+                    self.assertEqual(tree.contains_key(key), plain.contains_key(key))
+                    self.assertEqual(len(tree), len(plain))
+                self.assertTrue(tree.is_valid())
+                self.check_queries(tree, plain, rng)
+
+    # compares every lookup, rank, range and iteration of the two trees
+    def check_queries(self, tree, plain, rng):
+        queries = [rng.randrange(-5, 605) for _ in range(200)]
+        for name in ("floor", "ceiling", "lower", "higher", "nearest", "find_rank",
+                     "find_predecessor", "find_successor"):
+            self.assertEqual([getattr(tree, name)(key) for key in queries],
+                             [getattr(plain, name)(key) for key in queries], name)
+        for name in ("floor_many", "ceiling_many", "lower_many", "higher_many", "nearest_many", "rank_many"):
+            self.assertEqual(list(getattr(tree, name)(queries)), list(getattr(plain, name)(queries)), name)
+        ranks = list(range(-2, len(plain) + 2))
+        self.assertEqual(tree.select_many(ranks), list(plain.select_many(ranks)))
+        self.assertEqual(list(tree.items()), list(plain.items()))
+        self.assertEqual(list(tree.values()), list(plain.values()))
+        self.assertEqual(list(reversed(tree)), list(reversed(plain)))
+        self.assertEqual(tree.find_first_key(), plain.find_first_key())
+        self.assertEqual(tree.find_last_key(), plain.find_last_key())
+        lo, hi = sorted(queries[:2])
+        for inclusive in ((True, True), (False, True), (True, False), (False, False)):
+            self.assertEqual(list(tree.range(lo, hi, inclusive)), list(plain.range(lo, hi, inclusive)))
+            self.assertEqual(tree.count_range(lo, hi, inclusive), plain.count_range(lo, hi, inclusive))
+        self.assertEqual(list(tree.range(None, hi)), list(plain.range(None, hi)))
+        self.assertEqual(list(tree.range(lo, None)), list(plain.range(lo, None)))
+
+    def test_builders(self):
+        pairs = [(3, "c"), (1, "a"), (2, "b"), (1, "z")]
+        tree = BPlusTree.from_items(pairs, fanout = 4)
+        self.assertEqual(list(tree.items()), [(1, "z"), (2, "b"), (3, "c")])
+        self.assertRaises(ValueError, BPlusTree.from_sorted, [(2, 0), (1, 0)])
+        self.assertRaises(ValueError, BPlusTree, 3)
+        big = BPlusTree.from_sorted(((k, -k) for k in range(1000)), fanout = 4)
+        self.assertTrue(big.is_valid())
+        self.assertEqual(big.select(500), 500)
+        self.assertGreater(big.calc_height(), 3)
+        bulk = BPlusTree(4)
+        bulk.put_many({k: k for k in range(50, 0, -1)})
+        self.assertEqual(list(bulk), list(range(1, 51)))
+        self.assertTrue(bulk.is_valid())
+
+    def test_empty(self):
+        tree = BPlusTree()
+        self.assertTrue(tree.is_empty())
+        self.assertIsNone(tree.get(1))
+        self.assertIsNone(tree.delete(1))
+        self.assertIsNone(tree.find_first_key())
+        self.assertIsNone(tree.select(0))
+        self.assertEqual(tree.find_rank(1), -1)
+        self.assertEqual(list(tree.range()), [])
+        self.assertEqual(tree.calc_height(), 0)
+        self.assertTrue(tree.is_valid())
+
+
+if __name__ == "__main__":
+    unittest.main()
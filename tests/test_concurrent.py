@@ -0,0 +1,88 @@
+"""
+    A bounded version of the stress run in benchmarks/bench_concurrent.py: reader
+    threads check what they see while writer threads churn a shared
+    ConcurrentRedBlackTree. Every key k is stored with the value -k, and the
+    writers only touch odd keys, so even keys must always be there.
+
+    usage: python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from concurrenttree import ConcurrentRedBlackTree  # noqa: E402
+from redblacktree import RedBlackTree  # noqa: E402
+
+SIZE = 2000
+READERS = 4
+ROUNDS = 300 # reads and writes per thread, so the test always ends
+
+
+# deletes and re-inserts odd keys, every few rounds as one batch
+def writer(tree, seed):
+    rng = random.Random(seed)
+    for i in range(ROUNDS):
+        key = rng.randrange(1, SIZE, 2)
+        if i % 10 == 0:
+            gone = [rng.randrange(1, SIZE, 2) for _ in range(20)]
+            back = [(k, -k) for k in gone[:10]]
+            tree.put_many(back, deletes = gone)
+        elif tree.delete(key) is None:
+            tree.put(key, -key)
+
+
+# runs checked reads, recording any mistake in errors
+def checked_reader(tree, seed, errors):
+    rng = random.Random(seed)
+    for i in range(ROUNDS):
+        key = rng.randrange(0, SIZE, 2)
+        if tree.get(key) != -key:
+            errors.append(f"get({key}) lost an even key")
+        with tree.lock.reading(): # the writers shift ranks between two calls
+            inner = tree.unsafe_tree
+            if inner.select(inner.find_rank(key)) != key:
+                errors.append(f"select(find_rank({key})) did not round trip")
+        pairs = tree.range(key, key + 64)
+        if any(v != -k for k, v in pairs) or [k for k, _ in pairs] != sorted(k for k, _ in pairs):
+            errors.append(f"range({key}, {key + 64}) gave {pairs!r}")
+        if sum(1 for k, _ in pairs if k % 2 == 0) != len(range(key, min(key + 65, SIZE), 2)):
+            errors.append(f"range({key}, {key + 64}) lost an even key")
+        if i % 50 == 0: # these resync counters, so they take the lock alone
+            tree.stats()
+            tree.count_red_nodes()
+            tree.calc_average_depth()
+            tree.calc_height()
+
+
+class TestConcurrent(unittest.TestCase):
+
+    def test_stress(self):
+        tree = ConcurrentRedBlackTree(RedBlackTree.from_sorted((k, -k) for k in range(SIZE)))
+        errors = []
+        threads = [threading.Thread(target = writer, args = (tree, seed)) for seed in (1, 2)]
+        threads += [threading.Thread(target = checked_reader, args = (tree, 100 + i, errors))
+                    for i in range(READERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors[:5], [])
+        self.assertTrue(tree.is_valid())
+        self.assertEqual(tree.stats()["red_nodes"], tree.count_red_nodes())
+        for key in range(0, SIZE, 2):
+            self.assertEqual(tree.get(key), -key)
+
+    def test_put_many_forwards_deletes(self):
+        tree = ConcurrentRedBlackTree()
+        tree.put_many([(k, -k) for k in range(10)])
+        tree.put_many({20: -20}, deletes = [1, 2, 3])
+        self.assertEqual(tree.keys(), [0, 4, 5, 6, 7, 8, 9, 20])
+        self.assertEqual(tree.delete_many([4, 5, 99]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+    Cuts JournaledRedBlackTree journals off mid record, as a crash would, and
+    checks that reopening them recovers a whole prefix of the writes, under each
+    sync policy, and across compactions.
+
+    usage: python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from journaledtree import JOURNAL_FRAME, JOURNAL_HEADER, SYNC_POLICIES, JournaledRedBlackTree  # noqa: E402
+
+
+# returns the paths of a journal's segments and snapshots, oldest first
+def files_of(directory, prefix):
+    return sorted((os.path.join(directory, name) for name in os.listdir(directory) if name.startswith(prefix)),
+                  key=lambda path: int("".join(filter(str.isdigit, os.path.basename(path)))))
+
+
+# returns where every frame of a segment ends
+def frame_ends(path):
+    with open(path, "rb") as source:
+        data = source.read()
+    ends = []
+    position = JOURNAL_HEADER.size
+    while position + JOURNAL_FRAME.size <= len(data):
+        _, length = JOURNAL_FRAME.unpack_from(data, position)
+        position += JOURNAL_FRAME.size + length
+        ends.append(position)
+    return ends
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.temporary.name, "journal")
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    # writes a random run of puts and deletes, returning the pairs after each write
+    def write(self, tree, rng, count):
+        states = [dict(tree.items())]
+        for step in range(count):
+            key = rng.randrange(50)
+            if rng.random() < 0.3:
+                tree.delete(key)
+            else:
+                tree.put(key, (step, "x" * rng.randrange(40)))
+            states.append(dict(tree.items()))
+        return states
+
+    def test_torn_tail(self):
+        for sync in SYNC_POLICIES:
+            rng = random.Random(8)
+            with tempfile.TemporaryDirectory() as directory:
+                with JournaledRedBlackTree(directory, sync = sync, group_size = 7) as tree:
+                    states = self.write(tree, rng, 150)
+                segment = files_of(directory, "journal-")[-1]
+                ends = frame_ends(segment)
+                with open(segment, "rb") as source:
+                    data = source.read()
+                self.assertEqual(ends[-1], len(data))
+                if sync == "always":
+                    self.assertEqual(len(ends), 150) # a frame per write
+
+                cuts = [len(data) - 1, ends[len(ends) // 2] + 3, JOURNAL_HEADER.size + 2, JOURNAL_HEADER.size - 1]
+                for cut in cuts:
+                    with self.subTest(sync = sync, cut = cut):
+                        with open(segment, "wb") as out:
+                            out.write(data[:cut])
+                        whole = sum(1 for end in ends if end <= cut) # the frames left whole
+                        with JournaledRedBlackTree(directory, sync = sync) as reopened:
+                            pairs = dict(reopened.items())
+                            self.assertIn(pairs, states)
+                            self.assertTrue(reopened.tree.is_valid())
+                            if sync == "always":
+                                self.assertEqual(pairs, states[whole])
+                                self.assertEqual(reopened.recovery["records"], whole)
+                            # later writes go to a new segment, not after the torn frame
+                            reopened.put(1000, cut)
+                        with JournaledRedBlackTree(directory, sync = sync) as again:
+                            self.assertEqual(again.get(1000), cut)
+                            self.assertEqual(dict(again.items()), {**pairs, 1000: cut})
+                        for extra in files_of(directory, "journal-"):
+                            if extra != segment:
+                                os.remove(extra)
+
+    def test_damaged_frame(self):
+        with JournaledRedBlackTree(self.directory, sync = "always") as tree:
+            states = self.write(tree, random.Random(9), 40)
+        segment = files_of(self.directory, "journal-")[-1]
+        ends = frame_ends(segment)
+        with open(segment, "r+b") as out:
+            out.seek(ends[19] + JOURNAL_FRAME.size + 1) # inside the 21st frame's payload
+            byte = out.read(1)
+            out.seek(-1, os.SEEK_CUR)
+            out.write(bytes([byte[0] ^ 0xFF]))
+        with JournaledRedBlackTree(self.directory) as reopened:
+            self.assertEqual(dict(reopened.items()), states[20])
+
+    def test_compaction(self):
+        for sync in SYNC_POLICIES:
+            rng = random.Random(10)
+            with tempfile.TemporaryDirectory() as directory:
+                with JournaledRedBlackTree(directory, sync = sync, compact_bytes = 2000) as tree:
+                    self.write(tree, rng, 300)
+                    tree.compact(wait = True)
+                    self.assertFalse(tree.compacting)
+                    more = self.write(tree, rng, 60)
+                with self.subTest(sync = sync):
+                    snapshots = files_of(directory, "snapshot-")
+                    self.assertEqual(len(snapshots), 1) # older ones went with their segments
+                    with JournaledRedBlackTree(directory, sync = sync) as reopened:
+                        self.assertEqual(dict(reopened.items()), more[-1])
+                        self.assertLess(reopened.recovery["records"], 360)
+
+                    # a torn tail after the snapshot still leaves the snapshot's pairs,
+                    # and the writes before the torn one
+                    segment = files_of(directory, "journal-")[-1]
+                    with open(segment, "rb") as source:
+                        data = source.read()
+                    with open(segment, "wb") as out:
+                        out.write(data[:len(data) - 5])
+                    with JournaledRedBlackTree(directory, sync = sync) as reopened:
+                        self.assertIn(dict(reopened.items()), more)
+                        self.assertTrue(reopened.tree.is_valid())
+
+    def test_key_function_and_deletes_survive(self):
+        with JournaledRedBlackTree(self.directory, key = str.lower, compact_bytes = 500) as tree:
+            for i in range(60):
+                tree.put(f"Key{i}", i)
+            tree.put("KEY5", "last")
+            tree.delete("key7")
+            tree.compact(wait = True)
+            tree.put("kEy6", "after")
+        with JournaledRedBlackTree(self.directory, key = str.lower) as reopened:
+            self.assertEqual(reopened.get("key5"), "last")
+            self.assertEqual(reopened.get("KEY6"), "after")
+            self.assertFalse(reopened.contains_key("Key7"))
+            self.assertEqual(len(reopened), 59)
+            self.assertIn("KEY5", list(reopened))
+
+    def test_bad_sync(self):
+        self.assertRaises(ValueError, JournaledRedBlackTree, self.directory, sync = "sometimes")
+
+
+if __name__ == "__main__":
+    unittest.main()
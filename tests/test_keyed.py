@@ -0,0 +1,44 @@
+"""
+    Checks a RedBlackTree built with a key function, where the key written last
+    is the one the tree hands back, cached answers included.
+
+    usage: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from redblacktree import RedBlackTree  # noqa: E402
+
+
+class TestKeyed(unittest.TestCase):
+
+    def test_replace_updates_cached_neighbours(self):
+        tree = RedBlackTree(key=str.lower, cache_size=3)
+        tree.put("ay", 1)
+        tree.put("by", 2)
+        self.assertEqual(tree.find_predecessor("BY"), "ay")
+        self.assertEqual(tree.find_successor("ay"), "by")
+        tree.put("AY", 5)
+        tree.put("By", 6)
+        self.assertEqual(tree.find_predecessor("BY"), "AY")
+        self.assertEqual(tree.find_successor("ay"), "By")
+        self.assertEqual(tree.get("aY"), 5)
+
+    def test_last_key_written_wins(self):
+        for cache_size in (0, 4):
+            tree = RedBlackTree(key=str.lower, cache_size=cache_size)
+            for word in ("apple", "Banana", "cherry"):
+                tree.put(word, len(word))
+            tree.put("BANANA", 0)
+            self.assertEqual(list(tree.keys()), ["apple", "BANANA", "cherry"])
+            self.assertEqual(tree.get("banana"), 0)
+            self.assertEqual(tree.delete("Banana"), 0)
+            self.assertEqual(tree.find_successor("apple"), "cherry")
+            self.assertEqual(len(tree), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+    Checks rank_many, select_many and the bound _many methods against one query
+    at a time, for plain, tuple and keyed keys, and the NumPy arrays they hand
+    back when NumPy is installed.
+
+    usage: python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from redblacktree import RedBlackTree  # noqa: E402
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BOUNDS = ("floor", "ceiling", "lower", "higher", "nearest")
+
+
+class TestMany(unittest.TestCase):
+
+    # compares every _many method of tree with one call per query
+    def check_one_at_a_time(self, tree, queries):
+        self.assertEqual(tree.rank_many(queries), [tree.find_rank(key) for key in queries])
+        ranks = list(range(-3, len(tree) + 3)) + [5, 0, 5]
+        self.assertEqual(tree.select_many(ranks), [tree.select(rank) for rank in ranks])
+        for name in BOUNDS:
+            if name == "nearest" and not isinstance(queries[0], int):
+                continue
+            one = getattr(tree, name)
+            self.assertEqual(getattr(tree, name + "_many")(queries), [one(key) for key in queries], name)
+
+    def test_int_keys(self):
+        rng = random.Random(5)
+        for size in (0, 1, 40, 2000): # the larger trees take the sparse path for few queries
+            tree = RedBlackTree.from_items((rng.randrange(5000), i) for i in range(size))
+            for count in (1, 10, 500):
+                self.check_one_at_a_time(tree, [rng.randrange(-10, 5010) for _ in range(count)])
+
+    def test_tuple_keys(self):
+        tree = RedBlackTree.from_items(((a, b), a * b) for a in range(10) for b in range(3))
+        queries = [(a, b) for a in range(-1, 11) for b in (-1, 1, 5)]
+        self.check_one_at_a_time(tree, queries)
+        self.assertEqual(tree.select_many([0, 29, 30]), [(0, 0), (9, 2), None])
+
+    def test_key_function(self):
+        tree = RedBlackTree.from_items(((word, len(word)) for word in ("Pear", "apple", "Fig", "kiwi")), key=str.lower)
+        self.assertEqual(tree.rank_many(["FIG", "pear", "plum"]), [1, 3, -1])
+        self.assertEqual(tree.select_many([0, 3]), ["apple", "Pear"])
+        self.assertEqual(tree.floor_many(["b", "z"]), ["apple", "Pear"])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_numpy_numbers(self):
+        tree = RedBlackTree.from_items((key, key) for key in range(0, 100, 2))
+        ranks = tree.rank_many(numpy.array([4, 5, 98]))
+        self.assertEqual(ranks.dtype, numpy.int64)
+        self.assertEqual(ranks.tolist(), [2, -1, 49])
+        self.assertEqual(tree.select_many(numpy.array([0, 1])).tolist(), [0, 2])
+        self.assertEqual(tree.floor_many(numpy.array([3, 5])).tolist(), [2, 4])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_numpy_objects(self):
+        tree = RedBlackTree.from_items(((a, b), 0) for a in range(3) for b in range(2))
+        found = tree.select_many(numpy.array([0, 5, 9]))
+        self.assertEqual(found.shape, (3,))
+        self.assertEqual(found.dtype, object)
+        self.assertEqual(found.tolist(), [(0, 0), (2, 1), None])
+        numbers = RedBlackTree.from_items((key, key) for key in range(10))
+        missing = numbers.floor_many(numpy.array([-1, 3]))
+        self.assertEqual(missing.tolist(), [None, 3])
+        self.assertEqual(numbers.nearest_many(numpy.array([-5, 4.4])).tolist(), [0, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
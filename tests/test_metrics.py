@@ -0,0 +1,95 @@
+"""
+    Checks what a RedBlackTree built with a TreeMetrics counts, and that such a
+    tree copies and pickles as a tree of its own.
+
+    usage: python -m unittest discover tests
+"""
+
+import copy
+import os
+import pickle
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from redblacktree import RedBlackTree  # noqa: E402
+from treemetrics import TreeMetrics  # noqa: E402
+
+
+# returns num of nodes a search for key passes, counting the node that holds it
+def search_length(tree, key):
+    count = 0
+    node = tree.root
+    while node is not None:
+        count -= -1
+        if node.key == key:
+            break
+        node = node.left_child if key < node.key else node.right_child
+    return count
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_counts_match_a_plain_tree(self):
+        rng = random.Random(0)
+        metrics = TreeMetrics()
+        tree = RedBlackTree(metrics=metrics)
+        plain = RedBlackTree()
+        for step in range(3000):
+            key = rng.randrange(800)
+            if rng.random() < 0.3:
+                self.assertEqual(tree.delete(key), plain.delete(key))
+            else:
+                tree.put(key, step)
+                plain.put(key, step)
+            self.assertEqual(tree.get(key), plain.get(key))
+        self.assertEqual(list(tree.items()), list(plain.items()))
+        self.assertTrue(tree.is_valid())
+        counts = metrics.as_dict()
+        for op in ("get", "put", "delete"):
+            self.assertGreater(counts["nodes_visited"][op]["count"], 0)
+        self.assertEqual(counts["nodes_visited"]["get"]["count"], 3000)
+        self.assertGreater(metrics.left_rotations + metrics.right_rotations, 0)
+        self.assertGreater(metrics.color_flips, 0)
+
+    def test_get_counts_its_own_walk(self):
+        metrics = TreeMetrics()
+        tree = RedBlackTree.from_items(((key, key) for key in range(1000)), metrics=metrics)
+        for key in (0, 500, 999, 1234):
+            metrics.reset()
+            tree.get(key)
+            self.assertEqual(metrics.visited["get"]["sum"], search_length(tree, key))
+
+    def test_cache_hits_walk_past_nothing(self):
+        metrics = TreeMetrics()
+        tree = RedBlackTree.from_items(((key, key) for key in range(1000)), metrics=metrics, cache_size=8)
+        tree.get(3)
+        metrics.reset()
+        tree.get(3)
+        self.assertEqual(metrics.visited["get"]["count"], 1)
+        self.assertEqual(metrics.visited["get"]["sum"], 0)
+
+    def test_copy_and_pickle(self):
+        metrics = TreeMetrics()
+        tree = RedBlackTree.from_items(((key, key) for key in range(100)), metrics=metrics)
+        for clone in (copy.deepcopy(tree), pickle.loads(pickle.dumps(tree))):
+            before = metrics.as_dict()
+            clone.put(100, 1)
+            clone.delete(5)
+            self.assertEqual(clone.get(100), 1)
+            self.assertTrue(clone.contains_key(100))
+            self.assertFalse(tree.contains_key(100))
+            self.assertEqual(tree.get(5), 5)
+            self.assertEqual(clone.metrics.visited["put"]["count"], before["nodes_visited"]["put"]["count"] + 1)
+            self.assertIsNot(clone.metrics, metrics)
+            self.assertTrue(clone.is_valid())
+
+    def test_prometheus_sums_are_exact(self):
+        metrics = TreeMetrics()
+        metrics.record("get", 0.5, 1234567)
+        self.assertIn('redblacktree_nodes_visited_sum{op="get"} 1234567\n', metrics.to_prometheus())
+
+
+if __name__ == "__main__":
+    unittest.main()
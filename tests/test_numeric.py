@@ -0,0 +1,98 @@
+"""
+    Runs the same operations on NumericRedBlackTree, on each backend it has here,
+    and on RedBlackTree, and checks they give the same answers.
+
+    usage: python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from numerictree import NATIVE, NumericRedBlackTree, tree_for  # noqa: E402
+from redblacktree import RedBlackTree  # noqa: E402
+
+# the backends this build can run
+BACKENDS = (False, True) if NATIVE else (False,)
+
+
+class TestNumeric(unittest.TestCase):
+
+    # runs a random mix of writes and queries on both trees, checking as it goes
+    def check_against_plain(self, key_type, native, make_key):
+        rng = random.Random(7)
+        tree = NumericRedBlackTree(key_type, native = native)
+        plain = RedBlackTree()
+        for step in range(2000):
+            key = make_key(rng)
+            roll = rng.random()
+            if roll < 0.25:
+                self.assertEqual(tree.delete(key), plain.delete(key))
+            elif roll < 0.3:
+                batch = [(make_key(rng), step) for _ in range(20)]
+                gone = [make_key(rng) for _ in range(10)]
+                tree.put_many(batch, deletes = gone)
+                plain.put_many(batch, deletes = gone)
+            elif roll < 0.32:
+                gone = [make_key(rng) for _ in range(30)]
+                self.assertEqual(tree.delete_many(gone), plain.delete_many(gone))
+            else:
+                tree.put(key, step)
+                plain.put(key, step)
+            self.assertEqual(tree.get(key), plain.get(key))
+            self.assertEqual(tree.contains_key(key), plain.contains_key(key))
+            self.assertEqual(len(tree), len(plain))
+
+        queries = [make_key(rng) for _ in range(300)]
+        for name in ("floor", "ceiling", "lower", "higher", "nearest", "find_rank",
+                     "find_predecessor", "find_successor"):
+            expected = [getattr(plain, name)(key) for key in queries]
+            self.assertEqual([getattr(tree, name)(key) for key in queries], expected, name)
+        for name in ("floor_many", "ceiling_many", "lower_many", "higher_many", "nearest_many", "rank_many"):
+            self.assertEqual(list(getattr(tree, name)(queries)), list(getattr(plain, name)(queries)), name)
+        ranks = list(range(-2, len(plain) + 2))
+        self.assertEqual(tree.select_many(ranks), list(plain.select_many(ranks)))
+        self.assertEqual(list(tree.items()), list(plain.items()))
+        self.assertEqual(list(reversed(tree)), list(reversed(plain)))
+        lo, hi = sorted(queries[:2])
+        for inclusive in ((True, True), (False, True), (True, False), (False, False)):
+            self.assertEqual(list(tree.range(lo, hi, inclusive)), list(plain.range(lo, hi, inclusive)))
+            self.assertEqual(tree.count_range(lo, hi, inclusive), plain.count_range(lo, hi, inclusive))
+        self.assertEqual(tree.find_first_key(), plain.find_first_key())
+        self.assertEqual(tree.find_last_key(), plain.find_last_key())
+        self.assertTrue(tree.is_valid())
+
+    def test_int_keys(self):
+        for native in BACKENDS:
+            with self.subTest(native = native):
+                self.check_against_plain(int, native, lambda rng: rng.randrange(-500, 500))
+
+    def test_float_keys(self):
+        for native in BACKENDS:
+            with self.subTest(native = native):
+                self.check_against_plain(float, native, lambda rng: rng.randrange(-2000, 2000) / 4)
+
+    def test_bad_keys(self):
+        for native in BACKENDS:
+            with self.subTest(native = native):
+                ints = NumericRedBlackTree(int, native = native)
+                self.assertRaises(TypeError, ints.put, 1.5, 0)
+                self.assertRaises(TypeError, ints.put, "a", 0)
+                self.assertRaises(OverflowError, ints.put, 2 ** 63, 0)
+                floats = NumericRedBlackTree(float, native = native)
+                self.assertRaises(ValueError, floats.put, float("nan"), 0)
+                floats.put(2, "two")
+                self.assertEqual(list(floats.items()), [(2.0, "two")])
+
+    def test_tree_for(self):
+        self.assertIsInstance(tree_for({"a": 1}), RedBlackTree)
+        self.assertIsInstance(tree_for([(1, 1)], cache_size = 4), RedBlackTree)
+        picked = tree_for([(3, "c"), (1, "a")])
+        self.assertEqual(list(picked.items()), [(1, "a"), (3, "c")])
+        self.assertIsInstance(picked, NumericRedBlackTree if NATIVE else RedBlackTree)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+    Checks PartitionedRedBlackTree against a RedBlackTree holding the same pairs,
+    the options it turns away, and that its worker processes stop.
+
+    usage: python -m unittest discover tests
+"""
+
+import gc
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from partitionedtree import PartitionedRedBlackTree  # noqa: E402
+from redblacktree import RedBlackTree  # noqa: E402
+from treemetrics import TreeMetrics  # noqa: E402
+
+
+class TestPartitioned(unittest.TestCase):
+
+    def test_matches_red_black_tree(self):
+        rng = random.Random(2)
+        pairs = [(rng.randrange(5000), i) for i in range(2000)]
+        plain = RedBlackTree.from_items(pairs)
+        with PartitionedRedBlackTree.from_items(pairs, partitions = 3) as tree:
+            self.assertEqual(tree.partitions, 3)
+            self.assertEqual(sum(tree.partition_sizes()), len(plain))
+            more = [(rng.randrange(-100, 5100), -i) for i in range(300)]
+            tree.put_many(more)
+            plain.put_many(more)
+            for key in (-100, 17, 2500, 5099):
+                tree.put(key, "one")
+                plain.put(key, "one")
+            for key in [rng.randrange(5000) for _ in range(30)]:
+                self.assertEqual(tree.delete(key), plain.delete(key))
+            self.assertEqual(len(tree), len(plain))
+            self.assertEqual(list(tree.items()), list(plain.items()))
+            queries = [rng.randrange(-200, 5200) for _ in range(200)]
+            self.assertEqual(tree.rank_many(queries), plain.rank_many(queries))
+            ranks = [-1, 0, len(plain) - 1, len(plain)] + [rng.randrange(len(plain)) for _ in range(50)]
+            self.assertEqual(tree.select_many(ranks), plain.select_many(ranks))
+            for key in queries[:20]:
+                self.assertEqual(tree.get(key), plain.get(key))
+                self.assertEqual(tree.contains_key(key), plain.contains_key(key))
+                self.assertEqual(tree.find_rank(key), plain.find_rank(key))
+            for rank in ranks[:10]:
+                self.assertEqual(tree.select(rank), plain.select(rank))
+            for lo, hi in ((None, None), (100, 4000), (4000, 100), (None, 2500), (2500, None), (17, 17)):
+                for inclusive in ((True, True), (False, False)):
+                    self.assertEqual(list(tree.range(lo, hi, inclusive)), list(plain.range(lo, hi, inclusive)))
+                    self.assertEqual(tree.count_range(lo, hi, inclusive), plain.count_range(lo, hi, inclusive))
+
+    def test_empty_and_explicit_boundaries(self):
+        with PartitionedRedBlackTree([10, 20]) as tree:
+            self.assertTrue(tree.is_empty())
+            self.assertIsNone(tree.select(0))
+            self.assertEqual(list(tree), [])
+            tree.put_many({5: "a", 10: "b", 25: "c"})
+            self.assertEqual(tree.partition_sizes(), [1, 1, 1])
+            self.assertEqual(list(tree), [5, 10, 25])
+        self.assertRaises(ValueError, PartitionedRedBlackTree, [20, 10])
+        with PartitionedRedBlackTree.from_items([], partitions = 4) as tree:
+            self.assertEqual(len(tree), 0)
+
+    def test_unsupported_options(self):
+        for options in ({"key": str.lower}, {"metrics": TreeMetrics()}):
+            with self.assertRaises(ValueError) as raised:
+                PartitionedRedBlackTree([], **options)
+            self.assertIn(next(iter(options)), str(raised.exception))
+            self.assertRaises(ValueError, PartitionedRedBlackTree.from_items, [("a", 1)], 2, **options)
+        with PartitionedRedBlackTree([], cache_size = 4) as tree: # other options still go through
+            tree.put(1, 1)
+            self.assertEqual(tree.get(1), 1)
+
+    def test_workers_stop_when_collected(self):
+        tree = PartitionedRedBlackTree([0])
+        tree.put(1, 1)
+        workers = tree._PartitionedRedBlackTree__workers
+        del tree
+        gc.collect()
+        for worker in workers:
+            self.assertRaises(RuntimeError, worker.submit, int)
+
+    def test_close_twice(self):
+        tree = PartitionedRedBlackTree([0])
+        tree.close()
+        tree.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
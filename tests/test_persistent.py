@@ -0,0 +1,92 @@
+"""
+    Checks that every PersistentRedBlackTree version keeps its pairs, and stays
+    a valid tree, while later versions are made from it by puts and deletes.
+
+    usage: python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from persistenttree import PersistentRedBlackTree  # noqa: E402
+
+
+# returns every node of a version, by identity
+def nodes_of(version):
+    found = set()
+    stack = [version.root] if version.root is not None else []
+    while stack:
+        node = stack.pop()
+        found.add(id(node))
+        stack.extend(child for child in (node.left_child, node.right_child) if child is not None)
+    return found
+
+
+class TestPersistent(unittest.TestCase):
+
+    def test_old_versions_stay_unchanged(self):
+        rng = random.Random(4)
+        version = PersistentRedBlackTree()
+        history = [(version, {})]
+        expected = {}
+        for step in range(1500):
+            key = rng.randrange(300)
+            roll = rng.random()
+            if roll < 0.35:
+                version = version.delete(key)
+                expected.pop(key, None)
+            elif roll < 0.4:
+                batch = {rng.randrange(300): step for _ in range(10)}
+                version = version.put_many(batch)
+                expected.update(batch)
+            else:
+                version = version.put(key, step)
+                expected[key] = step
+            history.append((version, dict(expected)))
+
+        for version, pairs in history[::25] + history[-3:]:
+            self.assertEqual(list(version.items()), sorted(pairs.items()))
+            self.assertEqual(len(version), len(pairs))
+            self.assertTrue(version.is_valid())
+            keys = sorted(pairs)
+            for rank in (0, len(keys) // 2, len(keys) - 1):
+                if keys:
+                    self.assertEqual(version.select(rank), keys[rank])
+                    self.assertEqual(version.find_rank(keys[rank]), rank)
+
+    def test_writes_copy_only_the_path(self):
+        base = PersistentRedBlackTree((key, key) for key in range(1000))
+        before = list(base.items())
+        root = base.root
+        for later in (base.put(500, "new"), base.put(1000, "new"), base.delete(500), base.delete(0)):
+            self.assertIsNot(later.root, root)
+            shared = nodes_of(base) & nodes_of(later)
+            self.assertGreater(len(shared), 900) # all but the copied path
+            self.assertIs(base.root, root)
+            self.assertEqual(list(base.items()), before)
+        self.assertEqual(base.get(500), 500)
+
+    def test_delete_of_missing_key_returns_same_version(self):
+        base = PersistentRedBlackTree({1: "a", 2: "b"})
+        self.assertIs(base.delete(3), base)
+        empty = PersistentRedBlackTree()
+        self.assertIs(empty.delete(1), empty)
+        one = empty.put(1, "a")
+        self.assertTrue(empty.is_empty())
+        self.assertEqual(list(one.delete(1).items()), [])
+        self.assertEqual(list(one.items()), [(1, "a")])
+
+    def test_stats_of_old_version(self):
+        base = PersistentRedBlackTree((key, key) for key in range(100))
+        stats = base.stats()
+        for key in range(100, 200):
+            base.put(key, key)
+        self.assertEqual(base.stats(), stats)
+        self.assertEqual(base.find_successor(99), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
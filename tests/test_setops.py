@@ -0,0 +1,121 @@
+"""
+    Checks split, join, union, intersection and difference against dicts, over
+    empty, disjoint and overlapping trees, with key functions and aggregates.
+
+    usage: python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from redblacktree import Aggregate, RedBlackTree  # noqa: E402
+
+# (keys of the first tree, keys of the second): empty, disjoint and overlapping,
+# at sizes that take both the small and the large path of each operation
+SHAPES = [
+    (range(0), range(0)),
+    (range(50), range(0)),
+    (range(0), range(50)),
+    (range(0, 100), range(100, 200)),
+    (range(100, 200), range(0, 100)),
+    (range(0, 300, 2), range(0, 300, 3)),
+    (range(1000), range(500, 510)),
+    (range(500, 510), range(1000)),
+]
+
+
+class TestSetOperations(unittest.TestCase):
+
+    # checks tree holds exactly pairs and, for a tree summing its values, that the sums agree
+    def check(self, tree, pairs, summed = False):
+        self.assertEqual(list(tree.items()), sorted(pairs.items()))
+        self.assertEqual(len(tree), len(pairs))
+        self.assertTrue(tree.is_valid())
+        if summed:
+            self.assertEqual(tree.range_aggregate(), sum(pairs.values()))
+            if pairs:
+                middle = sorted(pairs)[len(pairs) // 2]
+                self.assertEqual(tree.prefix_aggregate(middle), sum(v for k, v in pairs.items() if k <= middle))
+
+    # builds the two trees of a shape, with the first one's values negated
+    def trees(self, first, second, **options):
+        a = RedBlackTree.from_items(((key, -key) for key in first), **options)
+        b = RedBlackTree.from_items(((key, key) for key in second), **options)
+        return a, b, {key: -key for key in first}, {key: key for key in second}
+
+    def test_union_intersection_difference(self):
+        for options in ({}, {"aggregate": Aggregate.sum()}):
+            for first, second in SHAPES:
+                with self.subTest(options = options, first = first, second = second):
+                    a, b, pa, pb = self.trees(first, second, **options)
+                    a.union(b)
+                    self.check(a, {**pa, **pb}, bool(options))
+                    self.check(b, pb, bool(options))
+
+                    a, b, pa, pb = self.trees(first, second, **options)
+                    a.intersection(b)
+                    self.check(a, {k: v for k, v in pa.items() if k in pb}, bool(options))
+                    self.check(b, pb, bool(options))
+
+                    a, b, pa, pb = self.trees(first, second, **options)
+                    a.difference(b)
+                    self.check(a, {k: v for k, v in pa.items() if k not in pb}, bool(options))
+                    self.check(b, pb, bool(options))
+
+    def test_with_itself(self):
+        tree = RedBlackTree.from_items((key, key) for key in range(20))
+        tree.union(tree)
+        tree.intersection(tree)
+        self.assertEqual(len(tree), 20)
+        tree.difference(tree)
+        self.assertTrue(tree.is_empty())
+
+    def test_split_and_join(self):
+        rng = random.Random(6)
+        for options in ({}, {"aggregate": Aggregate.sum()}):
+            for size in (0, 1, 2, 50, 777):
+                keys = sorted(rng.sample(range(10 * size + 10), size))
+                pairs = {key: key * 3 for key in keys}
+                for at in (-1, 0, 5 * size, 10 * size + 20) + tuple(keys[::max(size // 5, 1)]):
+                    with self.subTest(options = options, size = size, at = at):
+                        lower = RedBlackTree.from_items(pairs.items(), **options)
+                        upper = lower.split(at)
+                        self.check(lower, {k: v for k, v in pairs.items() if k < at}, bool(options))
+                        self.check(upper, {k: v for k, v in pairs.items() if k >= at}, bool(options))
+                        if at in pairs:
+                            value = upper.delete(at)
+                            joined = RedBlackTree.join(lower, at, value, upper)
+                            self.check(joined, pairs, bool(options))
+                            self.assertTrue(lower.is_empty() and upper.is_empty())
+
+    def test_join_checks_order(self):
+        left = RedBlackTree.from_items((key, key) for key in range(10))
+        right = RedBlackTree.from_items((key, key) for key in range(20, 30))
+        self.assertRaises(ValueError, RedBlackTree.join, left, 5, 0, right)
+        self.assertRaises(ValueError, RedBlackTree.join, left, 25, 0, right)
+        self.assertRaises(ValueError, RedBlackTree.join, right, 15, 0, left)
+        joined = RedBlackTree.join(RedBlackTree(), 15, "mid", RedBlackTree())
+        self.assertEqual(list(joined.items()), [(15, "mid")])
+
+    def test_key_function(self):
+        a = RedBlackTree.from_items(((word, i) for i, word in enumerate(["Apple", "fig", "Kiwi", "pear"])), key=str.lower)
+        b = RedBlackTree.from_items(((word, -i) for i, word in enumerate(["apple", "KIWI", "plum"])), key=str.lower)
+        a.intersection(b)
+        self.assertEqual(list(a.items()), [("Apple", 0), ("Kiwi", 2)])
+        a.union(b)
+        self.assertEqual(list(a.items()), [("apple", 0), ("KIWI", -1), ("plum", -2)])
+        a.difference(RedBlackTree.from_items([("APPLE", 0)], key=str.lower))
+        self.assertEqual(list(a.keys()), ["KIWI", "plum"])
+        upper = a.split("kiwi")
+        self.assertEqual((list(a.keys()), list(upper.keys())), ([], ["KIWI", "plum"]))
+        self.assertEqual(upper.get("Plum"), -2)
+        joined = RedBlackTree.join(RedBlackTree.from_items([("Fig", 1)], key=str.lower), "GRAPE", 7, upper)
+        self.assertEqual(list(joined.items()), [("Fig", 1), ("GRAPE", 7), ("KIWI", -1), ("plum", -2)])
+        self.assertEqual(joined.get("grape"), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
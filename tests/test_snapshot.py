@@ -0,0 +1,104 @@
+"""
+    Round trips trees through dump, load and MappedRedBlackTree, and checks that
+    files that are not whole snapshots are turned away.
+
+    usage: python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mappedtree import MappedRedBlackTree  # noqa: E402
+from redblacktree import SNAPSHOT_BLOCK, RedBlackTree  # noqa: E402
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "tree.snap")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    # dumps tree, then checks load and MappedRedBlackTree both give it back
+    def check_round_trip(self, tree, **options):
+        tree.dump(self.path)
+        loaded = RedBlackTree.load(self.path, **options)
+        self.assertEqual(list(loaded.items()), list(tree.items()))
+        self.assertTrue(loaded.is_valid())
+        with MappedRedBlackTree(self.path, **options) as mapped:
+            self.assertEqual(len(mapped), len(tree))
+            self.assertEqual(list(mapped.items()), list(tree.items()))
+            self.assertEqual(list(mapped.values()), list(tree.values()))
+            for rank in (-1, 0, len(tree) // 2, len(tree) - 1, len(tree)):
+                self.assertEqual(mapped.select(rank), tree.select(rank))
+            for key in list(tree.keys())[::7]:
+                self.assertEqual(mapped.get(key), tree.get(key))
+                self.assertEqual(mapped.find_rank(key), tree.find_rank(key))
+                self.assertEqual(mapped.find_successor(key), tree.find_successor(key))
+        return loaded
+
+    def test_empty(self):
+        loaded = self.check_round_trip(RedBlackTree())
+        self.assertTrue(loaded.is_empty())
+        with MappedRedBlackTree(self.path) as mapped:
+            self.assertIsNone(mapped.get(1))
+            self.assertIsNone(mapped.find_first_key())
+            self.assertEqual(list(mapped.range(0, 10)), [])
+
+    def test_block_edges(self):
+        for size in (1, SNAPSHOT_BLOCK - 1, SNAPSHOT_BLOCK, SNAPSHOT_BLOCK + 1, 3 * SNAPSHOT_BLOCK + 5):
+            with self.subTest(size = size):
+                tree = RedBlackTree.from_sorted((2 * k, str(k)) for k in range(size))
+                self.check_round_trip(tree)
+                with MappedRedBlackTree(self.path) as mapped:
+                    for key in (-1, 0, 1, 2 * size - 2, 2 * size - 1, 2 * size):
+                        self.assertEqual(mapped.floor(key), tree.floor(key))
+                        self.assertEqual(mapped.higher(key), tree.higher(key))
+                    self.assertEqual(mapped.count_range(3, 2 * size - 3), tree.count_range(3, 2 * size - 3))
+
+    def test_mixed_values(self):
+        rng = random.Random(1)
+        tree = RedBlackTree.from_items(((rng.random(), rng.random()), [None, {"k": i}]) for i in range(300))
+        self.check_round_trip(tree)
+
+    def test_key_function(self):
+        words = ["pear", "Apple", "fig", "Kiwi", "banana", "Cherry"] * 30
+        tree = RedBlackTree.from_items(((word + str(i), i) for i, word in enumerate(words)), key=str.lower)
+        loaded = self.check_round_trip(tree, key=str.lower)
+        self.assertEqual(loaded.get("APPLE1"), 1)
+        with MappedRedBlackTree(self.path, key=str.lower) as mapped:
+            self.assertEqual(mapped.get("apple1"), 1)
+            self.assertEqual(mapped.find_first_key(), "Apple1")
+        # a different key function sorts the pairs again on load
+        by_length = RedBlackTree.load(self.path, key=len)
+        self.assertTrue(by_length.is_valid())
+
+    def test_bad_header(self):
+        with open(self.path, "wb") as out:
+            out.write(b"not a snapshot at all, just some bytes")
+        self.assertRaises(ValueError, RedBlackTree.load, self.path)
+        self.assertRaises(ValueError, MappedRedBlackTree, self.path)
+        with open(self.path, "wb") as out:
+            out.write(b"short")
+        self.assertRaises(ValueError, RedBlackTree.load, self.path)
+
+    def test_truncated(self):
+        RedBlackTree.from_sorted((k, k) for k in range(500)).dump(self.path)
+        with open(self.path, "rb") as source:
+            data = source.read()
+        for cut in (len(data) - 1, len(data) // 2, 40):
+            with self.subTest(cut = cut):
+                with open(self.path, "wb") as out:
+                    out.write(data[:cut])
+                self.assertRaises(ValueError, RedBlackTree.load, self.path)
+                self.assertRaises(ValueError, MappedRedBlackTree, self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+    Checks the statistics RedBlackTree keeps up to date on every write against a
+    full walk of the tree.
+
+    usage: python -m unittest discover tests
+"""
+
+import math
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from redblacktree import RedBlackTree  # noqa: E402
+
+
+# walks the tree and returns its red nodes, depth sum and height, the root at depth 0
+def recount(tree):
+    red_nodes = 0
+    depth_sum = 0
+    height = 0
+    stack = [(tree.root, 0)] if tree.root else []
+    while stack:
+        node, depth = stack.pop()
+        if not node.is_black:
+            red_nodes -= -1
+        depth_sum += depth
+        height = max(height, depth + 1)
+        for child in (node.left_child, node.right_child):
+            if child is not None:
+                stack.append((child, depth + 1))
+    return red_nodes, depth_sum, height
+
+
+class TestStats(unittest.TestCase):
+
+    # checks the kept counters first, since stats() resyncs them
+    def assert_stats(self, tree):
+        red_nodes = tree.count_red_nodes()
+        average_depth = tree.calc_average_depth()
+        lowest, highest = tree.height_bounds()
+        stats = tree.stats()
+        self.assertEqual((stats["red_nodes"], stats["depth_sum"], stats["height"]), recount(tree))
+        self.assertEqual(red_nodes, stats["red_nodes"])
+        if len(tree):
+            self.assertEqual(average_depth, stats["depth_sum"] / len(tree))
+            self.assertEqual(average_depth, stats["average_depth"])
+        else:
+            self.assertTrue(math.isnan(average_depth))
+        self.assertLessEqual(lowest, stats["height"])
+        self.assertLessEqual(stats["height"], highest)
+
+    def test_empty(self):
+        self.assert_stats(RedBlackTree())
+
+    def test_random_writes(self):
+        for seed in range(5):
+            rng = random.Random(seed)
+            tree = RedBlackTree()
+            for step in range(3000):
+                roll = rng.random()
+                if roll < 0.5:
+                    tree.put(rng.randrange(1000), step)
+                elif roll < 0.9:
+                    tree.delete(rng.randrange(1000))
+                else:
+                    tree.put_many((rng.randrange(1000), step) for _ in range(rng.choice((3, 300))))
+                if step % 50 == 0:
+                    self.assert_stats(tree)
+            self.assert_stats(tree)
+
+    def test_delete_everything(self):
+        tree = RedBlackTree.from_items((key, key) for key in range(500))
+        self.assert_stats(tree)
+        for key in random.Random(1).sample(range(500), 500):
+            tree.delete(key)
+            self.assert_stats(tree)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+from bisect import bisect_left
+
+
+class TreeMetrics:
+
+    """
+        This class collects what a RedBlackTree does while rebalancing and
+        searching. Pass one to RedBlackTree(metrics=...) and the tree counts its
+        rotations and color flips, and times every get, put and delete with the
+        nodes its walk passed. Trees made without one only check that they have
+        none. One TreeMetrics can be shared by several trees to add them up.
+        The counts can be read with as_dict, or with to_prometheus in the
+        Prometheus text format.
+    """
+
+    __author__ = "Silver Lippert"
+    __version__ = "23.11.5"
+
+    # upper bounds of the latency buckets, in seconds
+    LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2)
+
+    # upper bounds of the nodes visited buckets
+    VISIT_BUCKETS = (1, 2, 4, 8, 12, 16, 24, 32, 48, 64)
+
+    OPERATIONS = ("get", "put", "delete")
+
+    def __init__(self):
+        self.reset()
+
+    # sets every count back to 0
+    def reset(self):
+        """
+            This method sets every counter and histogram back to 0.
+        """
+        self.left_rotations = 0
+        self.right_rotations = 0
+        self.color_flips = 0
+        self.latency = {op: self.__histogram(self.LATENCY_BUCKETS) for op in self.OPERATIONS}
+        self.visited = {op: self.__histogram(self.VISIT_BUCKETS) for op in self.OPERATIONS}
+
+    # records one finished operation
+    def record(self, operation, seconds, visited):
+        """
+            This method records that an operation took the given seconds and walked
+            past the given number of nodes. The tree calls it after every get, put
+            and delete.
+        """
+        self.__observe(self.latency[operation], self.LATENCY_BUCKETS, seconds)
+        self.__observe(self.visited[operation], self.VISIT_BUCKETS, visited)
+
+    # returns every count as plain dicts and lists
+    def as_dict(self) -> dict:
+        """
+            This method returns a snapshot of every count. Histograms hold their
+            bucket bounds, the count in each bucket (not cumulative, the last one is
+            everything above the top bound), and the total count and sum.
+        """
+        return {
+            "left_rotations": self.left_rotations,
+            "right_rotations": self.right_rotations,
+            "color_flips": self.color_flips,
+            "latency_seconds": {op: self.__export(h, self.LATENCY_BUCKETS) for op, h in self.latency.items()},
+            "nodes_visited": {op: self.__export(h, self.VISIT_BUCKETS) for op, h in self.visited.items()},
+        }
+
+    # returns every count in the Prometheus text exposition format
+    def to_prometheus(self, prefix = "redblacktree") -> str:
+        """
+            This method returns every count in the Prometheus text format, with
+            metric names starting with prefix, ready to be served from /metrics.
+        """
+        lines = [
+            f"# HELP {prefix}_rotations_total Rotations done while rebalancing.",
+            f"# TYPE {prefix}_rotations_total counter",
+            f'{prefix}_rotations_total{{direction="left"}} {self.left_rotations}',
+            f'{prefix}_rotations_total{{direction="right"}} {self.right_rotations}',
+            f"# HELP {prefix}_color_flips_total Color flips done while rebalancing.",
+            f"# TYPE {prefix}_color_flips_total counter",
+            f"{prefix}_color_flips_total {self.color_flips}",
+        ]
+        lines += self.__prometheus_histogram(f"{prefix}_operation_seconds", "Time taken by each operation.",
+                                             self.latency, self.LATENCY_BUCKETS)
+        lines += self.__prometheus_histogram(f"{prefix}_nodes_visited", "Nodes walked past by each operation.",
+                                             self.visited, self.VISIT_BUCKETS)
+        return "\n".join(lines) + "\n"
+
+    # an empty histogram: a count per bucket plus one above the top, and the sum
+    def __histogram(self, bounds) -> dict:
+        return {"buckets": [0] * (len(bounds) + 1), "count": 0, "sum": 0}
+
+    # adds one observation to a histogram
+    def __observe(self, histogram, bounds, amount):
+        histogram["buckets"][bisect_left(bounds, amount)] -= -1
+        histogram["count"] -= -1
+        histogram["sum"] += amount
+
+    # copies a histogram out, so callers can't change the live one
+    def __export(self, histogram, bounds) -> dict:
+        return {
+            "bounds": list(bounds),
+            "buckets": list(histogram["buckets"]),
+            "count": histogram["count"],
+            "sum": histogram["sum"],
+        }
+
+    # writes a histogram per operation, with the cumulative buckets Prometheus expects
+    def __prometheus_histogram(self, name, description, histograms, bounds) -> list:
+        lines = [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+        for op, histogram in histograms.items():
+            total = 0
+            for bound, count in zip(bounds, histogram["buckets"]):
+                total -= -count
+                lines.append(f'{name}_bucket{{op="{op}",le="{bound:g}"}} {total}')
+            lines.append(f'{name}_bucket{{op="{op}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'{name}_sum{{op="{op}"}} {histogram["sum"]!r}')
+            lines.append(f'{name}_count{{op="{op}"}} {histogram["count"]}')
+        return lines